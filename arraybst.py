@@ -0,0 +1,194 @@
+import numpy as np
+
+NULL = -1  # index of a missing child
+
+
+class ArrayBinarySearchTree:
+    """
+    Binary search tree stored as a structure of arrays: the key, left and
+    right child of node i are key[i], left[i] and right[i] (NumPy int64
+    arrays), so there is no Python object per node. Deleted slots are kept
+    in a free list chained through right[] and reused by later inserts.
+    insert/search/delete and the nodes_read/nodes_written counters behave
+    like BinarySearchTree; search_batch resolves a whole array of queries
+    level by level with vectorized operations.
+    """
+
+    def __init__(self, capacity=1024):
+        capacity = max(1, capacity)
+        self.key = np.zeros(capacity, dtype=np.int64)
+        self.left = np.full(capacity, NULL, dtype=np.int64)
+        self.right = np.full(capacity, NULL, dtype=np.int64)
+        self.root = NULL
+        self.used = 0  # slots handed out at least once
+        self.free_head = NULL  # first slot of the free list
+        self.size = 0  # number of keys in the tree
+        self.nodes_read = 0  # counter for read nodes at each operation
+        self.nodes_written = 0  # counter for written nodes at each operation
+
+    def __len__(self):
+        return self.size
+
+    def _grow(self):
+        capacity = 2 * len(self.key)
+        for name, fill in (('key', 0), ('left', NULL), ('right', NULL)):
+            old = getattr(self, name)
+            new = np.full(capacity, fill, dtype=np.int64)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def _new_node(self, key):
+        if self.free_head != NULL:  # reuse a deleted slot
+            slot = self.free_head
+            self.free_head = int(self.right[slot])
+        else:
+            if self.used == len(self.key):
+                self._grow()
+            slot = self.used
+            self.used += 1
+        self.size += 1
+        self.key[slot] = key
+        self.left[slot] = NULL
+        self.right[slot] = NULL
+        return slot
+
+    def _free_node(self, slot):
+        self.size -= 1
+        self.right[slot] = self.free_head
+        self.free_head = slot
+
+    def insert(self, key):
+        # reset counters before each new insert operation
+        self.nodes_read = 0
+        self.nodes_written = 0
+
+        if self.root == NULL:
+            self.root = self._new_node(key)
+            self.nodes_written += 1
+            return
+
+        key_, left, right = self.key, self.left, self.right
+        node = self.root
+        while True:
+            self.nodes_read += 1  # read current node
+            node_key = key_[node]
+
+            if key < node_key:
+                child = int(left[node])
+                if child == NULL:
+                    slot = self._new_node(key)  # may reallocate the arrays
+                    self.left[node] = slot
+                    self.nodes_written += 1
+                    return
+                node = child
+            elif key > node_key:
+                child = int(right[node])
+                if child == NULL:
+                    slot = self._new_node(key)
+                    self.right[node] = slot
+                    self.nodes_written += 1
+                    return
+                node = child
+            else:  # key already in the tree
+                return
+
+    def search(self, key):
+        self.nodes_read = 0  # reset counter before each new search operation
+        self.nodes_written = 0
+
+        key_, left, right = self.key, self.left, self.right
+        node = self.root
+        while node != NULL:
+            self.nodes_read += 1
+            node_key = key_[node]
+            if key == node_key:
+                return True
+            node = int(left[node]) if key < node_key else int(right[node])
+        return False
+
+    def search_batch(self, queries):
+        """
+        Search every key of the queries array at once: all the queries still
+        descending advance one level per step with vectorized gathers.
+        Returns (found, slot, reads) arrays: found flags, slot of the node
+        holding the key (NULL when missing) and nodes read per query;
+        nodes_read holds their total.
+        """
+        queries = np.asarray(queries, dtype=np.int64)
+        found = np.zeros(len(queries), dtype=bool)
+        node = np.full(len(queries), self.root, dtype=np.int64)
+        reads = np.zeros(len(queries), dtype=np.int64)
+
+        active = np.arange(len(queries)) if self.root != NULL \
+            else np.empty(0, dtype=np.int64)
+        while active.size:
+            current = node[active]
+            reads[active] += 1
+            node_keys = self.key[current]
+            wanted = queries[active]
+
+            hit = node_keys == wanted
+            found[active[hit]] = True
+
+            child = np.where(wanted < node_keys,
+                             self.left[current], self.right[current])
+            descend = ~hit & (child != NULL)
+            node[active[descend]] = child[descend]
+            active = active[descend]
+
+        self.nodes_read = int(reads.sum())
+        self.nodes_written = 0
+        return found, np.where(found, node, NULL), reads
+
+    def delete(self, key):
+        # reset counters before each new delete operation
+        self.nodes_read = 0
+        self.nodes_written = 0
+
+        key_, left, right = self.key, self.left, self.right
+        parent = NULL
+        node = self.root
+        while node != NULL and key != key_[node]:
+            self.nodes_read += 1
+            parent = node
+            node = int(left[node]) if key < key_[node] else int(right[node])
+
+        if node == NULL:  # key not in the tree
+            return
+
+        self.nodes_read += 1
+
+        if left[node] == NULL or right[node] == NULL:
+            # zero or one child: the child takes the place of the node
+            self.nodes_written += 1
+            child = int(right[node]) if left[node] == NULL else int(left[node])
+            self._replace_child(parent, node, child)
+            self._free_node(node)
+            return
+
+        # node with two child: find inorder successor and its parent
+        succ_parent = node
+        succ = int(right[node])
+        path = 1
+        while left[succ] != NULL:
+            succ_parent = succ
+            succ = int(left[succ])
+            path += 1
+
+        self.nodes_read += 2 * path  # counted as in BinarySearchTree.delete
+        key_[node] = key_[succ]
+        self.nodes_written += 2
+
+        if succ_parent == node:
+            right[node] = right[succ]
+        else:
+            left[succ_parent] = right[succ]
+        self._free_node(succ)
+
+    def _replace_child(self, parent, node, child):
+        if parent == NULL:
+            self.root = child
+        elif self.left[parent] == node:
+            self.left[parent] = child
+        else:
+            self.right[parent] = child
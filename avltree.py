@@ -0,0 +1,156 @@
+from binarysearchtree import Node, BinarySearchTree
+
+
+class AVLNode(Node):
+    __slots__ = ('height',)
+
+    def __init__(self, key):
+        super().__init__(key)
+        self.height = 1  # height of the subtree rooted in this node
+
+
+def height(node):
+    return node.height if node is not None else 0
+
+
+class AVLTree(BinarySearchTree):
+    """
+    Height balanced binary search tree with the same API and counters of
+    BinarySearchTree (search is inherited). Besides the nodes written by the
+    plain BST operations, every rotation writes the two rotated nodes and
+    every height update writes the updated node, so the rebalancing cost can
+    be compared with B tree splits and merges.
+    """
+
+    def insert(self, key):
+        # reset counters before each new insert operation
+        self.nodes_read = 0
+        self.nodes_written = 0
+
+        if self.root is None:
+            self.root = AVLNode(key)
+            self.nodes_written += 1
+            return
+
+        path = []  # nodes from the root to the parent of the new node
+        node = self.root
+        while node is not None:
+            self.nodes_read += 1
+            path.append(node)
+            if key < node.key:
+                node = node.left
+            elif key > node.key:
+                node = node.right
+            else:  # key already in the tree
+                return
+
+        parent = path[-1]
+        if key < parent.key:
+            parent.left = AVLNode(key)
+        else:
+            parent.right = AVLNode(key)
+        self.nodes_written += 1
+
+        self._rebalance(path, False)
+
+    def delete(self, key):
+        # reset counters before each new delete operation
+        self.nodes_read = 0
+        self.nodes_written = 0
+
+        path = []  # nodes from the root to the parent of the removed node
+        node = self.root
+        while node is not None and key != node.key:
+            self.nodes_read += 1
+            path.append(node)
+            node = node.left if key < node.key else node.right
+
+        if node is None:  # key not in the tree
+            return
+
+        self.nodes_read += 1
+
+        if node.left is not None and node.right is not None:
+            # two children: copy the inorder successor key in the node, then
+            # remove the successor, which has no left child
+            path.append(node)
+            succ = node.right
+            self.nodes_read += 1
+            while succ.left is not None:
+                path.append(succ)
+                succ = succ.left
+                self.nodes_read += 1
+            node.key = succ.key
+            self.nodes_written += 1
+            node = succ
+
+        child = node.right if node.left is None else node.left
+        self._replace_child(path[-1] if path else None, node, child)
+        self.nodes_written += 1
+
+        self._rebalance(path, True)
+
+    def insert_many(self, keys):
+        # rotations move the nodes of the shared path, so batches fall back
+        # to one descent per key
+        return self._apply_many(self.insert, keys)
+
+    def delete_many(self, keys):
+        return self._apply_many(self.delete, keys)
+
+    def _rebalance(self, path, deleting):
+        # walk back to the root fixing heights and rotating unbalanced nodes;
+        # stop as soon as a subtree keeps its height without rotations
+        for i in range(len(path) - 1, -1, -1):
+            node = path[i]
+            old_height = node.height
+            new = self._balance(node, deleting)
+            if new is not node:
+                self._replace_child(path[i - 1] if i > 0 else None, node, new)
+            elif node.height == old_height:
+                break
+
+    def _balance(self, node, deleting):
+        lh, rh = height(node.left), height(node.right)
+
+        if lh - rh > 1:  # left heavy
+            if deleting:  # the heavy side is off the search path
+                self.nodes_read += 1
+            if height(node.left.left) < height(node.left.right):
+                if deleting:
+                    self.nodes_read += 1
+                node.left = self._rotate_left(node.left)  # left-right case
+            return self._rotate_right(node)
+
+        if rh - lh > 1:  # right heavy
+            if deleting:
+                self.nodes_read += 1
+            if height(node.right.right) < height(node.right.left):
+                if deleting:
+                    self.nodes_read += 1
+                node.right = self._rotate_right(node.right)  # right-left case
+            return self._rotate_left(node)
+
+        new_height = 1 + max(lh, rh)
+        if new_height != node.height:
+            node.height = new_height
+            self.nodes_written += 1
+        return node
+
+    def _rotate_left(self, x):
+        y = x.right
+        x.right = y.left
+        y.left = x
+        x.height = 1 + max(height(x.left), height(x.right))
+        y.height = 1 + max(height(y.left), height(y.right))
+        self.nodes_written += 2  # both rotated nodes are rewritten
+        return y
+
+    def _rotate_right(self, y):
+        x = y.left
+        y.left = x.right
+        x.right = y
+        y.height = 1 + max(height(y.left), height(y.right))
+        x.height = 1 + max(height(x.left), height(x.right))
+        self.nodes_written += 2
+        return x
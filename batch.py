@@ -0,0 +1,18 @@
+def apply_each(tree, operation, keys):
+    """
+    Batch fallback for the trees that cannot share one descent between the
+    keys of a batch: operation runs from the root once per key, in
+    ascending order. Returns a (key, nodes_read, nodes_written) tuple per
+    key, like BTree.insert_many, and leaves the totals of the batch in the
+    counters of the tree.
+    """
+    stats = []
+    total_read = total_written = 0
+    for key in sorted(keys):
+        operation(key)
+        stats.append((key, tree.nodes_read, tree.nodes_written))
+        total_read += tree.nodes_read
+        total_written += tree.nodes_written
+    tree.nodes_read = total_read
+    tree.nodes_written = total_written
+    return stats
@@ -0,0 +1,663 @@
+import os
+import random
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from avltree import AVLTree
+from binarysearchtree import BinarySearchTree
+from bplustree import BPlusTree
+from btree import BTree
+from cachepolicy import POLICIES
+from concurrentbtree import ConcurrentBTree
+from lazybtree import LazyDeleteBTree
+from pagedbtree import PagedBTree
+from prefixbtree import PrefixBTree
+from redblacktree import RedBlackTree
+from shardedbtree import ShardedBTree, range_boundaries
+from tracing import DELETE_CASES, READ, WRITE, CounterSink, LevelHistogram, trace
+from tuner import DegreeTuner
+from workloads import ZipfianGenerator, load_keys, operation_stream
+
+DEGREES = [2, 4, 8, 16, 32, 64, 128, 256, 512, 1024]
+
+
+def benchmark_degree(degrees=DEGREES, n=100000, seed=0):
+    """
+    Time insert and search of n random keys in a BTree for every minimum
+    degree t, together with the average nodes read/written per operation.
+    Returns one row (t, insert us/op, search us/op, reads/op, writes/op) per
+    degree.
+    """
+    rnd = random.Random(seed)
+    keys = rnd.sample(range(10 * n), n)
+    probes = rnd.sample(keys, len(keys))
+    rows = []
+
+    for t in degrees:
+        btree = BTree(t)
+        reads = writes = 0
+
+        start_time = time.perf_counter()
+        for key in keys:
+            btree.insert(key)
+            writes += btree.nodes_written
+        insert_time = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        for key in probes:
+            btree.search(key)
+            reads += btree.nodes_read
+        search_time = time.perf_counter() - start_time
+
+        rows.append((t, insert_time / n * 1e6, search_time / n * 1e6,
+                     reads / n, writes / n))
+    return rows
+
+
+def print_degree_table(rows):
+    print(f"{'t':>6} {'insert us/op':>13} {'search us/op':>13} "
+          f"{'reads/search':>13} {'writes/insert':>14}")
+    for t, insert_us, search_us, reads, writes in rows:
+        print(f"{t:>6} {insert_us:>13.2f} {search_us:>13.2f} "
+              f"{reads:>13.2f} {writes:>14.2f}")
+
+
+def benchmark_batches(n=100000, batch_size=10000, t=16, seed=0):
+    """
+    Compare one insert/search per key with insert_many/search_many on
+    batches of batch_size keys. Returns one row
+    (tree, operation, mode, us/key, reads/key, writes/key) per combination.
+    """
+    rnd = random.Random(seed)
+    keys = rnd.sample(range(10 * n), n)
+    probes = rnd.sample(range(10 * n), n)
+    batches = [keys[i: i + batch_size] for i in range(0, n, batch_size)]
+    probe_batches = [probes[i: i + batch_size] for i in range(0, n, batch_size)]
+    rows = []
+
+    for name, make_tree in (("BTree", lambda: BTree(t)),
+                            ("BST", BinarySearchTree)):
+        for mode in ("single", "batch"):
+            tree = make_tree()
+            for operation, stream, batch_stream in (
+                    ("Insert", keys, batches),
+                    ("Search", probes, probe_batches)):
+                reads = writes = 0
+                start_time = time.perf_counter()
+                if mode == "single":
+                    single = tree.insert if operation == "Insert" else tree.search
+                    for key in stream:
+                        single(key)
+                        reads += tree.nodes_read
+                        writes += tree.nodes_written
+                else:
+                    many = tree.insert_many if operation == "Insert" \
+                        else tree.search_many
+                    for batch in batch_stream:
+                        many(batch)
+                        reads += tree.nodes_read
+                        writes += tree.nodes_written
+                elapsed = time.perf_counter() - start_time
+                rows.append((name, operation, mode, elapsed / n * 1e6,
+                             reads / n, writes / n))
+    return rows
+
+
+def print_batch_table(rows):
+    print(f"{'tree':>6} {'op':>7} {'mode':>7} {'us/key':>8} "
+          f"{'reads/key':>10} {'writes/key':>11}")
+    for name, operation, mode, us, reads, writes in rows:
+        print(f"{name:>6} {operation:>7} {mode:>7} {us:>8.2f} "
+              f"{reads:>10.2f} {writes:>11.2f}")
+
+
+def benchmark_memory(n=100000, t=16, seed=0):
+    """
+    Measure with tracemalloc the memory held by every tree layout after n
+    random inserts. The keys are created inside the traced window, so the
+    int objects kept alive by list based nodes are charged to the tree.
+    Returns one row (layout, bytes/key) per layout.
+    """
+    layouts = (("BTree list keys", lambda: BTree(t)),
+               ("BTree array('q') keys", lambda: BTree(t, compact=True)),
+               ("BST", BinarySearchTree),
+               ("AVL", AVLTree),
+               ("RedBlack", RedBlackTree))
+    rows = []
+
+    for name, make_tree in layouts:
+        rnd = random.Random(seed)
+        tracemalloc.start()
+        start = tracemalloc.get_traced_memory()[0]
+        tree = make_tree()
+        for _ in range(n):
+            tree.insert(rnd.randrange(1 << 40))
+        used = tracemalloc.get_traced_memory()[0] - start
+        tracemalloc.stop()
+        rows.append((name, used / n))
+        del tree
+    return rows
+
+
+def print_memory_table(rows):
+    print(f"{'layout':>22} {'bytes/key':>10}")
+    for name, bytes_per_key in rows:
+        print(f"{name:>22} {bytes_per_key:>10.1f}")
+
+
+def benchmark_array_bst(n=200000, seed=0):
+    """
+    Probe n random keys in a BST of n random keys: BinarySearchTree.search
+    in a loop against ArrayBinarySearchTree.search_batch on one array.
+    Returns one row (engine, us/query, reads/query) per engine.
+    """
+    import numpy as np  # only this benchmark needs numpy
+
+    from arraybst import ArrayBinarySearchTree
+
+    rnd = random.Random(seed)
+    keys = rnd.sample(range(10 * n), n)
+    probes = rnd.sample(range(10 * n), n)
+
+    bstree = BinarySearchTree()
+    array_bstree = ArrayBinarySearchTree(n)
+    for key in keys:
+        bstree.insert(key)
+        array_bstree.insert(key)
+
+    reads = 0
+    start_time = time.perf_counter()
+    for key in probes:
+        bstree.search(key)
+        reads += bstree.nodes_read
+    loop_time = time.perf_counter() - start_time
+
+    queries = np.array(probes, dtype=np.int64)
+    start_time = time.perf_counter()
+    array_bstree.search_batch(queries)
+    batch_time = time.perf_counter() - start_time
+
+    return [("BinarySearchTree.search", loop_time / n * 1e6, reads / n),
+            ("ArrayBST.search_batch", batch_time / n * 1e6,
+             array_bstree.nodes_read / n)]
+
+
+def print_engine_table(rows):
+    print(f"{'engine':>26} {'us/query':>9} {'reads/query':>12}")
+    for name, us, reads in rows:
+        print(f"{name:>26} {us:>9.3f} {reads:>12.2f}")
+
+
+def benchmark_threads(n=100000, t=16, threads=(1, 2, 4, 8), write_ratio=0.05,
+                      seed=0):
+    """
+    Share a ConcurrentBTree of n random keys between a number of threads,
+    each running n // threads operations (searches, plus inserts of new
+    keys with probability write_ratio). Throughput only grows with the
+    threads on free-threaded builds, with the GIL it measures the latching
+    overhead. Returns one row (threads, ops/s, reads/op) per thread count.
+    """
+    rnd = random.Random(seed)
+    keys = rnd.sample(range(10 * n), n)
+    rows = []
+
+    for n_threads in threads:
+        tree = ConcurrentBTree(t)
+        for key in keys:
+            tree.insert(key)
+        reads = [0] * n_threads
+
+        def worker(number):
+            local = random.Random(seed + number)
+            for _ in range(n // n_threads):
+                if local.random() < write_ratio:
+                    stats = tree.insert(10 * n + local.randrange(10 * n))
+                else:
+                    stats = tree.search(local.choice(keys))[1]
+                reads[number] += stats.nodes_read
+
+        workers = [threading.Thread(target=worker, args=(number,))
+                   for number in range(n_threads)]
+        start_time = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - start_time
+        done = n // n_threads * n_threads
+        rows.append((n_threads, done / elapsed, sum(reads) / done))
+    return rows
+
+
+def print_thread_table(rows):
+    print(f"{'threads':>8} {'ops/s':>10} {'reads/op':>9}")
+    for n_threads, throughput, reads in rows:
+        print(f"{n_threads:>8} {throughput:>10.0f} {reads:>9.2f}")
+
+
+def benchmark_lazy_delete(n=100000, t=16, burst=0.5, seed=0):
+    """
+    Insert n random keys, then delete a burst of burst * n of them with the
+    eager (rebalancing) BTree.delete and with LazyDeleteBTree. Returns one
+    row (mode, us/delete, amortized writes/delete, max writes of a delete,
+    compactions) per mode; the lazy writes include the compactions.
+    """
+    rnd = random.Random(seed)
+    keys = rnd.sample(range(10 * n), n)
+    victims = rnd.sample(keys, int(burst * n))
+    rows = []
+
+    for mode, tree in (("eager", BTree(t)), ("lazy", LazyDeleteBTree(t))):
+        for key in keys:
+            tree.insert(key)
+        writes = max_writes = 0
+
+        start_time = time.perf_counter()
+        for key in victims:
+            tree.delete(tree.root, key)
+            writes += tree.nodes_written
+            max_writes = max(max_writes, tree.nodes_written)
+        elapsed = time.perf_counter() - start_time
+
+        rows.append((mode, elapsed / len(victims) * 1e6, writes / len(victims),
+                     max_writes, getattr(tree, 'compactions', 0)))
+    return rows
+
+
+def print_lazy_delete_table(rows):
+    print(f"{'mode':>6} {'us/delete':>10} {'writes/delete':>14} "
+          f"{'max writes':>11} {'compactions':>12}")
+    for mode, us, writes, max_writes, compactions in rows:
+        print(f"{mode:>6} {us:>10.2f} {writes:>14.3f} {max_writes:>11} "
+              f"{compactions:>12}")
+
+
+def benchmark_scans(n=100000, t=16, scan_length=1000, scans=1000, seed=0):
+    """
+    Run scans range scans of about scan_length consecutive keys, and point
+    searches, on a BTree and a BPlusTree of n random keys. Returns one row
+    (tree, scan us/key, reads/scan, search us/op, reads/search) per tree.
+    """
+    rnd = random.Random(seed)
+    keys = rnd.sample(range(10 * n), n)
+    starts = [rnd.randrange(10 * n) for _ in range(scans)]
+    probes = rnd.sample(keys, min(n, 10 * scans))
+    rows = []
+
+    for name, tree in (("BTree", BTree(t)), ("BPlusTree", BPlusTree(t))):
+        for key in keys:
+            tree.insert(key)
+
+        scanned = reads = 0
+        start_time = time.perf_counter()
+        for lo in starts:
+            for _ in tree.range(lo, lo + 10 * scan_length):
+                scanned += 1
+            reads += tree.nodes_read
+        scan_time = time.perf_counter() - start_time
+
+        search_reads = 0
+        start_time = time.perf_counter()
+        for key in probes:
+            tree.search(key)
+            search_reads += tree.nodes_read
+        search_time = time.perf_counter() - start_time
+
+        rows.append((name, scan_time / max(1, scanned) * 1e6, reads / scans,
+                     search_time / len(probes) * 1e6, search_reads / len(probes)))
+    return rows
+
+
+def print_scan_table(rows):
+    print(f"{'tree':>10} {'scan us/key':>12} {'reads/scan':>11} "
+          f"{'search us/op':>13} {'reads/search':>13}")
+    for name, scan_us, scan_reads, search_us, search_reads in rows:
+        print(f"{name:>10} {scan_us:>12.3f} {scan_reads:>11.2f} "
+              f"{search_us:>13.2f} {search_reads:>13.2f}")
+
+
+def benchmark_delete_cases(n=100000, t=16, burst=0.5, seed=0):
+    """
+    Insert n random keys in a BTree, then trace the deletes of burst * n of
+    them. Returns one row (case, reads, writes, writes/delete, share of the
+    writes) per delete case, and the per-level histogram of the writes.
+    """
+    rnd = random.Random(seed)
+    keys = rnd.sample(range(10 * n), n)
+    victims = rnd.sample(keys, int(burst * n))
+    tree = BTree(t)
+    for key in keys:
+        tree.insert(key)
+
+    counters, levels = CounterSink(), LevelHistogram()
+    with trace(tree, counters, levels):
+        for key in victims:
+            tree.delete(tree.root, key)
+
+    accesses = counters.by('case', 'access')
+    total_writes = sum(counters.writes_by_case().values())
+    rows = []
+    for case in DELETE_CASES:
+        writes = accesses[case, WRITE]
+        rows.append((case, accesses[case, READ], writes, writes / len(victims),
+                     writes / max(1, total_writes)))
+    return rows, levels.histogram(WRITE, 'delete')
+
+
+def print_delete_case_table(result):
+    rows, write_levels = result
+    print(f"{'case':>5} {'reads':>9} {'writes':>9} {'writes/delete':>14} "
+          f"{'% writes':>9}")
+    for case, reads, writes, per_delete, share in rows:
+        print(f"{case:>5} {reads:>9} {writes:>9} {per_delete:>14.3f} "
+              f"{100 * share:>9.1f}")
+    print("writes per level:", " ".join(f"{level}:{count}" for level, count
+                                        in enumerate(write_levels)))
+
+
+def benchmark_cache(n=50000, t=16, pool_sizes=(16, 64, 256), pinned=(0, 2),
+                    lookups=20000, seed=0):
+    """
+    Build a PagedBTree of n random keys, then replay Zipfian lookups (hot
+    keys scattered over the key space) on the reopened file for every
+    eviction policy, pool size and number of pinned levels, after as many
+    warm-up lookups. Returns one row (policy, pool size, pinned levels,
+    page reads/lookup, hit ratio) per configuration.
+    """
+    rnd = random.Random(seed)
+    keys = rnd.sample(range(10 * n), n)
+    path = os.path.join(tempfile.mkdtemp(), 'cache.pages')
+    with PagedBTree(path, t, pool_size=1024) as tree:
+        for key in keys:
+            tree.insert(key)
+    zipf = ZipfianGenerator(n, rnd=rnd)
+    probes = [keys[zipf.next()] for _ in range(2 * lookups)]
+    rows = []
+
+    for policy in POLICIES:
+        for pool_size in pool_sizes:
+            for levels in pinned:
+                with PagedBTree(path, t, pool_size=pool_size, policy=policy,
+                                pinned_levels=levels) as tree:
+                    for key in probes[:lookups]:
+                        tree.search(key)
+                    tree.pool.hits = tree.pool.misses = 0
+                    reads = 0
+                    for key in probes[lookups:]:
+                        tree.search(key)
+                        reads += tree.nodes_read
+                    rows.append((policy, pool_size, levels, reads / lookups,
+                                 tree.pool.hit_ratio()))
+    os.remove(path)
+    return rows
+
+
+def print_cache_table(rows):
+    print(f"{'policy':>6} {'pool':>5} {'pinned':>7} {'reads/op':>9} "
+          f"{'hit ratio':>10}")
+    for policy, pool_size, levels, reads, hit_ratio in rows:
+        print(f"{policy:>6} {pool_size:>5} {levels:>7} {reads:>9.3f} "
+              f"{hit_ratio:>10.3f}")
+
+
+def benchmark_frozen(n=200000, t=16, seed=0):
+    """
+    Probe n keys (half present) in a BTree of n random keys: BTree.search
+    in a loop against the frozen copy, FrozenBTree.search_batch, on one
+    array. Returns one row (engine, us/query, reads/query) per engine.
+    """
+    import numpy as np  # only this benchmark needs numpy
+
+    rnd = random.Random(seed)
+    keys = rnd.sample(range(10 * n), n)
+    probes = rnd.sample(keys, n // 2) + rnd.sample(range(10 * n), n - n // 2)
+    tree = BTree(t)
+    for key in keys:
+        tree.insert(key)
+
+    reads = 0
+    start_time = time.perf_counter()
+    for key in probes:
+        tree.search(key)
+        reads += tree.nodes_read
+    loop_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    frozen = tree.freeze()
+    freeze_time = time.perf_counter() - start_time
+    queries = np.array(probes, dtype=np.int64)
+    start_time = time.perf_counter()
+    frozen.search_batch(queries)
+    batch_time = time.perf_counter() - start_time
+
+    return [("BTree.search", loop_time / n * 1e6, reads / n),
+            ("FrozenBTree.search_batch", batch_time / n * 1e6,
+             frozen.nodes_read / n),
+            ("BTree.freeze (per key)", freeze_time / n * 1e6, 0.0)]
+
+
+def benchmark_static_bst(sizes=(1 << 10, 1 << 14, 1 << 18, 1 << 21), t=16,
+                         queries=20000, seed=0):
+    """
+    Probe random keys (half present) in trees of every size, from a key
+    array that fits in L1 (8 KiB) to one larger than most last-level caches
+    (16 MiB): BinarySearchTree.search and BTree.search against the frozen
+    BST in Eytzinger and van Emde Boas order, one key at a time and with
+    search_batch. Returns one row (keys, engine, us/query, reads/query) per
+    size and engine.
+    """
+    import numpy as np  # only the batch searches need numpy
+
+    rnd = random.Random(seed)
+    rows = []
+    for n in sizes:
+        keys = rnd.sample(range(10 * n), n)
+        probes = [rnd.choice(keys) if rnd.random() < 0.5
+                  else rnd.randrange(10 * n) for _ in range(queries)]
+        bstree, btree = BinarySearchTree(), BTree(t)
+        for key in keys:
+            bstree.insert(key)
+            btree.insert(key)
+        engines = [("BinarySearchTree", bstree), ("BTree", btree)]
+        for layout in ('eytzinger', 'veb'):
+            engines.append((f"static {layout}", bstree.freeze(layout)))
+
+        for name, tree in engines:
+            reads = 0
+            start_time = time.perf_counter()
+            for key in probes:
+                tree.search(key)
+                reads += tree.nodes_read
+            elapsed = time.perf_counter() - start_time
+            rows.append((n, name, elapsed / queries * 1e6, reads / queries))
+
+        batch = np.array(probes, dtype=np.int64)
+        for name, tree in engines[2:]:
+            start_time = time.perf_counter()
+            tree.search_batch(batch)
+            elapsed = time.perf_counter() - start_time
+            rows.append((n, f"{name} batch", elapsed / queries * 1e6,
+                         tree.nodes_read / queries))
+    return rows
+
+
+def print_static_bst_table(rows):
+    print(f"{'keys':>8} {'engine':>22} {'us/query':>9} {'reads/query':>12}")
+    for n, name, us, reads in rows:
+        print(f"{n:>8} {name:>22} {us:>9.3f} {reads:>12.2f}")
+
+
+def benchmark_sharded(n=200000, t=16, shard_counts=(1, 2, 4, 8),
+                      batch_size=20000, seed=0):
+    """
+    Ingest n random keys in batches of batch_size with insert_many: one
+    BTree in this process, then ShardedBTree with hash and range
+    partitioning and one worker process per shard. Returns one row
+    (engine, shards, keys/s, reads/key, writes/key) per configuration;
+    the speedup is bounded by the number of cores.
+    """
+    rnd = random.Random(seed)
+    keys = rnd.sample(range(10 * n), n)
+    batches = [keys[i: i + batch_size] for i in range(0, n, batch_size)]
+    rows = []
+
+    tree = BTree(t)
+    reads = writes = 0
+    start_time = time.perf_counter()
+    for batch in batches:
+        tree.insert_many(batch)
+        reads += tree.nodes_read
+        writes += tree.nodes_written
+    elapsed = time.perf_counter() - start_time
+    rows.append(("BTree", 1, n / elapsed, reads / n, writes / n))
+
+    for partition in ('hash', 'range'):
+        for shards in shard_counts:
+            boundaries = range_boundaries(keys[:1000], shards) \
+                if partition == 'range' else None
+            with ShardedBTree(t, shards, partition, boundaries) as tree:
+                reads = writes = 0
+                start_time = time.perf_counter()
+                for batch in batches:
+                    tree.insert_many(batch)
+                    reads += tree.nodes_read
+                    writes += tree.nodes_written
+                elapsed = time.perf_counter() - start_time
+            rows.append((f"sharded {partition}", shards, n / elapsed,
+                         reads / n, writes / n))
+    return rows
+
+
+def print_sharded_table(rows):
+    print(f"{'engine':>15} {'shards':>7} {'keys/s':>10} {'reads/key':>10} "
+          f"{'writes/key':>11}")
+    for name, shards, throughput, reads, writes in rows:
+        print(f"{name:>15} {shards:>7} {throughput:>10.0f} {reads:>10.2f} "
+              f"{writes:>11.2f}")
+
+
+def _url(i):
+    # URL-like key: the nodes are dominated by the shared prefixes
+    return (f"https://www.site{i % 7}.example.com/catalog/"
+            f"section-{i // 7 % 50:02d}/item-{i:08d}")
+
+
+def benchmark_prefix(n=100000, t=64, searches=100000, seed=0):
+    """
+    Build trees of n URL-like keys (and of n 64 bit integers spaced like
+    timestamps) with plain and compressed nodes: memory held per key
+    (tracemalloc, keys created inside the traced window), bytes per key of
+    the keys encoded in pages, keys per 4 KiB page and search time. Returns
+    one row (layout, bytes/key, page bytes/key, keys/page, us/search) per
+    layout.
+    """
+    rnd = random.Random(seed)
+    ids = rnd.sample(range(n), n)
+    base = 1 << 40
+    layouts = (("BTree str keys", lambda: BTree(t), _url),
+               ("PrefixBTree str keys", lambda: PrefixBTree(t), _url),
+               ("BTree array('q') keys", lambda: BTree(t, compact=True),
+                lambda i: base + 1000 * i),
+               ("PrefixBTree delta keys", lambda: PrefixBTree(t, compact=True),
+                lambda i: base + 1000 * i))
+    queries = [rnd.randrange(n) for _ in range(searches)]
+    rows = []
+
+    for name, make_tree, make_key in layouts:
+        tracemalloc.start()
+        start = tracemalloc.get_traced_memory()[0]
+        tree = make_tree()
+        for i in ids:
+            tree.insert(make_key(i))
+        used = tracemalloc.get_traced_memory()[0] - start
+        tracemalloc.stop()
+
+        if isinstance(tree, PrefixBTree):
+            page_bytes = tree.nbytes()
+        elif isinstance(tree.root.keys, list):
+            page_bytes = sum(2 + len(key.encode()) for key in tree.range())
+        else:  # array('q')
+            page_bytes = 8 * n
+
+        keys = [make_key(i) for i in queries]
+        start_time = time.perf_counter()
+        for key in keys:
+            tree.search(key)
+        elapsed = time.perf_counter() - start_time
+        rows.append((name, used / n, page_bytes / n, 4096 * n / page_bytes,
+                     elapsed / searches * 1e6))
+        del tree
+    return rows
+
+
+def print_prefix_table(rows):
+    print(f"{'layout':>22} {'bytes/key':>10} {'page bytes/key':>15} "
+          f"{'keys/page':>10} {'us/search':>10}")
+    for name, memory, page_bytes, fanout, us in rows:
+        print(f"{name:>22} {memory:>10.1f} {page_bytes:>15.1f} "
+              f"{fanout:>10.1f} {us:>10.2f}")
+
+
+def benchmark_tuner(n=50000, ops=5000, mixes=('search=0.95,insert=0.05',
+                                              'insert=0.5,delete=0.5'),
+                    seed=0):
+    """
+    Calibrate DegreeTuner on n uniform keys and ops operations of every
+    mix, with the in-memory cost model (measured time only) and a device
+    model (100 us per page read, 200 us per page written, 4 KiB pages).
+    Returns one row (mix, model, t, ns/op, reads/op, writes/op, cost,
+    best) per candidate degree.
+    """
+    models = (("memory", 0, 0), ("device", 100000, 200000))
+    keys = load_keys('uniform', n, seed)
+    rows = []
+
+    for mix in mixes:
+        operations = list(operation_stream('uniform', mix, keys, ops, seed))
+        for model, read_cost, write_cost in models:
+            tuner = DegreeTuner(read_cost=read_cost, write_cost=write_cost)
+            for row in tuner.calibrate(keys, operations):
+                rows.append((mix, model, row['t'], row['mean_ns'],
+                             row['reads_per_op'], row['writes_per_op'],
+                             row['cost'], row['t'] == tuner.best))
+    return rows
+
+
+def print_tuner_table(rows):
+    print(f"{'mix':>26} {'model':>7} {'t':>4} {'ns/op':>8} {'reads/op':>9} "
+          f"{'writes/op':>10} {'cost ns':>10}")
+    for mix, model, t, ns, reads, writes, cost, best in rows:
+        print(f"{mix:>26} {model:>7} {t:>4} {ns:>8.0f} {reads:>9.2f} "
+              f"{writes:>10.2f} {cost:>10.0f}{' best' if best else ''}")
+
+
+if __name__ == "__main__":
+    print_degree_table(benchmark_degree())
+    print()
+    print_batch_table(benchmark_batches())
+    print()
+    print_memory_table(benchmark_memory())
+    print()
+    print_engine_table(benchmark_array_bst())
+    print()
+    print_thread_table(benchmark_threads())
+    print()
+    print_lazy_delete_table(benchmark_lazy_delete())
+    print()
+    print_scan_table(benchmark_scans())
+    print()
+    print_delete_case_table(benchmark_delete_cases())
+    print()
+    print_cache_table(benchmark_cache())
+    print()
+    print_engine_table(benchmark_frozen())
+    print()
+    print_static_bst_table(benchmark_static_bst())
+    print()
+    print_sharded_table(benchmark_sharded())
+    print()
+    print_prefix_table(benchmark_prefix())
+    print()
+    print_tuner_table(benchmark_tuner())
@@ -0,0 +1,212 @@
+import csv
+import itertools
+import json
+import math
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from avltree import AVLTree
+from binarysearchtree import BinarySearchTree
+from bplustree import BPlusTree
+from btree import BTree
+from concurrentbtree import ConcurrentBTree
+from lazybtree import LazyDeleteBTree
+from metrics import MetricsRecorder
+from pagedbtree import PagedBTree
+from redblacktree import RedBlackTree
+from walbtree import DurableBTree
+from workloads import load_keys, operation_stream
+
+# tree kinds that take the minimum degree t
+BTREES = ('btree', 'btree-compact', 'btree-lazy', 'bplus', 'paged', 'concurrent',
+          'durable')
+TREES = BTREES + ('bst', 'avl', 'redblack', 'arraybst')
+
+RESULT_FIELDS = ('tree', 't', 'n', 'distribution', 'mix', 'ops', 'seed',
+                 'operation', 'count', 'seconds', 'mean_ns', 'p50_ns', 'p99_ns',
+                 'p999_ns', 'reads_per_op', 'writes_per_op', 'max_reads',
+                 'max_writes')
+
+# parameters identifying a configuration apart from its seed, and the
+# metrics averaged over the seeds by merge_results
+GROUP_FIELDS = ('tree', 't', 'n', 'distribution', 'mix', 'ops', 'operation')
+MERGED_METRICS = ('seconds', 'mean_ns', 'p50_ns', 'p99_ns', 'p999_ns',
+                  'reads_per_op', 'writes_per_op')
+
+# two-sided 95% critical values of Student's t for 1..30 degrees of freedom
+T_95 = (12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+        2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+        2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042)
+
+
+def make_tree(tree, t, workdir):
+    if tree == 'btree':
+        return BTree(t)
+    if tree == 'btree-compact':
+        return BTree(t, compact=True)
+    if tree == 'bplus':
+        return BPlusTree(t)
+    if tree == 'btree-lazy':
+        return LazyDeleteBTree(t)
+    if tree == 'concurrent':
+        return ConcurrentBTree(t)
+    if tree == 'paged':
+        return PagedBTree(os.path.join(workdir, 'btree.pages'), t)
+    if tree == 'durable':
+        return DurableBTree(os.path.join(workdir, 'wal'), t)
+    if tree == 'bst':
+        return BinarySearchTree()
+    if tree == 'avl':
+        return AVLTree()
+    if tree == 'redblack':
+        return RedBlackTree()
+    if tree == 'arraybst':
+        from arraybst import ArrayBinarySearchTree  # needs numpy
+        return ArrayBinarySearchTree()
+    raise ValueError(f"unknown tree {tree!r}, expected one of {', '.join(TREES)}")
+
+
+def tree_operations(tree):
+    # B trees take the root as first argument of delete
+    if isinstance(tree, (BTree, BPlusTree, PagedBTree)) and \
+            not isinstance(tree, ConcurrentBTree):
+        delete = lambda key: tree.delete(tree.root, key)
+    else:
+        delete = tree.delete
+    return {'Insert': tree.insert, 'Search': tree.search, 'Delete': delete}
+
+
+def expand_configs(trees, degrees, sizes, distributions, mixes, ops, seeds):
+    """
+    Cartesian product of the benchmark parameters as a list of dicts; t
+    only varies for B trees (it is None for binary trees)
+    """
+    configs = []
+    for tree, n, distribution, mix, seed in itertools.product(
+            trees, sizes, distributions, mixes, seeds):
+        for t in (degrees if tree in BTREES else [None]):
+            configs.append({'tree': tree, 't': t, 'n': n,
+                            'distribution': distribution, 'mix': mix,
+                            'ops': ops, 'seed': seed})
+    return configs
+
+
+def run_config(config):
+    """
+    Load config['n'] keys into a new tree, then run config['ops']
+    operations of the mix, timing every operation. Returns one result row
+    (see RESULT_FIELDS) per measured operation type: the load is reported as
+    operation 'Load', the mix as 'Insert', 'Search' and 'Delete'.
+    """
+    workdir = tempfile.mkdtemp(prefix='bench-')
+    try:
+        recorder = MetricsRecorder(os.path.join(workdir, 'metrics'))
+        tree = make_tree(config['tree'], config['t'], workdir)
+        operations = tree_operations(tree)
+        record = recorder.record
+        seconds = {}
+
+        keys = load_keys(config['distribution'], config['n'], config['seed'])
+        stream = operation_stream(config['distribution'], config['mix'], keys,
+                                  config['ops'], config['seed'])
+        phases = [('Load', (('Insert', key) for key in keys)), ('Mix', stream)]
+
+        for phase_name, pairs in phases:
+            for operation, key in pairs:
+                name = 'Load' if phase_name == 'Load' else operation
+                phase = recorder.phase(config['tree'], name)
+                run = operations[operation]
+                start_time = time.perf_counter_ns()
+                run(key)
+                elapsed = time.perf_counter_ns() - start_time
+                seconds[name] = seconds.get(name, 0) + elapsed / 1e9
+                record(phase, key, elapsed, tree.nodes_read, tree.nodes_written)
+
+        if isinstance(tree, (PagedBTree, DurableBTree)):
+            tree.close()
+
+        rows = []
+        for summary in recorder.summary():
+            row = dict(config)
+            row.update(summary)
+            del row['series']
+            row['seconds'] = seconds[summary['operation']]
+            rows.append({field: row[field] for field in RESULT_FIELDS})
+        return rows
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def write_results(rows, output=None, fmt='jsonl'):
+    """
+    Write the result rows as JSON lines or CSV to a file, or to stdout
+    """
+    stream = open(output, 'w', newline='') if output else sys.stdout
+    try:
+        if fmt == 'csv':
+            writer = csv.DictWriter(stream, fieldnames=list(rows[0]) if rows
+                                    else RESULT_FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+        else:
+            for row in rows:
+                stream.write(json.dumps(row) + '\n')
+    finally:
+        if output:
+            stream.close()
+
+
+def run_parallel(configs, workers=None):
+    """
+    Run the configurations in a pool of worker processes (os.cpu_count()
+    when workers is None), each building its own tree. Yields
+    (config, rows) as soon as every configuration finishes, in completion
+    order.
+    """
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(run_config, config): config for config in configs}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+
+def confidence_interval(values):
+    """
+    Mean of the values and half-width of its 95% confidence interval
+    (Student's t, 0 for a single value)
+    """
+    mean = statistics.fmean(values)
+    if len(values) < 2:
+        return mean, 0.0
+    df = len(values) - 1
+    critical = T_95[df - 1] if df <= len(T_95) else 1.960
+    return mean, critical * statistics.stdev(values) / math.sqrt(len(values))
+
+
+def merge_results(rows):
+    """
+    Merge the rows of the repetitions (seeds) of every configuration into
+    one row: count of runs, mean of every metric and the half-width of its
+    95% confidence interval as <metric>_ci
+    """
+    groups = {}
+    for row in rows:
+        key = tuple(row[field] for field in GROUP_FIELDS)
+        groups.setdefault(key, []).append(row)
+
+    merged = []
+    for key, runs in groups.items():
+        row = dict(zip(GROUP_FIELDS, key))
+        row['runs'] = len(runs)
+        row['count'] = sum(run['count'] for run in runs)
+        for metric in MERGED_METRICS:
+            row[metric], row[metric + '_ci'] = \
+                confidence_interval([run[metric] for run in runs])
+        row['max_reads'] = max(run['max_reads'] for run in runs)
+        row['max_writes'] = max(run['max_writes'] for run in runs)
+        merged.append(row)
+    return merged
@@ -1,4 +1,9 @@
+from batch import apply_each
+
+
 class Node:
+    __slots__ = ('key', 'left', 'right')  # no per-node __dict__
+
     def __init__(self, key):
         self.key = key
         self.left = None
@@ -19,92 +24,345 @@ class BinarySearchTree:
         if self.root is None:
             self.root = Node(key)
             self.nodes_written += 1
-        else:
-            self._insert_recursive(self.root, key)
+            return
 
-    def _insert_recursive(self, node, key):
-        self.nodes_read += 1  # read current node
+        # iterative descent: no recursion limit on degenerate (sorted) inputs
+        node = self.root
+        while True:
+            self.nodes_read += 1  # read current node
 
-        if key < node.key:
-            if node.left is None:
-                node.left = Node(key)
-                self.nodes_written += 1
-
-            else:
-                self._insert_recursive(node.left, key)
-        if key > node.key:
-            if node.right is None:
-                node.right = Node(key)
-                self.nodes_written += 1
-            else:
-                self._insert_recursive(node.right, key)
+            if key < node.key:
+                if node.left is None:
+                    node.left = Node(key)
+                    self.nodes_written += 1
+                    return
+                node = node.left
+            elif key > node.key:
+                if node.right is None:
+                    node.right = Node(key)
+                    self.nodes_written += 1
+                    return
+                node = node.right
+            else:  # key already in the tree
+                return
 
     def search(self, key):
         self.nodes_read = 0  # reset counter before each new search operation
                              # Observation: counter for written nodes will be always 0
-        self.nodes_writte = 0
-        found = self._search_recursive(self.root, key)
-        return found
-
-    def _search_recursive(self, node, key):
-
-        if node is None:  # the binary search tree is empty
-            return False
+        self.nodes_written = 0
 
-        self.nodes_read += 1
+        node = self.root
+        while node is not None:
+            self.nodes_read += 1
 
-        if key == node.key:
-            return True
-        elif key < node.key:
-            return self._search_recursive(node.left, key)
-        else:
-            return self._search_recursive(node.right, key)
+            if key == node.key:
+                return True
+            node = node.left if key < node.key else node.right
+        return False
 
     def delete(self, key):
         # reset counters before each new delete operation
         self.nodes_read = 0
         self.nodes_written = 0
-        self.root = self._delete_recursive(self.root, key)
 
-    def _delete_recursive(self, node, key):
+        # find the node to delete, keeping track of its parent
+        parent = None
+        node = self.root
+        while node is not None and key != node.key:
+            self.nodes_read += 1
+            parent = node
+            node = node.left if key < node.key else node.right
 
-        if node is None:
-            return None
+        if node is None:  # key not in the tree
+            return
 
         self.nodes_read += 1
+        self._remove(parent, node)
+
+    def _remove(self, parent, node):
+        # unlink a node that has already been read from the tree
+        if node.left is None or node.right is None:
+            # zero or one child: the child takes the place of the node
+            self.nodes_written += 1
+            child = node.right if node.left is None else node.left
+            self._replace_child(parent, node, child)
+            return
+
+        # node with two child: find inorder successor, i.e. the minimum of
+        # the right subtree, together with its parent
+        succ_parent = node
+        succ = node.right
+        path = 1
+        while succ.left is not None:
+            succ_parent = succ
+            succ = succ.left
+            path += 1
+
+        self.nodes_read += 2 * path  # the successor path is read once to find
+                                     # the successor and once to unlink it
+        node.key = succ.key
+        self.nodes_written += 2  # update key and unlink successor
+
+        if succ_parent is node:
+            node.right = succ.right
+        else:
+            succ_parent.left = succ.right
 
-        if key < node.key:
-            node.left = self._delete_recursive(node.left, key)
-        elif key > node.key:
-            node.right = self._delete_recursive(node.right, key)
+    def _replace_child(self, parent, node, child):
+        if parent is None:
+            self.root = child
+        elif parent.left is node:
+            parent.left = child
         else:
-            # key found
-            if node.left is None:
-                self.nodes_written += 1
-                return node.right
-            elif node.right is None:
-                self.nodes_written += 1
-                return node.left
-
-            # node with two child: find inorder successor
-            min_larger_node = self._find_min(node.right)
-            node.key = min_larger_node.key
-            self.nodes_written += 1  # update key
-            node.right = self._delete_recursive(node.right, min_larger_node.key)
-
-        #if node is not None:
-        #    self.nodes_written += 1  # write update node
+            parent.right = child
+
+    def search_many(self, keys):
+        """
+        Search a batch of keys in ascending order sharing the root-to-leaf
+        path between adjacent keys: the nodes of the path kept from the
+        previous key are not read again. Returns a (key, found, nodes_read)
+        tuple per key; nodes_read holds the total of the batch.
+        """
+        stats = []
+        total_read = 0
+        path = []
+
+        for key in sorted(keys):
+            self.nodes_read = 0
+            node = self._resume(path, key)
+            stats.append((key, node is not None, self.nodes_read))
+            total_read += self.nodes_read
+
+        self.nodes_read = total_read
+        self.nodes_written = 0
+        return stats
+
+    def insert_many(self, keys):
+        """
+        Insert a batch of keys in ascending order, every insert goes on from
+        the path shared with the previous key. The keys that fall in the same
+        empty subtree are linked there as a balanced subtree, so a sorted
+        batch does not degenerate into a list. Returns a
+        (key, nodes_read, nodes_written) tuple per key;
+        nodes_read/nodes_written hold the totals of the batch.
+        """
+        keys = sorted(keys)
+        stats = []
+        total_read = total_written = 0
+        path = []
+        i = 0
+
+        while i < len(keys):
+            self.nodes_read = 0
+            self.nodes_written = 0
+            key = keys[i]
+
+            if self._resume(path, key) is not None:  # key already in the tree
+                stats.append((key, self.nodes_read, 0))
+                total_read += self.nodes_read
+                i += 1
+                continue
+
+            # the key goes in the empty link below the last node of path;
+            # all the next keys lower than the upper bound of that link go
+            # in the same empty subtree
+            if path:
+                parent, hi = path[-1]
+                left = key < parent.key
+                bound = parent.key if left else hi
+            else:
+                parent, bound = None, None
+            j = i + 1
+            while j < len(keys) and (bound is None or keys[j] < bound):
+                j += 1
+
+            group = []
+            for k in keys[i:j]:
+                if group and group[-1] == k:  # duplicate inside the batch
+                    stats.append((k, 0, 0))
+                else:
+                    group.append(k)
+                    stats.append((k, 0, 1))
+            stats[len(stats) - (j - i)] = (key, self.nodes_read, 1)
 
+            subtree = self._build_balanced(group, 0, len(group))
+            if parent is None:
+                self.root = subtree
+            elif left:
+                parent.left = subtree
+            else:
+                parent.right = subtree
+
+            total_read += self.nodes_read
+            total_written += len(group)
+            i = j
+
+        self.nodes_read = total_read
+        self.nodes_written = total_written
+        return stats
+
+    def delete_many(self, keys):
+        """
+        Delete a batch of keys in ascending order, every delete goes on from
+        the path shared with the previous key. Returns a
+        (key, nodes_read, nodes_written) tuple per key;
+        nodes_read/nodes_written hold the totals of the batch.
+        """
+        stats = []
+        total_read = total_written = 0
+        path = []
+
+        for key in sorted(keys):
+            self.nodes_read = 0
+            self.nodes_written = 0
+
+            node = self._resume(path, key)
+            if node is not None:
+                path.pop()  # the node is unlinked or gets a new key
+                self._remove(path[-1][0] if path else None, node)
+
+            stats.append((key, self.nodes_read, self.nodes_written))
+            total_read += self.nodes_read
+            total_written += self.nodes_written
+
+        self.nodes_read = total_read
+        self.nodes_written = total_written
+        return stats
+
+    def _resume(self, path, key):
+        # path holds (node, hi) pairs from the root, hi being the exclusive
+        # upper bound of the node's subtree (None when unbounded). Keys come
+        # in ascending order, so the nodes whose subtree ends before key are
+        # dropped and the descent goes on from the deepest one left: only
+        # the nodes below it are read. Returns the node holding key, or None
+        # with the last node visited at the end of path
+        while path and path[-1][1] is not None and key >= path[-1][1]:
+            path.pop()
+        if not path:
+            if self.root is None:
+                return None
+            self.nodes_read += 1
+            path.append((self.root, None))
+
+        node, hi = path[-1]
+        while key != node.key:
+            if key < node.key:
+                child, hi = node.left, node.key
+            else:
+                child = node.right
+            if child is None:
+                return None
+            self.nodes_read += 1
+            node = child
+            path.append((node, hi))
         return node
 
-    def _find_min(self, node):
-        # find min in subtree (successor)
-        while node.left is not None:
-            self.nodes_read += 1  # read each visited node
-            node = node.left
-        self.nodes_read += 1  # read final node
+    def _build_balanced(self, keys, lo, hi):
+        # balanced subtree with the sorted keys[lo:hi], median as root
+        if lo >= hi:
+            return None
+        mid = (lo + hi) // 2
+        node = Node(keys[mid])
+        node.left = self._build_balanced(keys, lo, mid)
+        node.right = self._build_balanced(keys, mid + 1, hi)
         return node
 
+    def _apply_many(self, operation, keys):
+        # batch fallback for trees whose rebalancing moves the shared path
+        return apply_each(self, operation, keys)
+
+    def save(self, path):
+        """
+        Write the tree (64 bit integer keys) to a snapshot file, level by
+        level; snapshot.BSTSnapshot(path) searches it in place with mmap
+        """
+        from snapshot import save_bst
+        save_bst(self, path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Rebuild a tree written by save, without recursion. The shape is
+        kept but not the AVL heights or red-black colors, so the result is
+        always a plain BinarySearchTree.
+        """
+        from snapshot import BSTSnapshot
+        with BSTSnapshot(path) as snapshot:
+            return snapshot.to_tree()
+
+    def freeze(self, layout='eytzinger'):
+        """
+        Copy the keys (64 bit integers) into a read-only
+        staticbst.StaticBinarySearchTree, a pointer-free array in Eytzinger
+        ('eytzinger') or van Emde Boas ('veb') order
+        """
+        from staticbst import StaticBinarySearchTree
+        return StaticBinarySearchTree(self, layout)
+
+    def range(self, lo=None, hi=None, reverse=False):
+        """
+        Lazily yield the keys k with lo <= k < hi in ascending order (or
+        descending with reverse=True); None means unbounded. Only the path
+        to the first key is descended, then the inorder visit goes on with
+        an explicit stack, counting every visited node in nodes_read.
+        The tree must not be modified while the generator is running.
+        """
+        if reverse:
+            return self._range_descending(lo, hi)
+        return self._range_ascending(lo, hi)
+
+    def __iter__(self):
+        return self._range_ascending(None, None)
+
+    def __reversed__(self):
+        return self._range_descending(None, None)
+
+    def _range_ascending(self, lo, hi):
+        self.nodes_read = 0
+        stack = []  # nodes whose key and right subtree are still to visit
+        node = self.root
+
+        while True:
+            # push the path towards the smallest key >= lo
+            while node is not None:
+                self.nodes_read += 1
+                if lo is not None and node.key < lo:
+                    node = node.right  # the whole left subtree is < lo
+                else:
+                    stack.append(node)
+                    node = node.left
+
+            if not stack:
+                return
+            node = stack.pop()
+            if hi is not None and node.key >= hi:
+                return
+            yield node.key
+            node = node.right
+
+    def _range_descending(self, lo, hi):
+        self.nodes_read = 0
+        stack = []  # nodes whose key and left subtree are still to visit
+        node = self.root
+
+        while True:
+            # push the path towards the greatest key < hi
+            while node is not None:
+                self.nodes_read += 1
+                if hi is not None and node.key >= hi:
+                    node = node.left  # the whole right subtree is >= hi
+                else:
+                    stack.append(node)
+                    node = node.right
+
+            if not stack:
+                return
+            node = stack.pop()
+            if lo is not None and node.key < lo:
+                return
+            yield node.key
+            node = node.left
+
     def _print_tree(self, node):
         if node is None:
             return ""
@@ -0,0 +1,356 @@
+from bisect import bisect_left, bisect_right
+
+from batch import apply_each
+from btree import BTree, CompactNodeBT, NodeBT
+
+
+class NodeBP(NodeBT):
+    __slots__ = ('prev', 'next')
+
+    def __init__(self, leaf=False):
+        super().__init__(leaf)
+        self.prev = None  # neighbour leaves, None for internal nodes
+        self.next = None
+
+
+class CompactNodeBP(CompactNodeBT):
+    __slots__ = ('prev', 'next')
+
+    def __init__(self, leaf=False):
+        super().__init__(leaf)
+        self.prev = None
+        self.next = None
+
+
+class BPlusTree:
+    """
+    B+ tree with the API and counters of BTree: every key is stored in a
+    leaf, the leaves form a doubly linked list in key order and the internal
+    nodes only hold separators (the smallest key of the right subtree at
+    the time of the split, a separator may outlive its key). Every node has
+    between t-1 and 2t-1 keys, splits and merges are done preemptively on
+    the way down as in BTree. search, insert and delete always reach a leaf;
+    a range scan descends once and then reads the leaves in sequence.
+    """
+
+    def __init__(self, t, compact=False):
+        self.node_class = CompactNodeBP if compact else NodeBP
+        self.root = self.node_class(True)
+        self.t = t  # minimun tree degree
+        self.nodes_read = 0  # counter read nodes
+        self.nodes_written = 0  # counter written node
+
+    def read_node(self, node):
+        self.nodes_read += 1
+        return node
+
+    def write_node(self, node):
+        self.nodes_written += 1
+
+    @classmethod
+    def from_sorted(cls, iterable, t, fill_factor=1.0, compact=False):
+        """
+        Build the tree bottom-up from keys in ascending order: linked leaves
+        packed with fill_factor * (2t - 1) keys, then the internal levels as
+        in BTree.from_sorted
+        """
+        tree = cls(t, compact)
+        new_node = tree.node_class
+        fill = min(2 * t - 1, max(t - 1, round(fill_factor * (2 * t - 1))))
+
+        leaves = [new_node(True)]
+        last = None
+        for key in iterable:
+            if last is not None and key < last:
+                raise ValueError("keys are not sorted")
+            last = key
+            if len(leaves[-1].keys) == fill:
+                leaf = new_node(True)
+                leaf.prev = leaves[-1]
+                leaves[-1].next = leaf
+                leaves.append(leaf)
+            leaves[-1].keys.append(key)
+
+        if len(leaves) > 1 and len(leaves[-1].keys) < t - 1:
+            # the last leaf shares the keys of its left neighbour (copying a
+            # separator does not consume a key), or is merged into it when
+            # there are not enough keys for both
+            left, right = leaves[-2], leaves[-1]
+            keys = left.keys[:]
+            keys.extend(right.keys)
+            if len(keys) >= 2 * (t - 1):
+                mid = len(keys) // 2
+                left.keys, right.keys = keys[:mid], keys[mid:]
+            else:
+                left.keys = keys
+                left.next = None
+                leaves.pop()
+        seps = [leaf.keys[0] for leaf in leaves[1:]]
+        tree.nodes_written = len(leaves)
+
+        nodes = leaves
+        while len(nodes) > 1:
+            parents = [new_node()]
+            parents[0].children.append(nodes[0])
+            up = []
+            for sep, child in zip(seps, nodes[1:]):
+                if len(parents[-1].keys) == fill:
+                    up.append(sep)
+                    parents.append(new_node())
+                else:
+                    parents[-1].keys.append(sep)
+                parents[-1].children.append(child)
+            BTree._fix_last_node(tree, parents, up)  # same internal levels
+            tree.nodes_written += len(parents)
+            nodes, seps = parents, up
+
+        tree.root = nodes[0]
+        return tree
+
+    # ---- search ------------------------------------------------------------
+
+    def _find_leaf(self, key):
+        node = self.root
+        while not node.leaf:
+            node = self.read_node(node.children[bisect_right(node.keys, key)])
+        return node
+
+    def search(self, key):
+        """
+        Return (leaf, index) of the key, or None
+        """
+        self.nodes_read = 0
+        self.nodes_written = 0
+        leaf = self._find_leaf(key)
+        i = bisect_left(leaf.keys, key)
+        if i < len(leaf.keys) and leaf.keys[i] == key:
+            return leaf, i
+        return None
+
+    # ---- insert ------------------------------------------------------------
+
+    def insert(self, k):
+        # reset counter when we start each new insert operation
+        self.nodes_read = 0
+        self.nodes_written = 0
+        t = self.t
+
+        x = self.root
+        if len(x.keys) == (2 * t) - 1:  # full root: the tree grows by 1
+            new_root = self.node_class()
+            new_root.children.append(x)
+            self.root = new_root
+            self.split_child(new_root, 0)
+            x = new_root
+
+        while not x.leaf:
+            i = bisect_right(x.keys, k)
+            child = self.read_node(x.children[i])
+            if len(child.keys) == (2 * t) - 1:
+                self.split_child(x, i)
+                if k >= x.keys[i]:
+                    i += 1
+            x = x.children[i]
+
+        x.keys.insert(bisect_right(x.keys, k), k)
+        self.write_node(x)
+
+    def split_child(self, x, i):
+        t = self.t
+        y = x.children[i]  # full child of x
+        z = self.node_class(y.leaf)
+
+        if y.leaf:
+            # the right half (t keys) moves to z, its first key is copied up
+            z.keys = y.keys[t - 1:]
+            y.keys = y.keys[:t - 1]
+            x.keys.insert(i, z.keys[0])
+            z.prev, z.next = y, y.next
+            if y.next is not None:
+                y.next.prev = z
+                self.write_node(y.next)
+            y.next = z
+        else:
+            # the median moves up as in BTree
+            x.keys.insert(i, y.keys[t - 1])
+            z.keys = y.keys[t:]
+            y.keys = y.keys[:t - 1]
+            z.children = y.children[t:]
+            y.children = y.children[:t]
+        x.children.insert(i + 1, z)
+
+        self.write_node(y)
+        self.write_node(z)
+        self.write_node(x)
+
+    # ---- delete ------------------------------------------------------------
+
+    def delete(self, x, k):
+        """
+        Delete k from the subtree of x (the root, as for BTree.delete),
+        making sure every child has at least t keys before descending
+        """
+        # reset counters for every new delete operation
+        self.nodes_read = 0
+        self.nodes_written = 0
+        t = self.t
+
+        while not x.leaf:
+            i = bisect_right(x.keys, k)
+            child = self.read_node(x.children[i])
+            if len(child.keys) < t:
+                if i > 0 and len(x.children[i - 1].keys) >= t:
+                    self.read_node(x.children[i - 1])
+                    self.borrow_left(x, i)
+                elif i < len(x.keys) and len(x.children[i + 1].keys) >= t:
+                    self.read_node(x.children[i + 1])
+                    self.borrow_right(x, i)
+                elif i < len(x.keys):
+                    self.read_node(x.children[i + 1])
+                    self.merge(x, i)
+                else:
+                    self.read_node(x.children[i - 1])
+                    self.merge(x, i - 1)
+                    i -= 1
+                if x is self.root and not x.keys:  # the tree shrinks by 1
+                    self.root = x.children[0]
+            x = x.children[i]
+
+        i = bisect_left(x.keys, k)
+        if i < len(x.keys) and x.keys[i] == k:
+            x.keys.pop(i)
+            self.write_node(x)
+
+    def borrow_left(self, x, i):
+        # move one key from children[i-1] to children[i]
+        node, left = x.children[i], x.children[i - 1]
+        if node.leaf:
+            node.keys.insert(0, left.keys.pop())
+            x.keys[i - 1] = node.keys[0]
+        else:
+            node.keys.insert(0, x.keys[i - 1])
+            x.keys[i - 1] = left.keys.pop()
+            node.children.insert(0, left.children.pop())
+        self.write_node(left)
+        self.write_node(node)
+        self.write_node(x)
+
+    def borrow_right(self, x, i):
+        # move one key from children[i+1] to children[i]
+        node, right = x.children[i], x.children[i + 1]
+        if node.leaf:
+            node.keys.append(right.keys.pop(0))
+            x.keys[i] = right.keys[0]
+        else:
+            node.keys.append(x.keys[i])
+            x.keys[i] = right.keys.pop(0)
+            node.children.append(right.children.pop(0))
+        self.write_node(right)
+        self.write_node(node)
+        self.write_node(x)
+
+    def merge(self, x, i):
+        # merge children[i+1] into children[i]; the separator between them is
+        # dropped for leaves and moved down for internal nodes
+        node, right = x.children[i], x.children[i + 1]
+        sep = x.keys.pop(i)
+        x.children.pop(i + 1)
+        if node.leaf:
+            node.keys.extend(right.keys)
+            node.next = right.next
+            if right.next is not None:
+                right.next.prev = node
+                self.write_node(right.next)
+        else:
+            node.keys.append(sep)
+            node.keys.extend(right.keys)
+            node.children.extend(right.children)
+        self.write_node(node)
+        self.write_node(x)
+
+    # ---- batches -----------------------------------------------------------
+
+    def search_many(self, keys):
+        """
+        Search a batch of keys; returns a (key, result, nodes_read) tuple per
+        key and nodes_read holds the total, as BTree.search_many
+        """
+        stats = []
+        total_read = 0
+        for key in sorted(keys):
+            result = self.search(key)
+            stats.append((key, result, self.nodes_read))
+            total_read += self.nodes_read
+        self.nodes_read = total_read
+        return stats
+
+    def insert_many(self, keys):
+        return apply_each(self, self.insert, keys)
+
+    def delete_many(self, keys):
+        return apply_each(self, lambda key: self.delete(self.root, key), keys)
+
+    # ---- range scans -------------------------------------------------------
+
+    def range(self, lo=None, hi=None, reverse=False):
+        """
+        Lazily yield the keys k with lo <= k < hi in ascending order (or
+        descending with reverse=True); None means unbounded. The tree is
+        descended once to the first leaf, then the leaves are read following
+        the sibling links, so nodes_read counts height + k / t nodes.
+        The tree must not be modified while the generator is running.
+        """
+        if reverse:
+            return self._range_descending(lo, hi)
+        return self._range_ascending(lo, hi)
+
+    def __iter__(self):
+        return self._range_ascending(None, None)
+
+    def __reversed__(self):
+        return self._range_descending(None, None)
+
+    def _range_ascending(self, lo, hi):
+        self.nodes_read = 0
+        node = self.root
+        while not node.leaf:
+            i = 0 if lo is None else bisect_right(node.keys, lo)
+            node = self.read_node(node.children[i])
+
+        i = 0 if lo is None else bisect_left(node.keys, lo)
+        while node is not None:
+            for j in range(i, len(node.keys)):
+                if hi is not None and node.keys[j] >= hi:
+                    return
+                yield node.keys[j]
+            node = node.next
+            i = 0
+            if node is not None:
+                self.read_node(node)
+
+    def _range_descending(self, lo, hi):
+        self.nodes_read = 0
+        node = self.root
+        while not node.leaf:
+            i = len(node.keys) if hi is None else bisect_left(node.keys, hi)
+            node = self.read_node(node.children[i])
+
+        i = len(node.keys) if hi is None else bisect_left(node.keys, hi)
+        while node is not None:
+            for j in range(i - 1, -1, -1):
+                if lo is not None and node.keys[j] < lo:
+                    return
+                yield node.keys[j]
+            node = node.prev
+            if node is not None:
+                self.read_node(node)
+                i = len(node.keys)
+
+    def print_tree(self, x, level=0):
+        print(f'Level {level}', end=": ")
+        for key in x.keys:
+            print(key, end=" ")
+        print()
+        level += 1
+        for child in x.children:
+            self.print_tree(child, level)
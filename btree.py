@@ -1,41 +1,191 @@
+from array import array
+from bisect import bisect_left, bisect_right
+
+from externalsort import RUN_SIZE, external_sort
+from tracing import (BORROW, DESCEND, MERGE, READ, ROOT, SPLIT, UPDATE,
+                     WRITE)
+
+
 class NodeBT:
+    __slots__ = ('keys', 'children', 'leaf')  # no per-node __dict__
+
     def __init__(self, leaf=False):
         self.keys = []  # array of keys
         self.children = []  # array of children
         self.leaf = leaf  # boolean attribute
 
 
+class CompactNodeBT(NodeBT):
+    """
+    Node for 64 bit integer keys: the keys are stored unboxed in an
+    array('q') instead of a list of int objects, the array supports every
+    list operation used by BTree (bisect, insert, pop, slices, extend)
+    """
+    __slots__ = ()
+
+    def __init__(self, leaf=False):
+        self.keys = array('q')
+        self.children = []
+        self.leaf = leaf
+
+
 class BTree:
-    def __init__(self, t):
-        self.root = NodeBT(True)
+    def __init__(self, t, compact=False):
+        self.node_class = CompactNodeBT if compact else NodeBT  # node layout
+        self.root = self.node_class(True)
         self.t = t  # minimun tree degree
         self.nodes_read = 0  # counter read nodes
         self.nodes_written = 0  # counter written node
+        self._tracer = None  # tracing.Tracer receiving the node accesses
 
-    def read_node(self, node):
+    def read_node(self, node, cause=DESCEND):
         self.nodes_read += 1
         return node
 
-    def write_node(self, node):
+    def write_node(self, node, cause=UPDATE):
         self.nodes_written += 1
 
+    # ---- tracing -----------------------------------------------------------
+
+    @property
+    def tracer(self):
+        return self._tracer
+
+    @tracer.setter
+    def tracer(self, tracer):
+        # read_node/write_node are only wrapped while a tracer is set, an
+        # untraced tree pays a single test per operation and per delete case
+        if tracer is None and self._tracer is not None:
+            del self.read_node, self.write_node
+        elif tracer is not None:
+            self.read_node = self._traced_read_node
+            self.write_node = self._traced_write_node
+        self._tracer = tracer
+
+    def _traced_read_node(self, node, cause=DESCEND):
+        self._tracer.emit(self, READ, node, cause)
+        return type(self).read_node(self, node, cause)
+
+    def _traced_write_node(self, node, cause=UPDATE):
+        self._tracer.emit(self, WRITE, node, cause)
+        type(self).write_node(self, node, cause)
+
+    def _mark_case(self, case):
+        # delete case (tracing.DELETE_CASES) the following accesses belong to
+        self._tracer.mark(case)
+
+    def _trace_root(self):
+        # the root is kept in memory and not counted in nodes_read, but the
+        # tracer sees its visit
+        self._tracer.emit(self, READ, self.root, ROOT)
+
+    @classmethod
+    def from_sorted(cls, iterable, t, fill_factor=1.0, compact=False):
+        """
+        Build a B tree bottom-up from keys in ascending order, in one linear
+        pass and without any split: leaves are packed with
+        fill_factor * (2t - 1) keys, then every level of internal nodes is
+        packed on top of the previous one
+        """
+        tree = cls(t, compact)
+        new_node = tree.node_class
+        fill = min(2 * t - 1, max(t - 1, round(fill_factor * (2 * t - 1))))
+
+        # leaf level: a full leaf is closed and the next key becomes the
+        # separator between it and the following leaf
+        nodes = [new_node(True)]
+        seps = []
+        last = None
+        for key in iterable:
+            if last is not None and key < last:
+                raise ValueError("keys are not sorted, use from_unsorted")
+            last = key
+            if len(nodes[-1].keys) == fill:
+                seps.append(key)
+                nodes.append(new_node(True))
+            else:
+                nodes[-1].keys.append(key)
+        tree._fix_last_node(nodes, seps)
+        tree.nodes_written = len(nodes)
+
+        # internal levels: every parent takes fill separators and fill + 1
+        # children, the next separator goes up one more level
+        while len(nodes) > 1:
+            parents = [new_node()]
+            parents[0].children.append(nodes[0])
+            up = []
+            for sep, child in zip(seps, nodes[1:]):
+                if len(parents[-1].keys) == fill:
+                    up.append(sep)
+                    parents.append(new_node())
+                else:
+                    parents[-1].keys.append(sep)
+                parents[-1].children.append(child)
+            tree._fix_last_node(parents, up)
+            tree.nodes_written += len(parents)
+            nodes, seps = parents, up
+
+        tree.root = nodes[0]
+        return tree
+
+    @classmethod
+    def from_unsorted(cls, iterable, t, fill_factor=1.0, run_size=RUN_SIZE,
+                      compact=False):
+        """
+        Bulk load keys in any order, sorting them first with an external
+        merge sort (runs of run_size keys are spilled to temporary files)
+        """
+        return cls.from_sorted(external_sort(iterable, run_size), t,
+                               fill_factor, compact)
+
+    def _fix_last_node(self, nodes, seps):
+        # the last node of a packed level may have less than t-1 keys: its
+        # keys are redistributed with the left sibling, or the two nodes are
+        # merged when there are not enough keys for both
+        t = self.t
+        if len(nodes) < 2 or len(nodes[-1].keys) >= t - 1:
+            return
+
+        left, right = nodes[-2], nodes[-1]
+        keys = left.keys[:]  # list or array, depending on the node layout
+        keys.append(seps[-1])
+        keys.extend(right.keys)
+        children = left.children + right.children
+
+        if len(keys) - 1 >= 2 * (t - 1):
+            mid = len(keys) // 2
+            left.keys, seps[-1], right.keys = keys[:mid], keys[mid], keys[mid + 1:]
+            if children:
+                left.children, right.children = children[:mid + 1], children[mid + 1:]
+        else:
+            left.keys = keys
+            left.children = children
+            nodes.pop()
+            seps.pop()
+
     def search(self, key):
         """
         Find the key inside B tree from the root through recursive call
         """
         self.nodes_read = 0  # reset counter when we start a new search
-        return self._search_recursive(self.root, key)
+        self.nodes_written = 0
+        if self._tracer is None:
+            return self._search_recursive(self.root, key)
+        self._tracer.begin('search')
+        result = self._search_recursive(self.root, key)
+        self._tracer.end()
+        return result
 
     def _search_recursive(self, node, key):
 
         # read current node
         if node != self.root:
             self.read_node(node)
+        elif self._tracer is not None:
+            self._trace_root()
 
-        # Find key's position inside the node
-        i = 0
-        while i < len(node.keys) and key > node.keys[i]:
-            i += 1
+        # Find key's position inside the node with a binary search
+        i = bisect_left(node.keys, key)
 
         # key founded, return node with key's index
         if i < len(node.keys) and key == node.keys[i]:
@@ -52,16 +202,22 @@ class BTree:
         # reset counter when we start each new insert operation
         self.nodes_read = 0
         self.nodes_written = 0
-        return self.insert_rec(k)
+        if self._tracer is None:
+            return self.insert_rec(k)
+        self._tracer.begin('insert')
+        self.insert_rec(k)
+        self._tracer.end()
 
     def insert_rec(self, k):  # k: key to insert
         t = self.t
         root = self.root
+        if self._tracer is not None:
+            self._trace_root()
 
         # if root is full, create a new node - tree's height grows by 1
         if len(root.keys) == (2 * t) - 1:  # if the root is full then the tree
             # height must increase
-            new_root = NodeBT()  # a new empty node will be the new root
+            new_root = self.node_class()  # a new empty node will be the new root
             self.root = new_root  # update the reference to the root
             new_root.children.insert(0, root)  # the old root become the first
                                                # new root's child
@@ -89,7 +245,7 @@ class BTree:
         # self.read_node(y)
 
         # create a new node and add it to x's list of children
-        z = NodeBT(y.leaf)  # if y was a leaf then z has to maintain the same
+        z = self.node_class(y.leaf)  # if y was a leaf then z has to maintain the same
                             # state
 
         x.children.insert(i + 1, z)  # we have to append a new child to the x's
@@ -111,35 +267,25 @@ class BTree:
             y.children = y.children[0: t]  # y's children placed at the left of
                                            # median key remain in y
 
-        self.write_node(y)
-        self.read_node(z)
-        self.write_node(x)
+        self.write_node(y, SPLIT)
+        self.read_node(z, SPLIT)
+        self.write_node(x, SPLIT)
 
     def insert_non_full(self, x, k):
         t = self.t
-        i = len(x.keys) - 1  # i is equal to the index of the last key of x, in
-                             # order to move backward for founding the correct
-                             # spot of insert
 
         # self.read_node(x)
 
         # find the correct spot in the leaf to insert the key
         if x.leaf:
-            x.keys.append(None)  # append a null spot for the new key
-            while i >= 0 and k < x.keys[i]: # we move backward
-                x.keys[i + 1] = x.keys[i]  # moving current key one spot to the
-                                           # right to make room for k
-                i -= 1  # moving backward
-            x.keys[i + 1] = k  # assign k to the correct spot
-
+            x.keys.insert(bisect_right(x.keys, k), k)  # binary search of the
+                                                       # spot, the greater keys
+                                                       # are shifted in one move
             self.write_node(x)
 
         # if x is not a leaf, find the correct subtree to insert the key
         else:
-            while i >= 0 and k < x.keys[i]:
-                i -= 1
-            i += 1  # increase i in order to obtain correct index that reference
-                    # the child where go down
+            i = bisect_right(x.keys, k)  # index of the child where go down
 
             self.read_node(x.children[i])
 
@@ -147,7 +293,7 @@ class BTree:
             if len(x.children[i].keys) == (2 * t) - 1:
                 self.split_child(x, i)  # this method move the median key in x,
                                         # then divide the child
-                self.write_node(x.children[i])
+                self.write_node(x.children[i], SPLIT)
                 if k > x.keys[i]:  # after division, if the k is greater than
                                    # median key just added in x, the insert must
                                    # go on the right subtree
@@ -160,21 +306,26 @@ class BTree:
         # reset counters for every new delete operation
         self.nodes_read = 0
         self.nodes_written = 0
+        if self._tracer is None:
+            return self.delete_rec(x, k)
+        self._tracer.begin('delete')
         self.delete_rec(x, k)
+        self._tracer.end()
 
     def delete_rec(self, x, k):  # k: key to delete
         t = self.t
-        i = 0  # index used to scan x's keys
 
         if x != self.root:
             self.read_node(x)
+        elif self._tracer is not None:
+            self._trace_root()
 
-        while i < len(x.keys) and x.keys[i] is not None and k > x.keys[i]:
-            # scan keys to find k's position
-            i += 1
+        i = bisect_left(x.keys, k)  # k's position inside x
 
         if x.leaf:  # case 1: deleting key from a leaf
                     # (means that I have achived lower level of the tree)
+            if self._tracer is not None:
+                self._mark_case('1')
             self.write_node(x)
             if i < len(x.keys) and x.keys[i] == k:
                 x.keys.pop(i)  # delete k directly from leaf node
@@ -184,38 +335,56 @@ class BTree:
         if i < len(x.keys) and x.keys[i] == k:  # case 2: delete from internal node
             return self.delete_internal_node(x, k, i)
 
-        # case 3a: child has enough keys to avoid deficit
+        # case 3: child has enough keys to avoid deficit
         elif i < len(x.children) and len(x.children[i].keys) >= t:
+            if self._tracer is not None:
+                self._mark_case('3')
             self.delete_rec(x.children[i], k)
 
-        else:  # rebalancing child node with siblings
+        else:  # rebalancing child node with siblings (case 3a: borrow a key,
+               # case 3b: merge)
             if 0 < i < len(x.children) - 1: # or in ohter word
                                             # i > 0 and i < len(x.children) - 1:
                 if len(x.children[i - 1].keys) >= t:  # rebalance with left sibling
-                    self.read_node(x.children[i - 1])
+                    if self._tracer is not None:
+                        self._mark_case('3a')
+                    self.read_node(x.children[i - 1], BORROW)
                     self.delete_sibling(x, i, i - 1)
                 elif len(x.children[i + 1].keys) >= t:  # rebalance with right sibling
-                    self.read_node(x.children[i + 1])
+                    if self._tracer is not None:
+                        self._mark_case('3a')
+                    self.read_node(x.children[i + 1], BORROW)
                     self.delete_sibling(x, i, i + 1)
                 else:  # if neither sibling has enough keys
-                    self.read_node(x.children[i + 1])
+                    if self._tracer is not None:
+                        self._mark_case('3b')
+                    self.read_node(x.children[i + 1], MERGE)
                     self.delete_merge(x, i, i + 1)
 
             elif i == 0:  # rebalance with right sibling if i is the first child
                 if len(x.children[i + 1].keys) >= t:
-                    self.read_node(x.children[i + 1])
+                    if self._tracer is not None:
+                        self._mark_case('3a')
+                    self.read_node(x.children[i + 1], BORROW)
                     self.delete_sibling(x, i, i + 1)
                 else:
-                    self.read_node(x.children[i + 1])
+                    if self._tracer is not None:
+                        self._mark_case('3b')
+                    self.read_node(x.children[i + 1], MERGE)
                     self.delete_merge(x, i, i + 1)
 
             elif i == len(x.children) - 1:  # rebalance with left sibling if i is last child
                 if len(x.children[i - 1].keys) >= t:
-                    self.read_node(x.children[i - 1])
+                    if self._tracer is not None:
+                        self._mark_case('3a')
+                    self.read_node(x.children[i - 1], BORROW)
                     self.delete_sibling(x, i, i - 1)
                 else:
-                    self.read_node(x.children[i - 1])
+                    if self._tracer is not None:
+                        self._mark_case('3b')
+                    self.read_node(x.children[i - 1], MERGE)
                     self.delete_merge(x, i, i - 1)
+                    i -= 1  # the child has been fused into its left sibling
 
             # Recursive delete on child node after rebalancing
             if i < len(x.children):  # Check if child index is still valid
@@ -235,6 +404,8 @@ class BTree:
 
             # substitute k with predecessor key, i.e. the greater key of left
             # subtree
+            if self._tracer is not None:
+                self._mark_case('2a')
             self.read_node(x.children[i])
             x.keys[i] = self.delete_predecessor(x.children[i])
             self.write_node(x)
@@ -245,12 +416,16 @@ class BTree:
 
             # substitute k with successor key, i.e. the minor key of right
             # subtree
-            self.read_node(x.children[i])
+            if self._tracer is not None:
+                self._mark_case('2b')
+            self.read_node(x.children[i + 1])
             x.keys[i] = self.delete_successor(x.children[i + 1])
             self.write_node(x)
             return
 
         else:  # case 2c: both child have t-1 keys
+            if self._tracer is not None:
+                self._mark_case('2c')
             self.delete_merge(x, i, i + 1)  # unite the two child
             self.delete_internal_node(x.children[i], k, self.t - 1)
 
@@ -262,19 +437,22 @@ class BTree:
             return x.keys.pop()  # if x is a leaf then predecessor is the last
                                  # element of array keys
 
-        n = len(x.keys) - 1  # n is the index of the last key in x (the greater
-                             # key of the node)
+        n = len(x.keys)  # n is the index of the last child of x, the one
+                         # that contains the greater key
         self.read_node(x.children[n])
-        if len(x.children[n].keys) >= self.t:  # if right child of x has at least
-                                               # t keys
-
-            self.delete_sibling(x, n + 1, n)  # then we can borrow a key from
-                                              # sibling and balance the tree
-        else:  # the sibling has no sufficient keys to balance
-            self.delete_merge(x, n, n + 1)  # hence we have to union the two
-                                            # children
-
-        self.delete_predecessor(x.children[n])  # recursive call
+        if len(x.children[n].keys) < self.t:  # the last child could not lose a
+                                              # key without rebalancing
+            self.read_node(x.children[n - 1], BORROW)
+            if len(x.children[n - 1].keys) >= self.t:  # if its left sibling
+                                                       # has at least t keys
+                self.delete_sibling(x, n, n - 1)  # then we can borrow a key
+                                                  # from it
+            else:  # the sibling has no sufficient keys to balance
+                self.delete_merge(x, n - 1, n)  # hence we have to union the
+                                                # two children
+                n -= 1
+
+        return self.delete_predecessor(x.children[n])  # recursive call
 
     def delete_successor(self, x):  # this method remove and return the
                                     # successor of x, i.e. the minor key of the
@@ -284,43 +462,36 @@ class BTree:
             return x.keys.pop(0)  # if x is leaf node, then successor is simply
                                   # the minor key of x
 
-        self.read_node(x.children[1])
-        if len(x.children[1].keys) >= self.t:  # if the left child of x (that
-                                               # contains his successor) has at
-                                               # least t keys
-            self.delete_sibling(x, 0, 1)  # then we have to balance x with left
-                                          # sibling
+        self.read_node(x.children[0])
+        if len(x.children[0].keys) < self.t:  # the first child of x (that
+                                              # contains the successor) could
+                                              # not lose a key
+            self.read_node(x.children[1], BORROW)
+            if len(x.children[1].keys) >= self.t:  # if its right sibling has
+                                                   # at least t keys
+                self.delete_sibling(x, 0, 1)  # then we borrow a key from it
 
-        else:  # if the left child has no enough keys
-            self.delete_merge(x, 0, 1)  # union of the two children
+            else:  # if the sibling has no enough keys
+                self.delete_merge(x, 0, 1)  # union of the two children
 
-        self.read_node(x.children[0])
-        self.delete_successor(x.children[0])  # recursive call
+        return self.delete_successor(x.children[0])  # recursive call
 
     # this following method is used to fusion two children nodes (i,j) of x when one or
     # both have minus of t-1 keys. This fusion is necessarily in order to
     # preserve structural properties of b-tree
     def delete_merge(self, x, i, j):
         cnode = x.children[i]  # left child of x
-        self.write_node(x.children[i])
-        self.write_node(x.children[j])
+        self.write_node(x.children[i], MERGE)
+        self.write_node(x.children[j], MERGE)
 
         if j > i:  # then i is the left child of x and j is the right child
             rsnode = x.children[j]  # right child of x
             cnode.keys.append(x.keys[i])
 
-            for k in range(len(rsnode.keys)):  # scan all right child's keys
-                cnode.keys.append(rsnode.keys[k])  # add every key of right child
-                                                   # to left child
-                if len(rsnode.children) > 0:  # verify if right child has child,
-                                              # i.e. it is not a leaf
-                    cnode.children.append(rsnode.children[k])  # if true then
-                                                               # we add every
-                                                               # child to left
-                                                               # child
-            if len(rsnode.children) > 0:
-                # last child of right child j become last child of left child i
-                cnode.children.append(rsnode.children.pop())
+            cnode.keys.extend(rsnode.keys)  # add every key of right child to
+                                            # left child in one slice move
+            cnode.children.extend(rsnode.children)  # the same for the children
+                                                    # (nothing for a leaf)
 
             new = cnode  # new fusion node
             x.keys.pop(i)  # key that is moved to left child it is removed from
@@ -332,12 +503,8 @@ class BTree:
                # symmetric to the previous block
             lsnode = x.children[j]
             lsnode.keys.append(x.keys[j])
-            for i in range(len(cnode.keys)):
-                lsnode.keys.append(cnode.keys[i])
-                if len(lsnode.children) > 0:
-                    lsnode.children.append(cnode.children[i])
-            if len(lsnode.children) > 0:
-                lsnode.children.append(cnode.children.pop())
+            lsnode.keys.extend(cnode.keys)
+            lsnode.children.extend(cnode.children)
             new = lsnode
             x.keys.pop(j)
             x.children.pop(i)
@@ -353,8 +520,8 @@ class BTree:
                                         # j: index of the child of x that borrows
                                         #    a key
         cnode = x.children[i]  # cnode now needs a key
-        self.write_node(x.children[i])
-        self.write_node(x.children[j])
+        self.write_node(x.children[i], BORROW)
+        self.write_node(x.children[j], BORROW)
 
         if i < j:  # then j node is on the right respect child i
             rsnode = x.children[j]  # rsnode reference to right sibling
@@ -384,6 +551,277 @@ class BTree:
             if len(lsnode.children) > 0:
                 cnode.children.insert(0, lsnode.children.pop())
 
+    def search_many(self, keys):
+        """
+        Search a batch of keys in ascending order sharing the root-to-leaf
+        path between adjacent keys: the nodes of the path kept from the
+        previous key are not read again. Returns a (key, result, nodes_read)
+        tuple per key, result as returned by search; nodes_read holds the
+        total of the batch.
+        """
+        stats = []
+        total_read = 0
+        path = []
+
+        for key in sorted(keys):
+            self.nodes_read = 0
+            del path[max(1, self._shared_path(path, key, bisect_left)):]
+            if not path or path[0] is not self.root:
+                path[:] = [self.root]
+
+            node = path[-1]
+            while True:
+                i = bisect_left(node.keys, key)
+                if i < len(node.keys) and node.keys[i] == key:
+                    result = node, i
+                    break
+                if node.leaf:
+                    result = None
+                    break
+                node = self.read_node(node.children[i])
+                path.append(node)
+
+            stats.append((key, result, self.nodes_read))
+            total_read += self.nodes_read
+
+        self.nodes_read = total_read
+        self.nodes_written = 0
+        return stats
+
+    def insert_many(self, keys):
+        """
+        Insert a batch of keys in ascending order. Every insert restarts from
+        the deepest non full node of the path shared with the previous key
+        instead of the root. Returns a (key, nodes_read, nodes_written) tuple
+        per key; nodes_read/nodes_written hold the totals of the batch.
+        """
+        t = self.t
+        stats = []
+        total_read = total_written = 0
+        path = []
+
+        for key in sorted(keys):
+            self.nodes_read = 0
+            self.nodes_written = 0
+            shared = self._shared_path(path, key, bisect_right)
+
+            r = shared - 1  # deepest shared node that can take one more key
+            while r >= 0 and len(path[r].keys) == (2 * t) - 1:
+                r -= 1
+            if r < 0:  # no shared path or full root: insert from the root
+                self.insert_rec(key)
+                path = [self.root]
+            else:
+                self.insert_non_full(path[r], key)
+                # the descent read again the shared nodes below path[r]
+                self.nodes_read -= shared - 1 - r
+                del path[r + 1:]
+
+            # keep the path to the new key; these nodes are in memory
+            node = path[-1]
+            while not node.leaf:
+                node = node.children[bisect_right(node.keys, key)]
+                path.append(node)
+
+            stats.append((key, self.nodes_read, self.nodes_written))
+            total_read += self.nodes_read
+            total_written += self.nodes_written
+
+        self.nodes_read = total_read
+        self.nodes_written = total_written
+        return stats
+
+    def delete_many(self, keys):
+        """
+        Delete a batch of keys in ascending order. Every delete restarts from
+        the deepest node with at least t keys on the path shared with the
+        previous key instead of the root. Returns a
+        (key, nodes_read, nodes_written) tuple per key;
+        nodes_read/nodes_written hold the totals of the batch.
+        """
+        t = self.t
+        stats = []
+        total_read = total_written = 0
+        path = []
+
+        for key in sorted(keys):
+            self.nodes_read = 0
+            self.nodes_written = 0
+            shared = self._shared_path(path, key, bisect_left)
+
+            r = shared - 1  # deepest shared node that can lose a key
+            while r > 0 and len(path[r].keys) < t:
+                r -= 1
+            if r <= 0:
+                self.delete_rec(self.root, key)
+                path = [self.root]
+            else:
+                self.delete_rec(path[r], key)
+                self.nodes_read -= 1  # path[r] was already in memory
+                del path[r + 1:]
+
+            node = path[-1]
+            while not node.leaf:
+                i = bisect_left(node.keys, key)
+                if i < len(node.keys) and node.keys[i] == key:
+                    break
+                node = node.children[i]
+                path.append(node)
+
+            stats.append((key, self.nodes_read, self.nodes_written))
+            total_read += self.nodes_read
+            total_written += self.nodes_written
+
+        self.nodes_read = total_read
+        self.nodes_written = total_written
+        return stats
+
+    def _shared_path(self, path, key, find):
+        # number of nodes at the top of the path kept from the previous key
+        # that are also on the path of key (find is bisect_left for search
+        # and delete, bisect_right for insert)
+        if not path or path[0] is not self.root:
+            return 0
+        for level, node in enumerate(path):
+            if node.leaf or level + 1 == len(path):
+                return level + 1
+            i = find(node.keys, key)
+            if find is bisect_left and i < len(node.keys) and node.keys[i] == key:
+                return level + 1
+            if node.children[i] is not path[level + 1]:
+                return level + 1
+
+    def save(self, path):
+        """
+        Write the tree (64 bit integer keys) to a snapshot file, level by
+        level; snapshot.BTreeSnapshot(path) searches it in place with mmap
+        """
+        from snapshot import save_btree
+        save_btree(self, path)
+
+    @classmethod
+    def load(cls, path, compact=False):
+        """
+        Rebuild a tree written by save, without recursion
+        """
+        from snapshot import BTreeSnapshot
+        with BTreeSnapshot(path) as snapshot:
+            return snapshot.to_tree(cls, compact)
+
+    def freeze(self):
+        """
+        Compile the tree into a read-only frozenbtree.FrozenBTree, one NumPy
+        array of keys per level, searched in batches with np.searchsorted
+        """
+        from frozenbtree import FrozenBTree  # only this needs numpy
+        return FrozenBTree(self)
+
+    def range(self, lo=None, hi=None, reverse=False):
+        """
+        Lazily yield the keys k with lo <= k < hi in ascending order (or
+        descending with reverse=True); None means unbounded. The tree is
+        descended once to the first key, then the keys are streamed with an
+        explicit stack, so nodes_read counts O(log n + k / t) nodes.
+        The tree must not be modified while the generator is running.
+        """
+        if reverse:
+            return self._range_descending(lo, hi)
+        return self._range_ascending(lo, hi)
+
+    def __iter__(self):
+        return self._range_ascending(None, None)
+
+    def __reversed__(self):
+        return self._range_descending(None, None)
+
+    def _range_ascending(self, lo, hi):
+        self.nodes_read = 0
+
+        # every frame is [node, i]: the keys before i and the subtrees up to
+        # children[i] have already been handled
+        stack = []
+        node = self.root
+        while True:
+            i = 0 if lo is None else bisect_left(node.keys, lo)
+            stack.append([node, i])
+            if node.leaf:
+                break
+            node = self.read_node(node.children[i])
+
+        while stack:
+            frame = stack[-1]
+            node, i = frame
+
+            if node.leaf:
+                stack.pop()
+                for j in range(i, len(node.keys)):
+                    if hi is not None and node.keys[j] >= hi:
+                        return
+                    yield node.keys[j]
+                continue
+
+            if i == len(node.keys):
+                stack.pop()
+                continue
+
+            key = node.keys[i]
+            if hi is not None and key >= hi:
+                return
+            yield key
+
+            # go on with the leftmost path of the next subtree
+            frame[1] = i + 1
+            child = self.read_node(node.children[i + 1])
+            while True:
+                stack.append([child, 0])
+                if child.leaf:
+                    break
+                child = self.read_node(child.children[0])
+
+    def _range_descending(self, lo, hi):
+        self.nodes_read = 0
+
+        # every frame is [node, i]: i is the next key to yield going left,
+        # the subtrees after children[i + 1] have already been handled
+        stack = []
+        node = self.root
+        while True:
+            i = len(node.keys) if hi is None else bisect_left(node.keys, hi)
+            stack.append([node, i - 1])
+            if node.leaf:
+                break
+            node = self.read_node(node.children[i])
+
+        while stack:
+            frame = stack[-1]
+            node, i = frame
+
+            if node.leaf:
+                stack.pop()
+                for j in range(i, -1, -1):
+                    if lo is not None and node.keys[j] < lo:
+                        return
+                    yield node.keys[j]
+                continue
+
+            if i < 0:
+                stack.pop()
+                continue
+
+            key = node.keys[i]
+            if lo is not None and key < lo:
+                return
+            yield key
+
+            # go on with the rightmost path of the previous subtree
+            frame[1] = i - 1
+            child = self.read_node(node.children[i])
+            while True:
+                stack.append([child, len(child.keys) - 1])
+                if child.leaf:
+                    break
+                child = self.read_node(child.children[-1])
+
     def print_tree(self, x, level=0):
         print(f'Level {level}', end=": ")
 
@@ -0,0 +1,178 @@
+from collections import OrderedDict
+
+
+class LRUPolicy:
+    """
+    Replacement policy of a BufferPool: it tracks the evictable pages and
+    picks the victims. admit is called when a page enters the pool, access
+    on every hit, victim when the pool is over capacity (the victim is
+    forgotten) and remove when a page leaves the pool for another reason.
+
+    LRU evicts the least recently used page.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.pages = OrderedDict()  # least recently used first
+
+    def __len__(self):
+        return len(self.pages)
+
+    def admit(self, pid):
+        self.pages[pid] = None
+
+    def access(self, pid):
+        self.pages.move_to_end(pid)
+
+    def victim(self):
+        return self.pages.popitem(last=False)[0]
+
+    def remove(self, pid):
+        self.pages.pop(pid, None)
+
+
+class ClockPolicy(LRUPolicy):
+    """
+    CLOCK (second chance): a hit only sets the reference bit of the page,
+    the hand sweeps the pages in admission order, clearing the set bits and
+    evicting the first page found with a clear bit
+    """
+
+    def admit(self, pid):
+        self.pages[pid] = False  # reference bit
+
+    def access(self, pid):
+        self.pages[pid] = True
+
+    def victim(self):
+        while True:
+            pid, referenced = self.pages.popitem(last=False)  # under the hand
+            if not referenced:
+                return pid
+            self.pages[pid] = False  # second chance, the hand moves on
+
+
+class TwoQueuePolicy:
+    """
+    2Q (Johnson and Shasha): a new page enters the FIFO a1in and is evicted
+    from it without polluting the main LRU am; it is only admitted to am if
+    it is requested again while its id is remembered in the ghost FIFO
+    a1out. A scan therefore cannot flush the hot pages.
+    """
+
+    def __init__(self, capacity, in_ratio=0.25, out_ratio=0.5):
+        self.capacity = capacity
+        self.in_size = max(1, int(in_ratio * capacity))  # target size of a1in
+        self.out_size = max(1, int(out_ratio * capacity))  # ghosts kept
+        self.a1in = OrderedDict()  # resident, first admitted first
+        self.a1out = OrderedDict()  # ghosts, ids only
+        self.am = OrderedDict()  # resident, least recently used first
+
+    def __len__(self):
+        return len(self.a1in) + len(self.am)
+
+    def admit(self, pid):
+        if pid in self.a1out:  # requested again while remembered
+            del self.a1out[pid]
+            self.am[pid] = None
+        else:
+            self.a1in[pid] = None
+
+    def access(self, pid):
+        if pid in self.am:
+            self.am.move_to_end(pid)
+        # a hit in a1in does not promote the page (correlated references)
+
+    def victim(self):
+        if len(self.a1in) > self.in_size or not self.am:
+            pid = self.a1in.popitem(last=False)[0]
+            self.a1out[pid] = None
+            if len(self.a1out) > self.out_size:
+                self.a1out.popitem(last=False)
+            return pid
+        return self.am.popitem(last=False)[0]
+
+    def remove(self, pid):
+        self.a1in.pop(pid, None)
+        self.am.pop(pid, None)
+        self.a1out.pop(pid, None)
+
+
+class ARCPolicy:
+    """
+    ARC (Megiddo and Modha): t1 holds the pages seen once recently, t2 the
+    pages seen at least twice, b1 and b2 the ids of the pages evicted from
+    them. A request of a ghost of b1 (b2) moves the target size p of t1 up
+    (down), so the split between recency and frequency adapts to the
+    workload.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.p = 0  # target size of t1
+        self.t1 = OrderedDict()  # all four lists: least recent first
+        self.t2 = OrderedDict()
+        self.b1 = OrderedDict()
+        self.b2 = OrderedDict()
+
+    def __len__(self):
+        return len(self.t1) + len(self.t2)
+
+    def admit(self, pid):
+        c = self.capacity
+        if pid in self.b1:  # recency was worth more: grow t1
+            self.p = min(c, self.p + max(len(self.b2) // len(self.b1), 1))
+            del self.b1[pid]
+            self.t2[pid] = None
+        elif pid in self.b2:  # frequency was worth more: shrink t1
+            self.p = max(0, self.p - max(len(self.b1) // len(self.b2), 1))
+            del self.b2[pid]
+            self.t2[pid] = None
+        else:
+            self.t1[pid] = None
+            self._trim()
+
+    def access(self, pid):
+        if pid in self.t1:
+            del self.t1[pid]
+            self.t2[pid] = None
+        else:
+            self.t2.move_to_end(pid)
+
+    def victim(self):
+        if self.t1 and (len(self.t1) > self.p or not self.t2):
+            pid = self.t1.popitem(last=False)[0]
+            self.b1[pid] = None
+        else:
+            pid = self.t2.popitem(last=False)[0]
+            self.b2[pid] = None
+        self._trim()
+        return pid
+
+    def _trim(self):
+        # the ghosts are forgotten so that t1 + b1 holds at most c pages and
+        # the four lists at most 2c
+        c = self.capacity
+        while len(self.t1) + len(self.b1) > c and self.b1:
+            self.b1.popitem(last=False)
+        while len(self) + len(self.b1) + len(self.b2) > 2 * c and self.b2:
+            self.b2.popitem(last=False)
+
+    def remove(self, pid):
+        for pages in (self.t1, self.t2, self.b1, self.b2):
+            pages.pop(pid, None)
+
+
+POLICIES = {
+    'lru': LRUPolicy,
+    'clock': ClockPolicy,
+    '2q': TwoQueuePolicy,
+    'arc': ARCPolicy,
+}
+
+
+def make_policy(name, capacity):
+    if name not in POLICIES:
+        raise ValueError(f"unknown eviction policy {name!r}, choose one of "
+                         f"{', '.join(POLICIES)}")
+    return POLICIES[name](capacity)
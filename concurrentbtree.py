@@ -0,0 +1,391 @@
+import threading
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+
+from btree import BTree, CompactNodeBT, NodeBT
+from tracing import DESCEND, UPDATE
+
+# nodes read and written by one operation, returned by every call of
+# ConcurrentBTree instead of being shared through the tree
+OpStats = namedtuple('OpStats', ('nodes_read', 'nodes_written'))
+
+
+class RWLatch:
+    """
+    Reader-writer latch: any number of readers or a single writer. Waiting
+    writers block new readers, so a stream of lookups cannot starve the
+    writers.
+    """
+    __slots__ = ('_cond', '_readers', '_writer', '_writers_waiting')
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    def acquire_read(self):
+        with self._cond:
+            while self._writer or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+
+    def release_read(self):
+        with self._cond:
+            self._readers -= 1
+            if self._readers == 0:
+                self._cond.notify_all()
+
+    def acquire_write(self):
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writer = True
+
+    def release_write(self):
+        with self._cond:
+            self._writer = False
+            self._cond.notify_all()
+
+
+class LatchedNodeBT(NodeBT):
+    __slots__ = ('latch',)
+
+    def __init__(self, leaf=False):
+        super().__init__(leaf)
+        self.latch = RWLatch()
+
+
+class LatchedCompactNodeBT(CompactNodeBT):
+    __slots__ = ('latch',)
+
+    def __init__(self, leaf=False):
+        super().__init__(leaf)
+        self.latch = RWLatch()
+
+
+class ConcurrentBTree(BTree):
+    """
+    BTree that can be shared by many threads. Every node has a reader-writer
+    latch and the operations crab down the tree: the latch of a child is
+    taken before the one of its parent is released, and a parent is only
+    released once the child is safe (insert: the child is not full, delete:
+    the child has at least t keys), so no change can propagate above it.
+    self.root is guarded by root_latch.
+
+    search takes read latches only. insert and delete first try an
+    optimistic descent with read latches and a write latch on the leaf; when
+    the leaf would have to split or rebalance (or the key to delete sits in
+    an internal node) they restart with write latches from the root, with
+    the preemptive split/merge of BTree.
+
+    The counters are kept per thread: every call returns its own OpStats
+    (nodes read and written, including a failed optimistic descent) and
+    nodes_read/nodes_written read the last operation of the calling thread.
+    delete takes only the key. The batch and range methods inherited from
+    BTree take no latches and need exclusive access to the tree. The node
+    accesses are not traced (a Tracer follows a single operation at a time).
+    """
+
+    def __init__(self, t, compact=False):
+        self._local = threading.local()  # counters of the calling thread
+        super().__init__(t, compact)
+        self.node_class = LatchedCompactNodeBT if compact else LatchedNodeBT
+        self.root = self.node_class(True)
+        self.root_latch = RWLatch()
+
+    @property
+    def nodes_read(self):
+        return getattr(self._local, 'nodes_read', 0)
+
+    @nodes_read.setter
+    def nodes_read(self, value):
+        self._local.nodes_read = value
+
+    @property
+    def nodes_written(self):
+        return getattr(self._local, 'nodes_written', 0)
+
+    @nodes_written.setter
+    def nodes_written(self, value):
+        self._local.nodes_written = value
+
+    def read_node(self, node, cause=DESCEND):
+        self._local.nodes_read += 1
+        return node
+
+    def write_node(self, node, cause=UPDATE):
+        self._local.nodes_written += 1
+
+    def _start(self):
+        self._local.nodes_read = 0
+        self._local.nodes_written = 0
+
+    def _stats(self):
+        return OpStats(self._local.nodes_read, self._local.nodes_written)
+
+    def _latch_root(self, leaf_write):
+        # latch the root in read mode, or in write mode when it is a leaf and
+        # leaf_write is set; root_latch is held until the root node latch is
+        # taken, so the root cannot be replaced in between
+        self.root_latch.acquire_read()
+        node = self.root
+        if leaf_write and node.leaf:
+            node.latch.acquire_write()
+        else:
+            node.latch.acquire_read()
+        self.root_latch.release_read()
+        return node
+
+    def search(self, key):
+        """
+        Returns (found, OpStats)
+        """
+        self._start()
+        node = self._latch_root(False)
+
+        while True:
+            i = bisect_left(node.keys, key)
+            if i < len(node.keys) and key == node.keys[i]:
+                found = True
+                break
+            if node.leaf:
+                found = False
+                break
+            child = node.children[i]
+            child.latch.acquire_read()
+            node.latch.release_read()
+            node = self.read_node(child)
+
+        node.latch.release_read()
+        return found, self._stats()
+
+    def _descend_optimistic(self, key, find):
+        # crab down with read latches to the leaf of key, which is latched in
+        # write mode; returns None (nothing latched) when find(node, key)
+        # says the operation needs a node above the leaf
+        node = self._latch_root(True)
+        while not node.leaf:
+            if find(node, key):
+                node.latch.release_read()
+                return None
+            child = node.children[bisect_right(node.keys, key)]
+            if child.leaf:  # a node never changes from leaf to internal
+                child.latch.acquire_write()
+            else:
+                child.latch.acquire_read()
+            node.latch.release_read()
+            node = self.read_node(child)
+        return node
+
+    def insert(self, k):
+        """
+        Returns OpStats
+        """
+        self._start()
+        t = self.t
+
+        leaf = self._descend_optimistic(k, lambda node, key: False)
+        if len(leaf.keys) < (2 * t) - 1:  # no split needed
+            leaf.keys.insert(bisect_right(leaf.keys, k), k)
+            self.write_node(leaf)
+            leaf.latch.release_write()
+            return self._stats()
+        leaf.latch.release_write()
+
+        # pessimistic descent, splitting the full nodes on the way down
+        self.root_latch.acquire_write()
+        x = self.root
+        x.latch.acquire_write()
+        if len(x.keys) == (2 * t) - 1:  # the tree grows by one level
+            new_root = self.node_class()
+            new_root.latch.acquire_write()
+            new_root.children.append(x)
+            self.root = new_root
+            self.split_child(new_root, 0)
+            x.latch.release_write()
+            x = new_root
+        self.root_latch.release_write()  # x is not full: the root stays
+
+        while not x.leaf:
+            i = bisect_right(x.keys, k)
+            child = x.children[i]
+            child.latch.acquire_write()
+            self.read_node(child)
+            if len(child.keys) == (2 * t) - 1:
+                self.split_child(x, i)  # the new sibling is only reachable
+                                        # through x, which is latched
+                self.write_node(x.children[i])
+                if k > x.keys[i]:
+                    child.latch.release_write()
+                    child = x.children[i + 1]
+                    child.latch.acquire_write()
+            x.latch.release_write()
+            x = child
+
+        x.keys.insert(bisect_right(x.keys, k), k)
+        self.write_node(x)
+        x.latch.release_write()
+        return self._stats()
+
+    def delete(self, k):
+        """
+        Returns OpStats
+        """
+        self._start()
+
+        def in_node(node, key):
+            i = bisect_left(node.keys, key)
+            return i < len(node.keys) and node.keys[i] == key
+
+        leaf = self._descend_optimistic(k, in_node)
+        if leaf is not None:
+            if len(leaf.keys) >= self.t or leaf is self.root:
+                # the leaf can lose a key without rebalancing (a leaf root
+                # stays the root while it is latched)
+                self.write_node(leaf)
+                i = bisect_left(leaf.keys, k)
+                if i < len(leaf.keys) and leaf.keys[i] == k:
+                    leaf.keys.pop(i)
+                leaf.latch.release_write()
+                return self._stats()
+            leaf.latch.release_write()
+
+        # pessimistic descent: root_latch is held as long as the latched node
+        # is the root, since merging its children can replace it
+        self.root_latch.acquire_write()
+        x = self.root
+        x.latch.acquire_write()
+        read, root_latched = False, True  # the root is not counted as read
+        while x is not None:
+            if read:
+                self.read_node(x)
+            x, read = self._delete_step(x, k)
+            if root_latched and x is not self.root:
+                self.root_latch.release_write()
+                root_latched = False
+        if root_latched:
+            self.root_latch.release_write()
+        return self._stats()
+
+    def _delete_step(self, x, k):
+        # delete k below the write latched node x, as BTree.delete_rec does
+        # for one level; returns the next node (write latched) and whether it
+        # is counted as read, x is released
+        t = self.t
+        i = bisect_left(x.keys, k)
+
+        if x.leaf:  # case 1
+            self.write_node(x)
+            if i < len(x.keys) and x.keys[i] == k:
+                x.keys.pop(i)
+            x.latch.release_write()
+            return None, False
+
+        if i < len(x.keys) and x.keys[i] == k:  # case 2
+            y = x.children[i]
+            y.latch.acquire_write()
+            if len(y.keys) >= t:  # 2a: replace k with its predecessor
+                self.read_node(y)
+                x.keys[i] = self._delete_max(y)
+                self.write_node(x)
+                x.latch.release_write()
+                return None, False
+            z = x.children[i + 1]
+            z.latch.acquire_write()
+            if len(z.keys) >= t:  # 2b: replace k with its successor
+                y.latch.release_write()
+                self.read_node(z)
+                x.keys[i] = self._delete_min(z)
+                self.write_node(x)
+                x.latch.release_write()
+                return None, False
+            self.delete_merge(x, i, i + 1)  # 2c: k goes down with the merge
+            z.latch.release_write()
+            x.latch.release_write()
+            return y, False
+
+        # case 3: make sure the child has at least t keys before descending
+        child = x.children[i]
+        child.latch.acquire_write()
+        if len(child.keys) < t:
+            last = len(x.children) - 1
+            left = x.children[i - 1] if i > 0 else None
+            if left is not None:
+                left.latch.acquire_write()
+                if len(left.keys) >= t:  # 3a: borrow from the left sibling
+                    self.read_node(left)
+                    self.delete_sibling(x, i, i - 1)
+                    left.latch.release_write()
+                    left = None
+            if len(child.keys) < t:
+                if i < last:
+                    right = x.children[i + 1]
+                    right.latch.acquire_write()
+                    self.read_node(right)
+                    if len(right.keys) >= t:  # 3a: borrow from the right sibling
+                        self.delete_sibling(x, i, i + 1)
+                    else:  # 3b: merge with the right sibling
+                        self.delete_merge(x, i, i + 1)
+                    right.latch.release_write()
+                else:  # 3b: merge into the left sibling
+                    self.read_node(left)
+                    self.delete_merge(x, i, i - 1)
+                    child.latch.release_write()
+                    child, left = left, None
+            if left is not None:
+                left.latch.release_write()
+
+        x.latch.release_write()
+        return child, True
+
+    def _delete_max(self, x):
+        # remove and return the greatest key below the latched node x
+        while not x.leaf:
+            n = len(x.keys)
+            child = x.children[n]
+            child.latch.acquire_write()
+            self.read_node(child)
+            if len(child.keys) < self.t:
+                left = x.children[n - 1]
+                left.latch.acquire_write()
+                self.read_node(left)
+                if len(left.keys) >= self.t:
+                    self.delete_sibling(x, n, n - 1)
+                    left.latch.release_write()
+                else:
+                    self.delete_merge(x, n - 1, n)
+                    child.latch.release_write()
+                    child = left
+            x.latch.release_write()
+            x = child
+
+        self.write_node(x)
+        key = x.keys.pop()
+        x.latch.release_write()
+        return key
+
+    def _delete_min(self, x):
+        # remove and return the smallest key below the latched node x
+        while not x.leaf:
+            child = x.children[0]
+            child.latch.acquire_write()
+            self.read_node(child)
+            if len(child.keys) < self.t:
+                right = x.children[1]
+                right.latch.acquire_write()
+                self.read_node(right)
+                if len(right.keys) >= self.t:
+                    self.delete_sibling(x, 0, 1)
+                else:
+                    self.delete_merge(x, 0, 1)
+                right.latch.release_write()
+            x.latch.release_write()
+            x = child
+
+        self.write_node(x)
+        key = x.keys.pop(0)
+        x.latch.release_write()
+        return key
@@ -0,0 +1,48 @@
+import heapq
+import pickle
+import tempfile
+from itertools import islice
+
+RUN_SIZE = 1_000_000  # keys sorted in memory at once
+BLOCK_SIZE = 4096  # keys pickled together inside a run file
+
+
+def _write_run(keys):
+    # store a sorted run in an anonymous temporary file, block by block
+    run = tempfile.TemporaryFile()
+    for start in range(0, len(keys), BLOCK_SIZE):
+        pickle.dump(keys[start: start + BLOCK_SIZE], run,
+                    pickle.HIGHEST_PROTOCOL)
+    run.seek(0)
+    return run
+
+
+def _read_run(run):
+    with run:
+        while True:
+            try:
+                block = pickle.load(run)
+            except EOFError:
+                return
+            yield from block
+
+
+def external_sort(iterable, run_size=RUN_SIZE):
+    """
+    Sort a stream of keys that may not fit in memory: sorted runs of
+    run_size keys are spilled to temporary files and then k-way merged.
+    Returns an iterator over the keys in ascending order.
+    """
+    iterator = iter(iterable)
+    first = sorted(islice(iterator, run_size))
+    if len(first) < run_size:  # everything fits in one run, no spilling
+        return iter(first)
+
+    runs = [_write_run(first)]
+    del first
+    while True:
+        keys = sorted(islice(iterator, run_size))
+        if not keys:
+            break
+        runs.append(_write_run(keys))
+    return heapq.merge(*(_read_run(run) for run in runs))
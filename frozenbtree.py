@@ -0,0 +1,93 @@
+import numpy as np
+
+NULL = -1  # node and key index of a missing key
+
+
+class FrozenBTree:
+    """
+    Read-only copy of a BTree in flat NumPy arrays, built by BTree.freeze().
+    The nodes are numbered in level order; level l stores the keys of all
+    its nodes, left to right, in keys[l] and node j of the level owns
+    keys[l][starts[l][j]: starts[l][j + 1]]. The children of a node are
+    consecutive in the next level: child i of node j is node
+    starts[l][j] + j + i of level l + 1. Since every level is sorted, a
+    whole batch of queries moves down one level with a single
+    np.searchsorted.
+
+    Keys are 64 bit integers (or any dtype given to freeze). nodes_read
+    counts the nodes as BTree.search does: the root is not counted, a
+    search stops at the node holding the key.
+    """
+
+    def __init__(self, tree, dtype=np.int64):
+        self.t = tree.t
+        self.keys = []  # keys of every level
+        self.starts = []  # offset of the keys of every node, per level
+        self.first_node = [0]  # level order number of the first node of
+                               # every level (one more entry: node count)
+        level = [tree.root]
+        while level:
+            counts = np.fromiter((len(node.keys) for node in level),
+                                 dtype=np.int64, count=len(level))
+            starts = np.zeros(len(level) + 1, dtype=np.int64)
+            np.cumsum(counts, out=starts[1:])
+            self.starts.append(starts)
+            self.keys.append(np.fromiter(
+                (key for node in level for key in node.keys),
+                dtype=dtype, count=int(starts[-1])))
+            self.first_node.append(self.first_node[-1] + len(level))
+            level = [child for node in level for child in node.children]
+        self.height = len(self.keys) - 1  # levels below the root
+        self.nodes_read = 0
+        self.nodes_written = 0
+
+    def __len__(self):
+        return sum(len(keys) for keys in self.keys)
+
+    def search_batch(self, queries):
+        """
+        Search every key of the queries array at once, level by level.
+        Returns (found, node, index, reads) arrays: found flags, level order
+        number of the node holding the key and position of the key in it
+        (NULL when missing) and nodes read per query; nodes_read holds
+        their total.
+        """
+        queries = np.asarray(queries, dtype=self.keys[0].dtype)
+        found = np.zeros(len(queries), dtype=bool)
+        node = np.full(len(queries), NULL, dtype=np.int64)
+        index = np.full(len(queries), NULL, dtype=np.int64)
+        reads = np.zeros(len(queries), dtype=np.int64)
+
+        active = np.arange(len(queries))  # queries still descending
+        current = np.zeros(len(queries), dtype=np.int64)  # node in the level
+        for level, (keys, starts) in enumerate(zip(self.keys, self.starts)):
+            if not active.size:
+                break
+            reads[active] = level
+            wanted = queries[active]
+            start, end = starts[current], starts[current + 1]
+            # bisect_left inside the node, from the position in the level
+            position = np.clip(np.searchsorted(keys, wanted), start, end)
+            hit = position < end
+            hit[hit] = keys[position[hit]] == wanted[hit]
+
+            done = active[hit]
+            found[done] = True
+            node[done] = self.first_node[level] + current[hit]
+            index[done] = (position - start)[hit]
+
+            # child i of node j is node starts[j] + j + i of the next level
+            descend = ~hit
+            active = active[descend]
+            current = position[descend] + current[descend]
+
+        self.nodes_read = int(reads.sum())
+        self.nodes_written = 0
+        return found, node, index, reads
+
+    def search(self, key):
+        """
+        Return (node, index) of the key or None, like BTree.search
+        """
+        found, node, index, _ = self.search_batch([key])
+        return (int(node[0]), int(index[0])) if found[0] else None
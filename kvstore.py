@@ -0,0 +1,246 @@
+import os
+import pickle
+import struct
+import tempfile
+
+from binarysearchtree import BinarySearchTree
+from btree import BTree, CompactNodeBT
+from concurrentbtree import ConcurrentBTree
+from prefixbtree import PrefixBTree
+
+VALUE_HEADER = struct.Struct('<I')  # length of the pickled value
+_MISSING = object()
+
+
+class Entry:
+    """
+    Key stored in a tree node together with the offset of its value in the
+    value log. An entry compares like its key, with entries and with bare
+    keys, so the trees store and search entries without knowing about them
+    and every split, merge or rotation moves the offset along with the key.
+    """
+    __slots__ = ('key', 'ref')
+
+    def __init__(self, key, ref):
+        self.key = key
+        self.ref = ref  # offset of the value in the value log
+
+    def __eq__(self, other):
+        return self.key == (other.key if isinstance(other, Entry) else other)
+
+    def __lt__(self, other):
+        return self.key < (other.key if isinstance(other, Entry) else other)
+
+    def __le__(self, other):
+        return self.key <= (other.key if isinstance(other, Entry) else other)
+
+    def __gt__(self, other):
+        return self.key > (other.key if isinstance(other, Entry) else other)
+
+    def __ge__(self, other):
+        return self.key >= (other.key if isinstance(other, Entry) else other)
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __repr__(self):
+        return f"Entry({self.key!r}, {self.ref})"
+
+
+class ValueLog:
+    """
+    Append-only file of length-prefixed pickled values, addressed by the
+    offset returned by append. A value is only read back when asked for.
+    Overwritten and deleted values stay in the file until compact().
+    Without a path the log creates a temporary file and close() removes it.
+    """
+
+    def __init__(self, path=None):
+        self.owns_file = path is None  # file created here, removed by close
+        if path is None:
+            fd, path = tempfile.mkstemp(prefix='values-')
+            os.close(fd)
+        self.path = path
+        open(path, 'ab').close()  # create the file if needed
+        self.file = open(path, 'r+b')
+        self.size = self.file.seek(0, os.SEEK_END)  # end of the log
+        self.dead = 0  # bytes of values that are no longer referenced
+        self.values_read = 0  # counter of values read from the file
+
+    def append(self, value):
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        offset = self.size
+        self.file.seek(offset)
+        self.file.write(VALUE_HEADER.pack(len(data)))
+        self.file.write(data)
+        self.size += VALUE_HEADER.size + len(data)
+        return offset
+
+    def read(self, offset):
+        self.values_read += 1
+        self.file.seek(offset)
+        length, = VALUE_HEADER.unpack(self.file.read(VALUE_HEADER.size))
+        return pickle.loads(self.file.read(length))
+
+    def discard(self, offset):
+        # the value at offset is no longer referenced
+        self.file.seek(offset)
+        length, = VALUE_HEADER.unpack(self.file.read(VALUE_HEADER.size))
+        self.dead += VALUE_HEADER.size + length
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+        if self.owns_file:
+            os.unlink(self.path)
+            self.owns_file = False
+
+
+class KeyValueStore:
+    """
+    Map API (put/get/pop/in, also with [] and del) on top of a BTree,
+    LazyDeleteBTree, BPlusTree or BinarySearchTree (and its balanced
+    subclasses). The tree nodes only hold Entry(key, offset); the values are
+    pickled into a ValueLog, so node fan-out does not depend on the value
+    size and get reads exactly one value. nodes_read/nodes_written are those
+    of the tree for the last operation.
+    """
+
+    def __init__(self, tree=None, path=None):
+        if tree is None:
+            tree = BTree(16)
+        if isinstance(tree, (ConcurrentBTree, PrefixBTree)) or \
+                issubclass(getattr(tree, 'node_class', object), CompactNodeBT):
+            raise TypeError(f"{type(tree).__name__} with these options cannot "
+                            f"store entries")
+        self.tree = tree
+        self.log = ValueLog(path)
+        self.count = 0
+
+    @property
+    def nodes_read(self):
+        return self.tree.nodes_read
+
+    @property
+    def nodes_written(self):
+        return self.tree.nodes_written
+
+    def _find(self, key):
+        # entry of the key, or None
+        tree = self.tree
+        if isinstance(tree, BinarySearchTree):
+            # BinarySearchTree.search only returns a bool
+            tree.nodes_read = 0
+            tree.nodes_written = 0
+            node = tree.root
+            while node is not None:
+                tree.nodes_read += 1
+                if key == node.key:
+                    return node.key
+                node = node.left if key < node.key else node.right
+            return None
+        result = tree.search(key)
+        if result is None:
+            return None
+        node, i = result
+        return node.keys[i]
+
+    def _delete(self, key):
+        if isinstance(self.tree, BinarySearchTree):
+            self.tree.delete(key)
+        else:
+            self.tree.delete(self.tree.root, key)
+
+    def put(self, key, value):
+        ref = self.log.append(value)
+        entry = self._find(key)
+        if entry is not None:  # only the offset changes
+            self.log.discard(entry.ref)
+            entry.ref = ref
+            self.tree.nodes_written += 1
+        else:
+            self.tree.insert(Entry(key, ref))
+            self.count += 1
+
+    def get(self, key, default=None):
+        entry = self._find(key)
+        if entry is None:
+            return default
+        return self.log.read(entry.ref)
+
+    def pop(self, key, default=_MISSING):
+        entry = self._find(key)
+        if entry is None:
+            if default is _MISSING:
+                raise KeyError(key)
+            return default
+        value = self.log.read(entry.ref)
+        self.log.discard(entry.ref)
+        self._delete(key)
+        self.count -= 1
+        return value
+
+    def __contains__(self, key):
+        return self._find(key) is not None  # no value is read
+
+    def __getitem__(self, key):
+        entry = self._find(key)
+        if entry is None:
+            raise KeyError(key)
+        return self.log.read(entry.ref)
+
+    def __setitem__(self, key, value):
+        self.put(key, value)
+
+    def __delitem__(self, key):
+        self.pop(key)
+
+    def __len__(self):
+        return self.count
+
+    def keys(self, lo=None, hi=None):
+        """
+        Lazily yield the keys in [lo, hi) in ascending order, reading no
+        value
+        """
+        for entry in self.tree.range(lo, hi):
+            yield entry.key
+
+    def items(self, lo=None, hi=None):
+        """
+        Lazily yield the (key, value) pairs in [lo, hi) in ascending order,
+        every value being read when its pair is reached
+        """
+        for entry in self.tree.range(lo, hi):
+            yield entry.key, self.log.read(entry.ref)
+
+    def __iter__(self):
+        return self.keys()
+
+    def compact(self):
+        """
+        Copy the live values to a new log, dropping the overwritten and
+        deleted ones, and update the offsets in place
+        """
+        old = self.log
+        new = ValueLog(old.path + '.compact')
+        for entry in self.tree.range():
+            entry.ref = new.append(old.read(entry.ref))
+        owns_file = old.owns_file
+        old.owns_file = False  # the file is replaced, not removed
+        old.close()
+        new.close()
+        os.replace(new.path, old.path)
+        self.log = ValueLog(old.path)
+        self.log.owns_file = owns_file
+
+    def close(self):
+        self.log.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
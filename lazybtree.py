@@ -0,0 +1,160 @@
+from bisect import bisect_left
+
+from batch import apply_each
+from btree import BTree, CompactNodeBT
+
+COMPACT_THRESHOLD = 0.4  # occupancy below which the tree is rebuilt
+COMPACT_FILL = 0.7  # fill factor of the nodes of a rebuilt tree
+
+
+class LazyDeleteBTree(BTree):
+    """
+    BTree whose delete does not rebalance: a key found in a leaf is removed
+    from it, leaving the leaf underfull (possibly empty), and a key found
+    in an internal node is only marked with a tombstone, the key keeps
+    routing the searches. A delete thus reads the search path and writes a
+    single node, with no borrow or merge.
+
+    Underfull nodes and tombstones are reclaimed by compact(), which rebuilds
+    the tree bottom-up from the live keys with fill factor fill_factor.
+    When threshold is set, compact() runs automatically once the occupancy
+    (live keys / key slots of all the nodes) falls below it, and its writes
+    are charged to the delete that triggered it; with threshold=None it is
+    left to the caller, e.g. a periodic background pass.
+
+    search, range/iteration and the batch methods skip the tombstones; an
+    insert of a tombstoned key revives it in place.
+    """
+
+    def __init__(self, t, compact=False, threshold=COMPACT_THRESHOLD,
+                 fill_factor=COMPACT_FILL):
+        super().__init__(t, compact)
+        self.threshold = threshold
+        self.fill_factor = fill_factor
+        self.tombstones = set()  # deleted keys still stored in internal nodes
+        self.live = 0  # keys in the tree, tombstones excluded
+        self.node_count = 1
+        self.compactions = 0  # counter of compact() runs
+        self.compaction_writes = 0  # nodes written by all the compactions
+
+    @classmethod
+    def from_sorted(cls, iterable, t, fill_factor=1.0, compact=False):
+        counted = [0]
+
+        def count(keys):
+            for key in keys:
+                counted[0] += 1
+                yield key
+
+        tree = super().from_sorted(count(iterable), t, fill_factor, compact)
+        tree.live = counted[0]
+        tree.node_count = tree.nodes_written  # every node is written once
+        return tree
+
+    def occupancy(self):
+        return self.live / (self.node_count * (2 * self.t - 1))
+
+    def search(self, key):
+        result = super().search(key)
+        if result is not None and key in self.tombstones:
+            return None
+        return result
+
+    def insert(self, k):
+        if k in self.tombstones:  # the key is still in its node: revive it
+            node, i = super().search(k)
+            node.keys[i] = k  # equal key, possibly with new data attached
+            self.tombstones.discard(k)
+            self.write_node(node)
+        else:
+            root = self.root
+            super().insert(k)
+            if self.root is not root:  # the tree has grown by one level
+                self.node_count += 1
+        self.live += 1
+
+    def split_child(self, x, i):
+        super().split_child(x, i)
+        self.node_count += 1
+
+    def delete(self, x, k):
+        # reset counters for every new delete operation
+        self.nodes_read = 0
+        self.nodes_written = 0
+
+        node = self.root
+        while True:
+            if node is not self.root:
+                self.read_node(node)
+            i = bisect_left(node.keys, k)
+            if i < len(node.keys) and node.keys[i] == k:
+                if k in self.tombstones:  # already deleted
+                    return
+                if node.leaf:
+                    node.keys.pop(i)
+                else:
+                    self.tombstones.add(k)
+                self.write_node(node)
+                self.live -= 1
+                break
+            if node.leaf:  # key not in the tree
+                return
+            node = node.children[i]
+
+        if self.threshold is not None and self.node_count > 1 and \
+                self.occupancy() < self.threshold:
+            self.compact()
+
+    def compact(self):
+        """
+        Rebuild the tree from its live keys, dropping the tombstones and the
+        underfull nodes. Returns the number of nodes written; the nodes read
+        and written are also added to the counters of the running operation.
+        """
+        nodes_read, nodes_written = self.nodes_read, self.nodes_written
+        compact = self.node_class is CompactNodeBT
+        rebuilt = BTree.from_sorted(iter(self), self.t, self.fill_factor, compact)
+        self.root = rebuilt.root
+        self.tombstones.clear()
+        self.node_count = rebuilt.nodes_written
+        self.compactions += 1
+        self.compaction_writes += rebuilt.nodes_written
+        self.nodes_read += nodes_read  # iterating reset the counter
+        self.nodes_written = nodes_written + rebuilt.nodes_written
+        return rebuilt.nodes_written
+
+    def search_many(self, keys):
+        results = super().search_many(keys)
+        if not self.tombstones:
+            return results
+        return [(key, None if key in self.tombstones else result, reads)
+                for key, result, reads in results]
+
+    def insert_many(self, keys):
+        # tombstones and node counts are handled by insert
+        return apply_each(self, self.insert, keys)
+
+    def delete_many(self, keys):
+        return apply_each(self, lambda key: self.delete(self.root, key), keys)
+
+    def _range_ascending(self, lo, hi):
+        for key in super()._range_ascending(lo, hi):
+            if key not in self.tombstones:
+                yield key
+
+    def _range_descending(self, lo, hi):
+        for key in super()._range_descending(lo, hi):
+            if key not in self.tombstones:
+                yield key
+
+    def save(self, path):
+        # snapshots have no tombstones
+        if self.tombstones:
+            self.compact()
+        super().save(path)
+
+    def freeze(self):
+        # neither have frozen trees
+        if self.tombstones:
+            self.compact()
+        return super().freeze()
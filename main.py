@@ -1,30 +1,197 @@
+import argparse
+import os
 import random
+import shutil
+import sys
+import tempfile
 
-from packaging.tags import platform_tags
-
-from performanceInfographic import PlotGenerator
 from btree import BTree
 from binarysearchtree import BinarySearchTree
+from pagedbtree import PagedBTree
+
+
+def demo(args):
+    from performanceInfographic import PlotGenerator
+
+    pltGen = PlotGenerator()
+    t = 3
+    if args.tune:  # degree picked by a short calibration on a sample of
+                   # the same kind of workload
+        from tuner import DegreeTuner
+        from workloads import operation_stream
+
+        tuner = DegreeTuner(candidates=(2, 3, 4, 8, 16, 32))
+        sample = random.sample(range(1001), 300)
+        tuner.calibrate(sample, operation_stream('uniform', 'insert=0.5,delete=0.5',
+                                                 sample, 600))
+        t = tuner.best
+        print(f"Calibrated degree t={t}")
+    if args.paged:  # nodes stored in pages of a real file, read and
+                    # written through a small buffer pool
+        workdir = tempfile.mkdtemp(prefix='demo-')  # removed at the end
+        btree_instance = PagedBTree(os.path.join(workdir, "btree.pages"),
+                                    t, pool_size=8)
+    else:
+        btree_instance = BTree(t)
+    bstree_instance = BinarySearchTree()
+
+    keys = random.sample(range(1001), 900) #900 random keys taken from random interval [0-1000]
+                                           #for insert operations
+    timeInsBST = pltGen.measure_tree_performanceBST(bstree_instance, keys, "Insert")
+    timeInsBT = pltGen.measure_tree_performanceBT(btree_instance, keys, "Insert")
+
+    keys = random.sample(range(1001), 900)# 900 random keys taken from random interval [0-1000]
+                                           #for delete operations
+    timeDelBST = pltGen.measure_tree_performanceBST(bstree_instance, keys, "Delete")
+    timeDelBT = pltGen.measure_tree_performanceBT(btree_instance, keys, "Delete")
+
+    if not args.no_plot:
+        pltGen.plotComparingPerformances("Insert")  # every phase is kept by the
+        pltGen.plotComparingPerformances("Delete")  # recorder, not only the last one
+
+    print("Tot Insert time bstree: " + str(timeInsBST))
+    print("Tot Insert time btree: " + str(timeInsBT))
+    print("Tot Delete time bstree: " + str(timeDelBST))
+    print("Tot Delete time btree: " + str(timeDelBT))
+
+    for row in pltGen.recorder.summary():
+        print(f"{row['series']:>3} {row['operation']:<6} p50 {row['p50_ns']:.0f} ns, "
+              f"p99 {row['p99_ns']:.0f} ns, p999 {row['p999_ns']:.0f} ns, "
+              f"{row['reads_per_op']:.2f} reads/op, {row['writes_per_op']:.2f} writes/op")
+    pltGen.close()
+    if args.paged:
+        btree_instance.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def bench(args):
+    from benchsuite import (expand_configs, merge_results, run_config,
+                            run_parallel, write_results)
+
+    configs = expand_configs(args.tree, args.t, args.n, args.distribution,
+                             args.mix, args.ops,
+                             [args.seed + rep for rep in range(args.repeat)])
+    if args.workers == 1:
+        finished = ((config, run_config(config)) for config in configs)
+    else:  # one process per core when --workers 0
+        finished = run_parallel(configs, args.workers or None)
+
+    results = {}
+    for number, (config, rows) in enumerate(finished, 1):
+        print(f"[{number}/{len(configs)}] {config['tree']} t={config['t']} "
+              f"n={config['n']} {config['distribution']} {config['mix']} "
+              f"seed={config['seed']}", file=sys.stderr)
+        results[tuple(config.values())] = rows
+    # same order as the configurations whatever order they finished in
+    rows = [row for config in configs for row in results[tuple(config.values())]]
+
+    if args.merge:
+        rows = merge_results(rows)
+    write_results(rows, args.output, args.format)
+    if args.plot:
+        plot_results(rows, args.plot)
+
+
+def plot_results(rows, path):
+    """
+    Save a figure of the mean latency and reads per operation of every tree
+    against the degree t (binary trees drawn as horizontal lines)
+    """
+    import matplotlib
+    matplotlib.use('Agg')  # render to a file, no display needed
+    import matplotlib.pyplot as plt
+
+    operations = sorted({row['operation'] for row in rows})
+    fig, axes = plt.subplots(2, len(operations), figsize=(5 * len(operations), 8),
+                             squeeze=False)
+    for column, operation in enumerate(operations):
+        series = {}
+        for row in rows:
+            if row['operation'] == operation:
+                label = f"{row['tree']} n={row['n']} {row['distribution']}"
+                series.setdefault(label, {}).setdefault(row['t'], []).append(row)
+
+        degrees = sorted({row['t'] for row in rows if row['t'] is not None}) or [1]
+        for label, by_t in series.items():
+            for line, (metric, name) in enumerate((('mean_ns', 'Mean time (ns)'),
+                                                   ('reads_per_op', 'Read Nodes'))):
+                points = sorted((t, sum(r[metric] for r in runs) / len(runs))
+                                for t, runs in by_t.items() if t is not None)
+                axis = axes[line][column]
+                if points:
+                    axis.plot(*zip(*points), marker='o', label=label)
+                else:  # binary tree: no degree
+                    value = sum(r[metric] for r in by_t[None]) / len(by_t[None])
+                    axis.plot([degrees[0], degrees[-1]], [value, value],
+                              linestyle='--', label=label)
+                axis.set_ylabel(name)
+                axis.set_xscale('log', base=2)
+                axis.set_xlabel('Degree t')
+        axes[0][column].set_title(operation)
+        axes[0][column].legend(fontsize='small')
+
+    fig.tight_layout()
+    fig.savefig(path)
+
 
-pltGen = PlotGenerator()
-btree_instance = BTree(3)
-bstree_instance = BinarySearchTree()
+def parse_args(argv):
+    from benchsuite import TREES
+    from workloads import DISTRIBUTIONS
 
+    parser = argparse.ArgumentParser(
+        description="Compare binary search trees and B-trees")
+    commands = parser.add_subparsers(dest='command')
 
-keys = random.sample(range(1001), 900) #900 random keys taken from random interval [0-1000]
-                                       #for insert operations
-timeInsBST = pltGen.measure_tree_performanceBST(bstree_instance, keys, "Insert")
-timeInsBT = pltGen.measure_tree_performanceBT(btree_instance, keys, "Insert")
+    demo_parser = commands.add_parser(
+        'demo', help="insert and delete 900 random keys, plot the comparison "
+                     "(default)")
+    demo_parser.add_argument('--paged', action='store_true',
+                             help="store the B-tree nodes in a page file")
+    demo_parser.add_argument('--no-plot', action='store_true',
+                             help="only print the measurements")
+    demo_parser.add_argument('--tune', action='store_true',
+                             help="choose the B-tree degree with a short "
+                                  "calibration instead of t=3")
 
-keys = random.sample(range(1001), 900)# 900 random keys taken from random interval [0-1000]
-                                       #for delete operations
-timeDelBST = pltGen.measure_tree_performanceBST(bstree_instance, keys, "Delete")
-timeDelBT = pltGen.measure_tree_performanceBT(btree_instance, keys, "Delete")
+    bench_parser = commands.add_parser(
+        'bench', help="run a headless benchmark sweep and print the results")
+    bench_parser.add_argument('--n', type=int, nargs='+', default=[10000],
+                              help="number of loaded keys (default: 10000)")
+    bench_parser.add_argument('--t', type=int, nargs='+', default=[2, 16, 128],
+                              help="minimum degrees of the B-trees")
+    bench_parser.add_argument('--tree', nargs='+', choices=TREES,
+                              default=['bst', 'btree'])
+    bench_parser.add_argument('--distribution', nargs='+', choices=DISTRIBUTIONS,
+                              default=['uniform'])
+    bench_parser.add_argument('--mix', nargs='+',
+                              default=['search=0.8,insert=0.1,delete=0.1'],
+                              help="operation mixes such as "
+                                   "search=0.8,insert=0.1,delete=0.1")
+    bench_parser.add_argument('--ops', type=int, default=10000,
+                              help="operations run after the load (default: 10000)")
+    bench_parser.add_argument('--repeat', type=int, default=1,
+                              help="repetitions of every configuration, "
+                                   "with seeds seed, seed+1, ...")
+    bench_parser.add_argument('--seed', type=int, default=0)
+    bench_parser.add_argument('--workers', type=int, default=1,
+                              help="worker processes running the configurations "
+                                   "(0: one per core, default: 1)")
+    bench_parser.add_argument('--merge', action='store_true',
+                              help="merge the repetitions into one row with "
+                                   "95%% confidence intervals")
+    bench_parser.add_argument('--format', choices=('jsonl', 'csv'), default='jsonl')
+    bench_parser.add_argument('--output', help="results file (default: stdout)")
+    bench_parser.add_argument('--plot', metavar='FILE',
+                              help="also save a figure of the results")
 
-pltGen.plotComparingPerformances(keys, "Delete")
+    if not argv or argv[0] not in ('demo', 'bench', '-h', '--help'):
+        argv = ['demo'] + argv  # plain "python main.py [--paged]" runs the demo
+    return parser.parse_args(argv)
 
-print("Tot Insert time bstree: " + str(timeInsBST))
-print("Tot Insert time btree: " + str(timeInsBT))
-print("Tot Delete time bstree: " + str(timeDelBST))
-print("Tot Delete time btree: " + str(timeDelBT))
 
+if __name__ == '__main__':
+    args = parse_args(sys.argv[1:])
+    if args.command == 'bench':
+        bench(args)
+    else:
+        demo(args)
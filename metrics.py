@@ -0,0 +1,167 @@
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+CHUNK_SIZE = 1 << 16  # samples buffered in memory before a flush
+
+# one sample per operation; the phase identifies the (series, operation)
+# pair, e.g. ("BT", "Insert")
+SAMPLE = np.dtype([('phase', np.uint16), ('key', np.int64), ('ns', np.int64),
+                   ('reads', np.int64), ('writes', np.int64)])
+
+# log-linear histogram of the latencies: values below SUB_BUCKETS are exact,
+# every power of two above is split in SUB_BUCKETS buckets (~6% error)
+SUB_BITS = 4
+SUB_BUCKETS = 1 << SUB_BITS
+N_BUCKETS = SUB_BUCKETS + (63 - SUB_BITS) * SUB_BUCKETS
+
+
+def bucket_index(values):
+    values = np.maximum(np.asarray(values, dtype=np.int64), 0)
+    exponent = np.frexp(np.maximum(values, 1).astype(np.float64))[1] - 1
+    shift = np.maximum(exponent - SUB_BITS, 0)
+    sub = (values >> shift) - SUB_BUCKETS
+    return np.where(values < SUB_BUCKETS, values,
+                    SUB_BUCKETS + shift * SUB_BUCKETS + sub)
+
+
+def bucket_value(index):
+    # middle of the range of values that fall in a bucket
+    if index < SUB_BUCKETS:
+        return float(index)
+    shift, sub = divmod(index - SUB_BUCKETS, SUB_BUCKETS)
+    low = (SUB_BUCKETS + sub) << shift
+    return low + ((1 << shift) - 1) / 2
+
+
+class MetricsRecorder:
+    """
+    Streaming recorder of per-operation samples (phase, key, ns, reads,
+    writes). Samples go into a preallocated NumPy buffer that is appended
+    chunk by chunk to one file per column inside the directory path, while
+    per-phase latency histograms and totals are kept up to date, so memory
+    stays bounded whatever the number of operations and every phase is
+    kept on disk. Without a path the recorder creates a temporary directory
+    and close() removes it.
+    """
+
+    def __init__(self, path=None, chunk_size=CHUNK_SIZE):
+        self.owned = path is None  # directory created here, removed by close
+        self.path = path if path is not None else tempfile.mkdtemp(prefix='metrics-')
+        os.makedirs(self.path, exist_ok=True)
+        self.buffer = np.empty(chunk_size, dtype=SAMPLE)
+        self.fill = 0  # samples in the buffer
+        self.flushed = 0  # samples already in the column files
+        self.phases = []  # (series, operation) of every phase id
+        self.histograms = []  # latency histogram of every phase
+        self.totals = []  # count, ns, reads, writes, max reads, max writes
+
+        for name in SAMPLE.names:  # start with empty column files
+            open(self._column_path(name), 'wb').close()
+
+    def _column_path(self, name):
+        return os.path.join(self.path, name + '.bin')
+
+    def phase(self, series, operation):
+        """
+        Id of the (series, operation) phase, to be passed to record
+        """
+        key = (series, operation)
+        if key not in self.phases:
+            self.phases.append(key)
+            self.histograms.append(np.zeros(N_BUCKETS, dtype=np.int64))
+            self.totals.append(np.zeros(6, dtype=np.int64))
+        return self.phases.index(key)
+
+    def record(self, phase, key, ns, reads, writes):
+        self.buffer[self.fill] = (phase, key, ns, reads, writes)
+        self.fill += 1
+        if self.fill == len(self.buffer):
+            self.flush()
+
+    def flush(self):
+        if not self.fill:
+            return
+        samples = self.buffer[:self.fill]
+        for name in SAMPLE.names:
+            with open(self._column_path(name), 'ab') as column:
+                samples[name].tofile(column)
+
+        for phase in np.unique(samples['phase']):
+            rows = samples[samples['phase'] == phase]
+            self.histograms[phase] += np.bincount(bucket_index(rows['ns']),
+                                                  minlength=N_BUCKETS)
+            totals = self.totals[phase]
+            totals[0] += len(rows)
+            totals[1] += rows['ns'].sum()
+            totals[2] += rows['reads'].sum()
+            totals[3] += rows['writes'].sum()
+            totals[4] = max(totals[4], rows['reads'].max())
+            totals[5] = max(totals[5], rows['writes'].max())
+
+        self.flushed += self.fill
+        self.fill = 0
+        self._write_meta()
+
+    def _write_meta(self):
+        with open(os.path.join(self.path, 'meta.json'), 'w') as meta:
+            json.dump({'columns': {name: SAMPLE[name].str for name in SAMPLE.names},
+                       'phases': self.phases, 'samples': self.flushed}, meta)
+
+    def close(self):
+        self.flush()
+        if self.owned:
+            shutil.rmtree(self.path, ignore_errors=True)
+
+    def samples(self, series, operation):
+        """
+        All the samples of a phase as a structured array, read back from
+        the column files
+        """
+        self.flush()
+        phase = self.phase(series, operation)
+        columns = {name: np.memmap(self._column_path(name), dtype=SAMPLE[name],
+                                   mode='r') if self.flushed else
+                   np.empty(0, dtype=SAMPLE[name]) for name in SAMPLE.names}
+        mask = columns['phase'] == phase
+        result = np.empty(int(mask.sum()), dtype=SAMPLE)
+        for name in SAMPLE.names:
+            result[name] = columns[name][mask]
+        return result
+
+    def percentiles(self, series, operation, quantiles=(50, 99, 99.9)):
+        """
+        Latency percentiles in ns of a phase, from its streaming histogram
+        """
+        self.flush()
+        histogram = self.histograms[self.phase(series, operation)]
+        cumulative = np.cumsum(histogram)
+        if cumulative[-1] == 0:
+            return [0.0 for _ in quantiles]
+        return [bucket_value(int(np.searchsorted(cumulative,
+                                                 q / 100 * cumulative[-1])))
+                for q in quantiles]
+
+    def summary(self):
+        """
+        One dict per phase with count, mean/p50/p99/p999 latency in ns and
+        average/max nodes read and written per operation
+        """
+        self.flush()
+        rows = []
+        for phase, (series, operation) in enumerate(self.phases):
+            count, ns, reads, writes, max_reads, max_writes = \
+                (int(value) for value in self.totals[phase])
+            if count == 0:
+                continue
+            p50, p99, p999 = self.percentiles(series, operation)
+            rows.append({'series': series, 'operation': operation,
+                         'count': count, 'mean_ns': ns / count,
+                         'p50_ns': p50, 'p99_ns': p99, 'p999_ns': p999,
+                         'reads_per_op': reads / count,
+                         'writes_per_op': writes / count,
+                         'max_reads': max_reads, 'max_writes': max_writes})
+        return rows
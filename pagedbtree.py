@@ -0,0 +1,509 @@
+import os
+import struct
+from bisect import bisect_left
+
+from btree import NodeBT
+from cachepolicy import make_policy
+
+PAGE_SIZE = 4096  # bytes per page, i.e. one disk block
+
+# page 0 of the file holds the metadata of the tree
+META_FORMAT = '<4sIIIII'  # magic, page size, t, root page, next free page id,
+                          # head of the free pages list
+META_MAGIC = b'BTPG'
+
+# every other page holds one node: leaf flag + number of keys, then the keys
+# (signed 64 bit integers) and, for internal nodes, the children page ids
+NODE_HEADER = struct.Struct('<BH')
+KEY_SIZE = 8
+CHILD_SIZE = 4
+FREE_PAGE = 0xFF  # leaf flag value used to mark a page in the free list
+
+
+class PagedNodeBT(NodeBT):
+    __slots__ = ('pid',)
+
+    def __init__(self, pid, leaf=False):
+        super().__init__(leaf)
+        self.pid = pid  # id of the page that stores this node; children
+                        # hold page ids instead of node references
+
+
+class PageFile:
+    """
+    Fixed-size page storage on top of a local file. Every read and write
+    moves exactly one page between the file and memory.
+    """
+
+    def __init__(self, path, page_size=PAGE_SIZE):
+        self.path = path
+        self.page_size = page_size
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        self.file = open(path, 'r+b' if exists else 'w+b')
+        self.page_reads = 0  # counter of pages read from the file
+        self.page_writes = 0  # counter of pages written to the file
+
+    def read_page(self, pid):
+        self.page_reads += 1
+        self.file.seek(pid * self.page_size)
+        data = self.file.read(self.page_size)
+        if len(data) < self.page_size:  # page allocated but never written
+            data += bytes(self.page_size - len(data))
+        return data
+
+    def write_page(self, pid, data):
+        self.page_writes += 1
+        self.file.seek(pid * self.page_size)
+        self.file.write(data.ljust(self.page_size, b'\0'))
+
+    def sync(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.close()
+
+
+class BufferPool:
+    """
+    Bounded cache of deserialized nodes between the tree and the page file,
+    the victims being chosen by a replacement policy of cachepolicy (lru,
+    clock, 2q or arc). Dirty nodes are written back when they are evicted or
+    flushed. Nodes used by the running operation are pinned and never
+    evicted, so the pool can exceed its capacity by at most the working set
+    of one operation. Fixed pages (see fix) stay in the pool until unfixed
+    and take their share of the capacity.
+    """
+
+    def __init__(self, pagefile, capacity, decode, encode, policy='lru'):
+        if capacity < 1:
+            raise ValueError("buffer pool needs at least one page")
+        self.pagefile = pagefile
+        self.capacity = capacity
+        self.decode = decode  # function (pid, bytes) -> node
+        self.encode = encode  # function node -> bytes
+        self.policy = make_policy(policy, capacity)  # tracks evictable pages
+        self.frames = {}  # pid -> node
+        self.dirty = set()
+        self.pinned = set()
+        self.fixed = set()  # pages never evicted
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, pid):
+        node = self.frames.get(pid)
+        if node is not None:
+            self.hits += 1
+            if pid not in self.fixed:
+                self.policy.access(pid)
+        else:
+            self.misses += 1
+            node = self.decode(pid, self.pagefile.read_page(pid))
+            self.frames[pid] = node
+            self.policy.admit(pid)
+        self.pinned.add(pid)
+        return node
+
+    def put(self, node, dirty=True):
+        # (re)insert a node in the pool, e.g. a new node or a modified one
+        pid = node.pid
+        if pid not in self.frames:
+            self.policy.admit(pid)
+        elif pid not in self.fixed:
+            self.policy.access(pid)
+        self.frames[pid] = node
+        self.pinned.add(pid)
+        if dirty:
+            self.dirty.add(pid)
+
+    def discard(self, pid):
+        if self.frames.pop(pid, None) is not None and pid not in self.fixed:
+            self.policy.remove(pid)
+        self.dirty.discard(pid)
+        self.pinned.discard(pid)
+        self.fixed.discard(pid)
+
+    def fix(self, pid):
+        # keep a page of the pool in memory, whatever the policy decides
+        if pid not in self.fixed:
+            self.fixed.add(pid)
+            self.policy.remove(pid)
+
+    def unfix(self, pid):
+        if pid in self.fixed:
+            self.fixed.discard(pid)
+            if pid in self.frames:
+                self.policy.admit(pid)
+
+    def release(self):
+        # end of an operation: unpin everything and shrink back to capacity
+        self.pinned.clear()
+        while len(self.policy) > max(0, self.capacity - len(self.fixed)):
+            pid = self.policy.victim()
+            node = self.frames.pop(pid)
+            if pid in self.dirty:
+                self.dirty.discard(pid)
+                self.pagefile.write_page(pid, self.encode(node))
+
+    def flush(self):
+        for pid in sorted(self.dirty):
+            self.pagefile.write_page(pid, self.encode(self.frames[pid]))
+        self.dirty.clear()
+
+    def hit_ratio(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class PagedBTree:
+    """
+    B tree whose nodes live in fixed-size pages of a local file and are
+    accessed through a bounded buffer pool with the replacement policy
+    policy (lru, clock, 2q or arc). Keys are 64 bit integers.
+    nodes_read/nodes_written count the pages actually read from and written
+    to the file by the last operation; pool hits and misses are kept in
+    self.pool.
+
+    With pinned_levels=k the pages of the top k levels are fixed in the
+    pool, so a search only goes to the file below them; they are part of
+    pool_size, pinning more pages than that leaves no room for the others.
+    """
+
+    def __init__(self, path, t, pool_size=64, page_size=PAGE_SIZE,
+                 write_through=False, policy='lru', pinned_levels=0):
+        if t < 2:
+            raise ValueError("minimum degree t must be at least 2")
+        max_keys = (page_size - NODE_HEADER.size - CHILD_SIZE) \
+                   // (KEY_SIZE + CHILD_SIZE)
+        if 2 * t - 1 > max_keys:
+            raise ValueError(f"t={t} does not fit in a {page_size} bytes "
+                             f"page (max t is {(max_keys + 1) // 2})")
+
+        self.t = t
+        self.write_through = write_through  # write every modified page at
+                                            # the end of its operation
+        self.pagefile = PageFile(path, page_size)
+        self.pool = BufferPool(self.pagefile, pool_size,
+                               self._decode, self._encode, policy)
+        self.pinned_levels = pinned_levels
+        self.levels = {}  # pid -> level of the pages fixed in the pool
+        self.nodes_read = 0  # counter of pages read by the last operation
+        self.nodes_written = 0  # counter of pages written by the last
+                                # operation
+
+        if os.path.getsize(path) > 0:
+            self._load_meta()
+            if self.t != t:
+                raise ValueError(f"{path} stores a tree of degree {self.t}")
+        else:
+            self.next_pid = 1  # page 0 is reserved for metadata
+            self.free_head = 0  # 0 means empty free list
+            root = self.allocate_node(True)
+            self.root = root.pid
+            self.flush()
+        self._pin_levels()
+        self.pool.release()
+
+    # ---- page (de)serialization ------------------------------------------
+
+    def _encode(self, node):
+        n = len(node.keys)
+        data = NODE_HEADER.pack(1 if node.leaf else 0, n)
+        data += struct.pack(f'<{n}q', *node.keys)
+        if not node.leaf:
+            data += struct.pack(f'<{n + 1}I', *node.children)
+        return data
+
+    def _decode(self, pid, data):
+        leaf, n = NODE_HEADER.unpack_from(data, 0)
+        if leaf == FREE_PAGE:
+            raise ValueError(f"page {pid} is not allocated")
+        node = PagedNodeBT(pid, leaf == 1)
+        offset = NODE_HEADER.size
+        node.keys = list(struct.unpack_from(f'<{n}q', data, offset))
+        if not node.leaf:
+            offset += n * KEY_SIZE
+            node.children = list(struct.unpack_from(f'<{n + 1}I', data, offset))
+        return node
+
+    def _load_meta(self):
+        magic, page_size, t, root, next_pid, free_head = struct.unpack_from(
+            META_FORMAT, self.pagefile.read_page(0))
+        if magic != META_MAGIC or page_size != self.pagefile.page_size:
+            raise ValueError(f"{self.pagefile.path} is not a B tree page file "
+                             f"with {self.pagefile.page_size} bytes pages")
+        self.t, self.root = t, root
+        self.next_pid, self.free_head = next_pid, free_head
+        self.pagefile.page_reads = 0
+
+    def _store_meta(self):
+        self.pagefile.write_page(0, struct.pack(
+            META_FORMAT, META_MAGIC, self.pagefile.page_size, self.t,
+            self.root, self.next_pid, self.free_head))
+
+    # ---- page allocation -------------------------------------------------
+
+    def allocate_node(self, leaf=False):
+        if self.free_head:  # reuse a page from the free list
+            pid = self.free_head
+            data = self.pagefile.read_page(pid)
+            self.free_head = struct.unpack_from('<I', data, NODE_HEADER.size)[0]
+        else:
+            pid = self.next_pid
+            self.next_pid += 1
+        node = PagedNodeBT(pid, leaf)
+        self.pool.put(node)
+        return node
+
+    def free_node(self, node):
+        self.pool.discard(node.pid)
+        self.levels.pop(node.pid, None)
+        self.pagefile.write_page(node.pid, NODE_HEADER.pack(FREE_PAGE, 0)
+                                 + struct.pack('<I', self.free_head))
+        self.free_head = node.pid
+
+    # ---- node access -----------------------------------------------------
+
+    def read_node(self, pid):
+        return self.pool.get(pid)
+
+    def write_node(self, node):
+        self.pool.put(node)
+
+    def _pin_levels(self):
+        # fix the pages of the top pinned_levels levels, from scratch: called
+        # when the height changes, as every page then changes level
+        for pid in self.levels:
+            self.pool.unfix(pid)
+        self.levels = {}
+        pids = [self.root]
+        for level in range(self.pinned_levels):
+            below = []
+            for pid in pids:
+                node = self.read_node(pid)
+                self.pool.fix(pid)
+                self.levels[pid] = level
+                below.extend(node.children)
+            pids = below
+
+    def _begin(self):
+        self.nodes_read = 0
+        self.nodes_written = 0
+        self._reads_at_start = self.pagefile.page_reads
+        self._writes_at_start = self.pagefile.page_writes
+
+    def _end(self):
+        if self.write_through:
+            self.pool.flush()
+        self.pool.release()
+        self.nodes_read = self.pagefile.page_reads - self._reads_at_start
+        self.nodes_written = self.pagefile.page_writes - self._writes_at_start
+
+    def flush(self):
+        """
+        Write every dirty page and the metadata page, then fsync the file
+        """
+        self.pool.flush()
+        self._store_meta()
+        self.pagefile.sync()
+
+    def close(self):
+        self.flush()
+        self.pagefile.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---- search ----------------------------------------------------------
+
+    def search(self, key):
+        """
+        Find the key descending from the root page, return (node, index) or
+        None like BTree.search
+        """
+        self._begin()
+        node = self.read_node(self.root)
+        while True:
+            i = bisect_left(node.keys, key)
+            if i < len(node.keys) and node.keys[i] == key:
+                result = node, i
+                break
+            if node.leaf:
+                result = None
+                break
+            node = self.read_node(node.children[i])
+        self._end()
+        return result
+
+    # ---- insert ----------------------------------------------------------
+
+    def insert(self, k):
+        self._begin()
+        t = self.t
+        root = self.read_node(self.root)
+
+        if len(root.keys) == (2 * t) - 1:  # full root: the tree grows by 1
+            new_root = self.allocate_node()
+            new_root.children.append(root.pid)
+            self.root = new_root.pid
+            self.split_child(new_root, 0)
+            root = new_root
+            self._pin_levels()
+
+        self.insert_non_full(root, k)
+        self._end()
+
+    def split_child(self, x, i):
+        t = self.t
+        y = self.read_node(x.children[i])  # full child to split
+        z = self.allocate_node(y.leaf)
+
+        x.children.insert(i + 1, z.pid)
+        x.keys.insert(i, y.keys[t - 1])  # median key moves up into x
+        level = self.levels.get(x.pid)
+        if level is not None and level + 1 < self.pinned_levels:
+            self.pool.fix(z.pid)  # z is a top level page as y
+            self.levels[z.pid] = level + 1
+
+        z.keys = y.keys[t: (2 * t) - 1]
+        y.keys = y.keys[0: t - 1]
+        if not y.leaf:
+            z.children = y.children[t: 2 * t]
+            y.children = y.children[0: t]
+
+        self.write_node(y)
+        self.write_node(z)
+        self.write_node(x)
+
+    def insert_non_full(self, x, k):
+        t = self.t
+        while not x.leaf:
+            i = bisect_left(x.keys, k)
+            child = self.read_node(x.children[i])
+            if len(child.keys) == (2 * t) - 1:
+                self.split_child(x, i)
+                if k > x.keys[i]:
+                    i += 1
+                child = self.read_node(x.children[i])
+            x = child
+
+        x.keys.insert(bisect_left(x.keys, k), k)
+        self.write_node(x)
+
+    # ---- delete ----------------------------------------------------------
+
+    def delete(self, x, k):
+        """
+        Delete key k; x is the root page id, kept for symmetry with
+        BTree.delete(root, key)
+        """
+        self._begin()
+        node = self.read_node(x)
+        self.delete_rec(node, k)
+
+        root = self.read_node(self.root)
+        if not root.keys and not root.leaf:  # the root was emptied by a
+                                             # merge: the tree shrinks by 1
+            self.root = root.children[0]
+            self.free_node(root)
+            self._pin_levels()
+        self._end()
+
+    def delete_rec(self, x, k):
+        # CLRS delete: every node we descend into has at least t keys, so a
+        # key can always be removed from a leaf without further rebalancing
+        t = self.t
+        i = bisect_left(x.keys, k)
+
+        if i < len(x.keys) and x.keys[i] == k:
+            if x.leaf:  # case 1: key in a leaf
+                x.keys.pop(i)
+                self.write_node(x)
+                return
+
+            y = self.read_node(x.children[i])
+            if len(y.keys) >= t:  # case 2a: replace k with its predecessor
+                pred = self._max_key(y)
+                x.keys[i] = pred
+                self.write_node(x)
+                self.delete_rec(y, pred)
+                return
+
+            z = self.read_node(x.children[i + 1])
+            if len(z.keys) >= t:  # case 2b: replace k with its successor
+                succ = self._min_key(z)
+                x.keys[i] = succ
+                self.write_node(x)
+                self.delete_rec(z, succ)
+                return
+
+            self.delete_merge(x, i, y, z)  # case 2c: merge and go down
+            self.delete_rec(y, k)
+            return
+
+        if x.leaf:  # key not in the tree
+            return
+
+        c = self.read_node(x.children[i])
+        if len(c.keys) == t - 1:  # case 3: make sure c has at least t keys
+            left = self.read_node(x.children[i - 1]) if i > 0 else None
+            right = self.read_node(x.children[i + 1]) \
+                if i < len(x.children) - 1 else None
+
+            if left is not None and len(left.keys) >= t:  # 3a from left
+                c.keys.insert(0, x.keys[i - 1])
+                x.keys[i - 1] = left.keys.pop()
+                if not left.leaf:
+                    c.children.insert(0, left.children.pop())
+                self.write_node(left)
+                self.write_node(c)
+                self.write_node(x)
+            elif right is not None and len(right.keys) >= t:  # 3a from right
+                c.keys.append(x.keys[i])
+                x.keys[i] = right.keys.pop(0)
+                if not right.leaf:
+                    c.children.append(right.children.pop(0))
+                self.write_node(right)
+                self.write_node(c)
+                self.write_node(x)
+            elif right is not None:  # 3b: merge with right sibling
+                self.delete_merge(x, i, c, right)
+            else:  # 3b: merge with left sibling
+                self.delete_merge(x, i - 1, left, c)
+                c = left
+
+        self.delete_rec(c, k)
+
+    def delete_merge(self, x, i, y, z):
+        # move separator x.keys[i] and all of z into y, then free z's page
+        y.keys.append(x.keys.pop(i))
+        y.keys.extend(z.keys)
+        y.children.extend(z.children)
+        x.children.pop(i + 1)
+        self.write_node(y)
+        self.write_node(x)
+        self.free_node(z)
+
+    def _max_key(self, x):
+        while not x.leaf:
+            x = self.read_node(x.children[-1])
+        return x.keys[-1]
+
+    def _min_key(self, x):
+        while not x.leaf:
+            x = self.read_node(x.children[0])
+        return x.keys[0]
+
+    def print_tree(self, pid=None, level=0):
+        x = self.read_node(self.root if pid is None else pid)
+        print(f'Level {level}', end=": ")
+        for i in x.keys:
+            print(i, end=" ")
+        print()
+        for child in x.children:
+            self.print_tree(child, level + 1)
+        if level == 0:
+            self.pool.release()
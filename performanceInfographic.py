@@ -1,105 +1,72 @@
-import matplotlib
-
-matplotlib.use('TkAgg')
-import matplotlib.pyplot as plt
 import time
 
-from btree import BTree
-from binarysearchtree import BinarySearchTree
+from metrics import MetricsRecorder
 
 
 class PlotGenerator:
 
-    def __init__(self):
-        self.read_countsBST = []
-        self.write_countsBST = []
-        self.timesBST = []
+    def __init__(self, recorder=None):
+        # every measured operation is streamed into the recorder, which keeps
+        # all the phases (Insert, Search, Delete) of both trees
+        self.recorder = recorder if recorder is not None else MetricsRecorder()
 
-        self.read_countsBT = []
-        self.write_countsBT = []
-        self.timesBT = []
+    # the recorder keeps its column files until closed: a recorder created
+    # here removes its temporary directory
+    def close(self):
+        self.recorder.close()
 
     # method that measures time performance for each operation
     def measure_tree_performanceBST(self, bstree, keys, performance):
-        self.read_countsBST = []
-        self.write_countsBST = []
-        self.timesBST = []
-
-        for key in keys:
-            start_time = time.perf_counter()  # time in sec
-
-            if performance == "Insert":
-                bstree.insert(key)
-            elif performance == "Search":
-                bstree.search(key)
-            elif performance == "Delete":
-                bstree.delete(key)
-
-            end_time = time.perf_counter()
-            self.timesBST.append(end_time - start_time)
-            self.read_countsBST.append(bstree.nodes_read)
-            self.write_countsBST.append(bstree.nodes_written)
-
-        return sum(self.timesBST)
-
+        operations = {"Insert": bstree.insert, "Search": bstree.search,
+                      "Delete": bstree.delete}
+        return self._measure("BST", bstree, operations[performance], keys,
+                             performance)
 
     def measure_tree_performanceBT(self, btree, keys, performance):
-        self.read_countsBT = []
-        self.write_countsBT = []
-        self.timesBT = []
-
-        for key in keys:
-            start_time = time.perf_counter()  # time in sec
-
-            if performance == "Insert":
-                btree.insert(key)
-            elif performance == "Search":
-                btree.search(key)
-            elif performance == "Delete":
-                btree.delete(btree.root, key)
+        operations = {"Insert": btree.insert, "Search": btree.search,
+                      "Delete": lambda key: btree.delete(btree.root, key)}
+        return self._measure("BT", btree, operations[performance], keys,
+                             performance)
 
-            end_time = time.perf_counter()
-            self.timesBT.append(end_time - start_time)
-            self.read_countsBT.append(btree.nodes_read)
-            self.write_countsBT.append(btree.nodes_written)
+    def _measure(self, series, tree, operation, keys, performance):
+        record = self.recorder.record
+        phase = self.recorder.phase(series, performance)
+        total = 0
 
-        return sum(self.timesBT)
+        for key in keys:
+            start_time = time.perf_counter_ns()  # time in ns
+            operation(key)
+            elapsed = time.perf_counter_ns() - start_time
+            total += elapsed
+            record(phase, key, elapsed, tree.nodes_read, tree.nodes_written)
 
+        return total / 1e9  # total time in sec
 
+    def _samples(self, series, performance):
+        samples = self.recorder.samples(series, performance)
+        return (samples['key'], samples['ns'] / 1e9, samples['reads'],
+                samples['writes'])
 
-    # infographic data from measured performance
-    def plot_performance(self, tree, keys, performance):
+    # infographic data from measured performance; series is the name the
+    # tree was measured under: "BT" (measure_tree_performanceBT, any B tree
+    # including PagedBTree) or "BST"
+    def plot_performance(self, series, performance):
+        import matplotlib.pyplot as plt  # imported only when plotting
 
-        isbtree = isinstance(tree, BTree)
+        keys, times, read_counts, write_counts = \
+            self._samples(series, performance)
 
         plt.figure(figsize=(10, 6))
         plt.subplot(3, 1, 1)
 
-        if(not isbtree):
-            if performance == "Insert":
-                plt.scatter(keys, self.timesBST, label="Insert Time", s=4)
-            if performance == "Search":
-                plt.scatter(keys, self.timesBST, label="Search Time", s=4)
-            if performance == "Delete":
-                plt.scatter(keys, self.timesBST, label="Delete Time", s=4)
-        else:
-            if performance == "Insert":
-                plt.scatter(keys, self.timesBT, label="Insert Time", s=4)
-            if performance == "Search":
-                plt.scatter(keys, self.timesBT, label="Search Time", s=4)
-            if performance == "Delete":
-                plt.scatter(keys, self.timesBT, label="Delete Time", s=4)
+        plt.scatter(keys, times, label=f"{performance} Time", s=4)
 
         plt.ylabel('Time (s)')
         plt.legend()
 
         plt.subplot(3, 1, 2)
-        if(not isbtree):
-            plt.scatter(keys, self.read_countsBST, label="Read Nodes", color='orange', s=4)
-            plt.yticks(range(min(self.read_countsBST), max(self.read_countsBST) + 1, 2))
-        else:
-            plt.scatter(keys, self.read_countsBT, label="Read Nodes", color='orange', s=4)
-            plt.yticks(range(min(self.read_countsBT), max(self.read_countsBT) + 1, 2))
+        plt.scatter(keys, read_counts, label="Read Nodes", color='orange', s=4)
+        plt.yticks(range(int(read_counts.min()), int(read_counts.max()) + 1, 2))
 
         plt.ylabel('Read Nodes')
         plt.legend()
@@ -107,12 +74,8 @@ class PlotGenerator:
         plt.subplot(3, 1, 3)
         plt.ylabel('Written Nodes')
         if performance == "Insert" or performance == "Delete":
-            if(not isbtree):
-                plt.scatter(keys, self.write_countsBST, label="Written Nodes", color='green', s=4)
-                plt.yticks(range(min(self.write_countsBST), max(self.write_countsBST) + 1))
-            else:
-                plt.scatter(keys, self.write_countsBT, label="Written Nodes", color='green', s=4)
-                plt.yticks(range(min(self.write_countsBT), max(self.write_countsBT) + 1))
+            plt.scatter(keys, write_counts, label="Written Nodes", color='green', s=4)
+            plt.yticks(range(int(write_counts.min()), int(write_counts.max()) + 1))
         else:
             plt.plot(0, 0, label="Written Nodes", color='green')
         plt.legend()
@@ -126,27 +89,25 @@ class PlotGenerator:
         plt.show()
 
 
-    def plotComparingPerformances(self, keys, performance):
+    def plotComparingPerformances(self, performance):
+        import matplotlib.pyplot as plt
+        keysBST, timesBST, read_countsBST, write_countsBST = \
+            self._samples("BST", performance)
+        keysBT, timesBT, read_countsBT, write_countsBT = \
+            self._samples("BT", performance)
+
         plt.figure(figsize=(10, 6))
         plt.subplot(3, 1, 1)
 
-        if performance == "Insert":
-            plt.scatter(keys, self.timesBST, label="Insert Time BST", color='blue', s = 4)
-            plt.scatter(keys, self.timesBT, label="Insert Time BT", color='purple', s = 4)
-        if performance == "Search":
-            plt.scatter(keys, self.timesBST, label="Search Time BST", color='blue', s = 4)
-            plt.scatter(keys, self.timesBT, label="Search Time BT", color='purple', s = 4)
-        if performance == "Delete":
-            plt.scatter(keys, self.timesBST, label="Delete Time BST", color='blue', s = 4)
-            plt.scatter(keys, self.timesBT, label="Delete Time BT", color='purple', s = 4)
-            #plt.yticks(range(min(self.timesBT), max(self.timesBT) + 1))
+        plt.scatter(keysBST, timesBST, label=f"{performance} Time BST", color='blue', s = 4)
+        plt.scatter(keysBT, timesBT, label=f"{performance} Time BT", color='purple', s = 4)
 
         plt.ylabel('Time (s)')
         plt.legend()
 
         plt.subplot(3, 1, 2)
-        plt.scatter(keys, self.read_countsBST, label="Read Nodes BST", color='orange', s = 4)
-        plt.scatter(keys, self.read_countsBT, label="Read Nodes BT", color='red', s = 4)
+        plt.scatter(keysBST, read_countsBST, label="Read Nodes BST", color='orange', s = 4)
+        plt.scatter(keysBT, read_countsBT, label="Read Nodes BT", color='red', s = 4)
         #plt.yticks(range(min(self.read_counts), max(self.read_counts) + 1))
         plt.ylabel('Read Nodes')
         plt.legend()
@@ -154,8 +115,8 @@ class PlotGenerator:
         plt.subplot(3, 1, 3)
         plt.ylabel('Written Nodes')
         if performance == "Insert" or performance == "Delete":
-            plt.scatter(keys, self.write_countsBST, label="Written Nodes BST", color='green', s = 4)
-            plt.scatter(keys, self.write_countsBT, label="Written Nodes BT", color='yellow', s = 4)
+            plt.scatter(keysBST, write_countsBST, label="Written Nodes BST", color='green', s = 4)
+            plt.scatter(keysBT, write_countsBT, label="Written Nodes BT", color='yellow', s = 4)
             #plt.yticks(range(min(self.write_counts), max(self.write_counts) + 1))
         else:
             plt.plot(0, 0, label="Written Nodes", color='green')
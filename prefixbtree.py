@@ -0,0 +1,297 @@
+from array import array
+from bisect import bisect_left
+from os.path import commonprefix
+
+from btree import BTree, CompactNodeBT, NodeBT
+from tracing import SPLIT
+
+# unsigned array types for the deltas, narrowest first
+DELTA_TYPECODES = ('B', 'H', 'I', 'Q')
+
+
+class PrefixKeys:
+    """
+    Sorted str, bytes or tuple keys of a node, the prefix common to all of
+    them being stored once and every key as its suffix. Supports the list
+    operations used by BTree (bisect, insert, pop, slices, extend, item
+    assignment): an inserted key that does not share the prefix shortens
+    it, a slice (the halves of a split) lengthens it again.
+    """
+    __slots__ = ('prefix', 'suffixes')
+
+    def __init__(self, keys=(), prefix=None):
+        self.prefix = prefix  # None until the first key gives the key type
+        self.suffixes = []
+        self.extend(keys)
+
+    def _suffix(self, key):
+        # suffix of key, after shortening the prefix if key does not start
+        # with it
+        prefix = self.prefix
+        if prefix is None:
+            self.prefix = key
+            return key[len(key):]
+        if key[:len(prefix)] != prefix:
+            common = commonprefix([prefix, key])
+            extra = prefix[len(common):]
+            self.suffixes = [extra + suffix for suffix in self.suffixes]
+            self.prefix = prefix = common
+        return key[len(prefix):]
+
+    def _lengthen_prefix(self):
+        # the keys are sorted: the prefix common to all of them is the one
+        # of the first and the last
+        if self.suffixes:
+            extra = commonprefix([self.suffixes[0], self.suffixes[-1]])
+            if extra:
+                self.prefix += extra
+                self.suffixes = [suffix[len(extra):] for suffix in self.suffixes]
+
+    def find(self, key):
+        """
+        (index of the first key >= key, whether that key is equal to key),
+        comparing the prefix once and then the suffixes only
+        """
+        prefix = self.prefix
+        if prefix is None:
+            return 0, False
+        if key[:len(prefix)] != prefix:
+            return (0 if key < prefix else len(self.suffixes)), False
+        suffix = key[len(prefix):]
+        i = bisect_left(self.suffixes, suffix)
+        return i, i < len(self.suffixes) and self.suffixes[i] == suffix
+
+    def __len__(self):
+        return len(self.suffixes)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            part = PrefixKeys(prefix=self.prefix)
+            part.suffixes = self.suffixes[i]
+            part._lengthen_prefix()
+            return part
+        return self.prefix + self.suffixes[i]
+
+    def __setitem__(self, i, key):
+        suffix = self._suffix(key)
+        self.suffixes[i] = suffix
+
+    def __iter__(self):
+        prefix = self.prefix
+        for suffix in self.suffixes:
+            yield prefix + suffix
+
+    def insert(self, i, key):
+        suffix = self._suffix(key)
+        self.suffixes.insert(i, suffix)
+
+    def append(self, key):
+        suffix = self._suffix(key)
+        self.suffixes.append(suffix)
+
+    def extend(self, keys):
+        if isinstance(keys, PrefixKeys) and keys.prefix is not None:
+            if self.prefix is None:
+                self.prefix = keys.prefix
+            if keys.prefix[:len(self.prefix)] == self.prefix:
+                # merge: the suffixes move without decoding the keys
+                extra = keys.prefix[len(self.prefix):]
+                self.suffixes.extend([extra + suffix for suffix in keys.suffixes])
+                return
+        for key in keys:
+            self.append(key)
+
+    def pop(self, i=-1):
+        return self.prefix + self.suffixes.pop(i)
+
+    def nbytes(self):
+        """
+        Size of the keys encoded in a page: the prefix and every suffix,
+        each one preceded by a 2 byte length. Only str (UTF-8) and bytes
+        keys have a byte size: TypeError for tuple keys.
+        """
+        def size(key):
+            if isinstance(key, str):
+                return len(key.encode())
+            if isinstance(key, bytes):
+                return len(key)
+            raise TypeError(f"no encoded size for {type(key).__name__} keys, "
+                            f"only str and bytes")
+        return 2 + size(self.prefix or b'') + \
+            sum(2 + size(suffix) for suffix in self.suffixes)
+
+    def __repr__(self):
+        return f"PrefixKeys({self.prefix!r}, {self.suffixes!r})"
+
+
+class DeltaKeys:
+    """
+    Sorted 64 bit integer keys of a node stored as base + delta, the deltas
+    in the narrowest unsigned array that holds them (1, 2, 4 or 8 bytes).
+    Supports the same list operations as PrefixKeys; a key below the base
+    or a delta too large for the array re-encodes the node, a slice starts
+    again from the narrowest array.
+    """
+    __slots__ = ('base', 'deltas')
+
+    def __init__(self, keys=()):
+        self._encode(list(keys))
+
+    def _encode(self, keys, low=None, high=None):
+        # deltas from low, in an array wide enough for high (by default the
+        # first and the last key)
+        if keys:
+            low = keys[0] if low is None else low
+            high = keys[-1] if high is None else high
+        self.base = low
+        span = high - low if low is not None else 0
+        for typecode in DELTA_TYPECODES:
+            deltas = array(typecode)
+            if span < 1 << (8 * deltas.itemsize):
+                break
+        deltas.extend(key - low for key in keys)
+        self.deltas = deltas
+
+    def _delta(self, key):
+        # delta of key, after re-encoding the node if it does not fit
+        base = self.base
+        if base is None:
+            self._encode([], key, key)
+        elif key < base or key - base >= 1 << (8 * self.deltas.itemsize):
+            keys = list(self)
+            self._encode(keys, min(base, key), max(keys[-1] if keys else key, key))
+        return key - self.base
+
+    def find(self, key):
+        """
+        (index of the first key >= key, whether that key is equal to key),
+        comparing the deltas only
+        """
+        if self.base is None or key < self.base:
+            return 0, False
+        delta = key - self.base
+        i = bisect_left(self.deltas, delta)
+        return i, i < len(self.deltas) and self.deltas[i] == delta
+
+    def __len__(self):
+        return len(self.deltas)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            base = self.base
+            return DeltaKeys([base + delta for delta in self.deltas[i]])
+        return self.base + self.deltas[i]
+
+    def __setitem__(self, i, key):
+        delta = self._delta(key)
+        self.deltas[i] = delta
+
+    def __iter__(self):
+        base = self.base
+        for delta in self.deltas:
+            yield base + delta
+
+    def insert(self, i, key):
+        delta = self._delta(key)
+        self.deltas.insert(i, delta)
+
+    def append(self, key):
+        delta = self._delta(key)
+        self.deltas.append(delta)
+
+    def extend(self, keys):
+        for key in keys:
+            self.append(key)
+
+    def pop(self, i=-1):
+        return self.base + self.deltas.pop(i)
+
+    def nbytes(self):
+        """
+        Size of the keys encoded in a page: type code, base and deltas
+        """
+        return 1 + 8 + self.deltas.itemsize * len(self.deltas)
+
+    def __repr__(self):
+        return f"DeltaKeys({self.base}, {self.deltas!r})"
+
+
+class PrefixNodeBT(NodeBT):
+    __slots__ = ()
+
+    def __init__(self, leaf=False):
+        self.keys = PrefixKeys()
+        self.children = []
+        self.leaf = leaf
+
+
+class DeltaNodeBT(CompactNodeBT):
+    __slots__ = ()
+
+    def __init__(self, leaf=False):
+        self.keys = DeltaKeys()
+        self.children = []
+        self.leaf = leaf
+
+
+class PrefixBTree(BTree):
+    """
+    BTree with compressed node keys: str, bytes or tuple keys with a prefix
+    per node (PrefixKeys), or with compact=True 64 bit integers
+    delta-encoded from the smallest key of the node (DeltaKeys). A search
+    compares the prefix of a node once and then the suffixes (or deltas)
+    only, and so does the descent of an insert; splits and merges move
+    suffixes, so the keys are not rebuilt. The other operations see the
+    keys through the list interface.
+    """
+
+    def __init__(self, t, compact=False):
+        super().__init__(t, compact)
+        self.node_class = DeltaNodeBT if compact else PrefixNodeBT
+        self.root = self.node_class(True)
+
+    def _search_recursive(self, node, key):
+        # called by BTree.search with the root; the descent is a loop, the
+        # time saved on the calls pays for find
+        if self._tracer is not None:
+            self._trace_root()
+        while True:
+            i, found = node.keys.find(key)
+            if found:
+                return node, i
+            if node.leaf:
+                return None
+            node = node.children[i]
+            self.read_node(node)
+
+    def insert_non_full(self, x, k):
+        # BTree.insert_non_full with find in place of bisect_right, which
+        # would decode a key per probe; i + found is the bisect_right of a
+        # node without duplicates
+        t = self.t
+        i, found = x.keys.find(k)
+        i += found
+        if x.leaf:
+            x.keys.insert(i, k)
+            self.write_node(x)
+            return
+
+        self.read_node(x.children[i])
+        if len(x.children[i].keys) == (2 * t) - 1:
+            self.split_child(x, i)
+            self.write_node(x.children[i], SPLIT)
+            if k > x.keys[i]:
+                i += 1
+        self.insert_non_full(x.children[i], k)
+
+    def nbytes(self):
+        """
+        Encoded size of the keys of all the nodes (see PrefixKeys.nbytes
+        and DeltaKeys.nbytes; TypeError for tuple keys)
+        """
+        total = 0
+        level = [self.root]
+        while level:
+            total += sum(node.keys.nbytes() for node in level)
+            level = [child for node in level for child in node.children]
+        return total
@@ -0,0 +1,239 @@
+from binarysearchtree import Node, BinarySearchTree
+
+RED = True
+BLACK = False
+
+
+class RBNode(Node):
+    __slots__ = ('parent', 'color')
+
+    def __init__(self, key, parent=None):
+        super().__init__(key)
+        self.parent = parent
+        self.color = RED  # a new node is always red
+
+
+def is_red(node):
+    return node is not None and node.color == RED
+
+
+class RedBlackTree(BinarySearchTree):
+    """
+    Red-black tree with the same API and counters of BinarySearchTree
+    (search is inherited). Besides the nodes written by the plain BST
+    operations, every rotation writes the two rotated nodes and every
+    recoloring writes the recolored node; the uncle (insert) and the sibling
+    (delete) inspected by the fix-up are counted as read nodes.
+    """
+
+    def insert(self, key):
+        # reset counters before each new insert operation
+        self.nodes_read = 0
+        self.nodes_written = 0
+
+        parent = None
+        node = self.root
+        while node is not None:
+            self.nodes_read += 1
+            parent = node
+            if key < node.key:
+                node = node.left
+            elif key > node.key:
+                node = node.right
+            else:  # key already in the tree
+                return
+
+        new = RBNode(key, parent)
+        self.nodes_written += 1
+        if parent is None:
+            self.root = new
+        elif key < parent.key:
+            parent.left = new
+        else:
+            parent.right = new
+
+        self._insert_fixup(new)
+
+    def insert_many(self, keys):
+        # rotations move the nodes of the shared path, so batches fall back
+        # to one descent per key
+        return self._apply_many(self.insert, keys)
+
+    def delete_many(self, keys):
+        return self._apply_many(self.delete, keys)
+
+    def _insert_fixup(self, z):
+        while is_red(z.parent):
+            p = z.parent
+            g = p.parent  # a red node is never the root, so g exists
+            if p is g.left:
+                uncle = g.right
+                if uncle is not None:
+                    self.nodes_read += 1
+                if is_red(uncle):  # case 1: recolor and move up
+                    p.color = uncle.color = BLACK
+                    g.color = RED
+                    self.nodes_written += 3
+                    z = g
+                else:
+                    if z is p.right:  # case 2: turn into case 3
+                        z = p
+                        self._rotate_left(z)
+                        p = z.parent
+                    p.color = BLACK  # case 3
+                    g.color = RED
+                    self.nodes_written += 2
+                    self._rotate_right(g)
+            else:  # symmetric cases with p as right child
+                uncle = g.left
+                if uncle is not None:
+                    self.nodes_read += 1
+                if is_red(uncle):
+                    p.color = uncle.color = BLACK
+                    g.color = RED
+                    self.nodes_written += 3
+                    z = g
+                else:
+                    if z is p.left:
+                        z = p
+                        self._rotate_right(z)
+                        p = z.parent
+                    p.color = BLACK
+                    g.color = RED
+                    self.nodes_written += 2
+                    self._rotate_left(g)
+
+        if self.root.color == RED:
+            self.root.color = BLACK
+            self.nodes_written += 1
+
+    def delete(self, key):
+        # reset counters before each new delete operation
+        self.nodes_read = 0
+        self.nodes_written = 0
+
+        z = self.root
+        while z is not None and key != z.key:
+            self.nodes_read += 1
+            z = z.left if key < z.key else z.right
+
+        if z is None:  # key not in the tree
+            return
+
+        self.nodes_read += 1
+
+        if z.left is not None and z.right is not None:
+            # two children: copy the inorder successor key in z, then remove
+            # the successor, which has no left child
+            succ = z.right
+            self.nodes_read += 1
+            while succ.left is not None:
+                succ = succ.left
+                self.nodes_read += 1
+            z.key = succ.key
+            self.nodes_written += 1
+            z = succ
+
+        # z has at most one child, which takes its place
+        child = z.right if z.left is None else z.left
+        parent = z.parent
+        self._transplant(z, child)
+        self.nodes_written += 1
+
+        if z.color == BLACK:
+            if is_red(child):
+                child.color = BLACK
+                self.nodes_written += 1
+            else:
+                self._delete_fixup(child, parent)
+
+    def _delete_fixup(self, x, parent):
+        # x carries an extra black; x may be None, hence its parent is kept
+        # apart
+        while x is not self.root and not is_red(x):
+            if x is parent.left:
+                w = parent.right  # the sibling always exists here
+                self.nodes_read += 1
+                if is_red(w):  # case 1: make the sibling black
+                    w.color = BLACK
+                    parent.color = RED
+                    self.nodes_written += 2
+                    self._rotate_left(parent)
+                    w = parent.right
+                    self.nodes_read += 1
+                if not is_red(w.left) and not is_red(w.right):  # case 2
+                    w.color = RED
+                    self.nodes_written += 1
+                    x = parent
+                    parent = x.parent
+                else:
+                    if not is_red(w.right):  # case 3: turn into case 4
+                        w.left.color = BLACK
+                        w.color = RED
+                        self.nodes_written += 2
+                        self._rotate_right(w)
+                        w = parent.right
+                    w.color = parent.color  # case 4
+                    parent.color = BLACK
+                    w.right.color = BLACK
+                    self.nodes_written += 3
+                    self._rotate_left(parent)
+                    x = self.root
+            else:  # symmetric cases with x as right child
+                w = parent.left
+                self.nodes_read += 1
+                if is_red(w):
+                    w.color = BLACK
+                    parent.color = RED
+                    self.nodes_written += 2
+                    self._rotate_right(parent)
+                    w = parent.left
+                    self.nodes_read += 1
+                if not is_red(w.left) and not is_red(w.right):
+                    w.color = RED
+                    self.nodes_written += 1
+                    x = parent
+                    parent = x.parent
+                else:
+                    if not is_red(w.left):
+                        w.right.color = BLACK
+                        w.color = RED
+                        self.nodes_written += 2
+                        self._rotate_left(w)
+                        w = parent.left
+                    w.color = parent.color
+                    parent.color = BLACK
+                    w.left.color = BLACK
+                    self.nodes_written += 3
+                    self._rotate_right(parent)
+                    x = self.root
+
+        if is_red(x):
+            x.color = BLACK
+            self.nodes_written += 1
+
+    def _transplant(self, u, v):
+        # v takes the place of u under u's parent
+        self._replace_child(u.parent, u, v)
+        if v is not None:
+            v.parent = u.parent
+
+    def _rotate_left(self, x):
+        y = x.right
+        x.right = y.left
+        if y.left is not None:
+            y.left.parent = x
+        self._transplant(x, y)
+        y.left = x
+        x.parent = y
+        self.nodes_written += 2  # both rotated nodes are rewritten
+
+    def _rotate_right(self, y):
+        x = y.left
+        y.left = x.right
+        if x.right is not None:
+            x.right.parent = y
+        self._transplant(y, x)
+        x.right = y
+        y.parent = x
+        self.nodes_written += 2
@@ -0,0 +1,298 @@
+import heapq
+import multiprocessing
+from bisect import bisect_left, bisect_right
+
+from btree import BTree
+
+PARTITIONS = ('hash', 'range')
+
+
+class Shard:
+    """
+    One BTree of a ShardedBTree, with the counters of all the operations it
+    has run. Every method returns plain values (no node), so a shard can
+    live in another process.
+    """
+
+    def __init__(self, t, compact=False):
+        self.tree = BTree(t, compact)
+        self.operations = 0  # keys inserted, searched or deleted
+        self.nodes_read = 0  # totals over all the operations
+        self.nodes_written = 0
+
+    def _count(self, operations):
+        self.operations += operations
+        self.nodes_read += self.tree.nodes_read
+        self.nodes_written += self.tree.nodes_written
+        return self.tree.nodes_read, self.tree.nodes_written
+
+    def insert(self, k):
+        self.tree.insert(k)
+        return self._count(1)
+
+    def search(self, key):
+        found = self.tree.search(key) is not None
+        return (found,) + self._count(1)
+
+    def delete(self, k):
+        self.tree.delete(self.tree.root, k)
+        return self._count(1)
+
+    def insert_many(self, keys):
+        stats = self.tree.insert_many(keys)
+        return (stats,) + self._count(len(keys))
+
+    def search_many(self, keys):
+        stats = [(key, result is not None, reads)
+                 for key, result, reads in self.tree.search_many(keys)]
+        return (stats,) + self._count(len(keys))
+
+    def delete_many(self, keys):
+        stats = self.tree.delete_many(keys)
+        return (stats,) + self._count(len(keys))
+
+    def range(self, lo, hi):
+        keys = list(self.tree.range(lo, hi))
+        return (keys,) + self._count(0)
+
+    def stats(self):
+        return {'operations': self.operations, 'nodes_read': self.nodes_read,
+                'nodes_written': self.nodes_written}
+
+
+def _serve(conn, t, compact):
+    # main loop of a shard process: run the calls received on conn
+    shard = Shard(t, compact)
+    while True:
+        method, args = conn.recv()
+        if method == 'close':
+            break
+        try:
+            conn.send(('ok', getattr(shard, method)(*args)))
+        except Exception as exc:
+            conn.send(('error', exc))
+    conn.close()
+
+
+class _LocalShard:
+    # shard run in the calling process, with the interface of _ShardProcess
+
+    def __init__(self, t, compact):
+        self.shard = Shard(t, compact)
+        self.result = None
+        self.error = None
+
+    def send(self, method, *args):
+        # an error is raised by recv, as a shard process does
+        try:
+            self.result = getattr(self.shard, method)(*args)
+        except Exception as exc:
+            self.error = exc
+
+    def recv(self):
+        error, self.error = self.error, None
+        if error is not None:
+            raise error
+        return self.result
+
+    def close(self):
+        pass
+
+
+class _ShardProcess:
+    # shard owned by a worker process: send starts a call, recv waits for
+    # its result, so calls sent to several shards run in parallel
+
+    def __init__(self, t, compact):
+        self.conn, child = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=_serve,
+                                               args=(child, t, compact),
+                                               daemon=True)
+        self.process.start()
+        child.close()
+
+    def send(self, method, *args):
+        self.conn.send((method, args))
+
+    def recv(self):
+        status, value = self.conn.recv()
+        if status == 'error':
+            raise value
+        return value
+
+    def close(self):
+        if self.conn.closed:  # already closed
+            return
+        self.conn.send(('close', ()))
+        self.process.join()
+        self.conn.close()
+
+
+def range_boundaries(sample, shards):
+    """
+    shards - 1 split keys cutting a sample of the keys in equal parts, for
+    ShardedBTree(partition='range')
+    """
+    sample = sorted(sample)
+    return [sample[len(sample) * i // shards] for i in range(1, shards)]
+
+
+class ShardedBTree:
+    """
+    Index split into shards BTrees, each one owned by its own worker
+    process (or run in the calling process with processes=False). A key
+    goes to shard hash(key) % shards with partition='hash', or to the shard
+    of its interval with partition='range', the intervals being cut by the
+    sorted boundaries (shards - 1 keys, see range_boundaries).
+
+    insert/search/delete take a key like DurableBTree; search returns
+    whether the key is present, nodes cannot leave their process.
+    insert_many/search_many/delete_many route a batch to the shards, which
+    run their part in parallel, and return the per-key stats of all the
+    shards in key order. range merges the sorted keys of the shards with a
+    k-way merge, so a scan sees the keys in order whatever the partitioning.
+
+    nodes_read/nodes_written are summed over the shards used by the last
+    operation; shard_stats() gives the totals of every shard.
+    """
+
+    def __init__(self, t, shards=4, partition='hash', boundaries=None,
+                 processes=True, compact=False):
+        if shards < 1:
+            raise ValueError("a sharded tree needs at least one shard")
+        if partition not in PARTITIONS:
+            raise ValueError(f"unknown partition {partition!r}, choose one of "
+                             f"{', '.join(PARTITIONS)}")
+        if partition == 'range':
+            if boundaries is None or len(boundaries) != shards - 1:
+                raise ValueError(f"range partitioning of {shards} shards needs "
+                                 f"{shards - 1} boundaries")
+            if any(a > b for a, b in zip(boundaries, boundaries[1:])):
+                raise ValueError("boundaries are not sorted")
+        self.t = t
+        self.partition = partition
+        self.boundaries = list(boundaries) if boundaries is not None else None
+        shard_class = _ShardProcess if processes else _LocalShard
+        self.shards = [shard_class(t, compact) for _ in range(shards)]
+        self.nodes_read = 0
+        self.nodes_written = 0
+
+    def shard_of(self, key):
+        if self.partition == 'hash':
+            return hash(key) % len(self.shards)
+        return bisect_right(self.boundaries, key)
+
+    # ---- single keys -------------------------------------------------------
+
+    def _call(self, key, method):
+        shard = self.shards[self.shard_of(key)]
+        shard.send(method, key)
+        *result, self.nodes_read, self.nodes_written = shard.recv()
+        return result
+
+    def insert(self, k):
+        self._call(k, 'insert')
+
+    def search(self, key):
+        found, = self._call(key, 'search')
+        return found
+
+    def delete(self, k):
+        self._call(k, 'delete')
+
+    # ---- batches -----------------------------------------------------------
+
+    def _gather(self, shards):
+        # read the reply of every shard before raising the first error, so
+        # no reply is left in a pipe for the next call
+        results = []
+        error = None
+        for shard in shards:
+            try:
+                results.append(shard.recv())
+            except Exception as exc:
+                if error is None:
+                    error = exc
+        if error is not None:
+            raise error
+        return results
+
+    def _scatter(self, method, keys):
+        # send every shard its part of the batch, then gather the results
+        parts = [[] for _ in self.shards]
+        for key in keys:
+            parts[self.shard_of(key)].append(key)
+        used = [(shard, part) for shard, part in zip(self.shards, parts) if part]
+        for shard, part in used:
+            shard.send(method, part)
+        results = self._gather([shard for shard, _ in used])
+        self.nodes_read = sum(reads for _, reads, _ in results)
+        self.nodes_written = sum(writes for _, _, writes in results)
+        return [stats for stats, _, _ in results]
+
+    def insert_many(self, keys):
+        """
+        Insert a batch of keys; returns a (key, nodes_read, nodes_written)
+        tuple per key in key order, as BTree.insert_many
+        """
+        return list(heapq.merge(*self._scatter('insert_many', keys)))
+
+    def search_many(self, keys):
+        """
+        Search a batch of keys; returns a (key, found, nodes_read) tuple per
+        key in key order
+        """
+        return list(heapq.merge(*self._scatter('search_many', keys)))
+
+    def delete_many(self, keys):
+        return list(heapq.merge(*self._scatter('delete_many', keys)))
+
+    # ---- range scans -------------------------------------------------------
+
+    def range(self, lo=None, hi=None):
+        """
+        Yield the keys k with lo <= k < hi in ascending order (None means
+        unbounded). Every shard that can hold such keys is scanned in
+        parallel and returns its whole sorted run, so all the matching keys
+        are materialized before the first one is yielded; only the k-way
+        merge of the runs is lazy. With range partitioning only the shards
+        whose interval meets [lo, hi) are asked.
+        """
+        shards = self.shards
+        if self.partition == 'range':
+            first = 0 if lo is None else self.shard_of(lo)
+            # hi is excluded: when it is a boundary its shard holds no key
+            last = len(shards) - 1 if hi is None else \
+                bisect_left(self.boundaries, hi)
+            shards = shards[first: last + 1]
+        for shard in shards:
+            shard.send('range', lo, hi)
+        results = self._gather(shards)
+        self.nodes_read = sum(reads for _, reads, _ in results)
+        self.nodes_written = 0
+        return heapq.merge(*(keys for keys, _, _ in results))
+
+    def __iter__(self):
+        return self.range()
+
+    # ---- counters ----------------------------------------------------------
+
+    def shard_stats(self):
+        """
+        One dict per shard: operations run, nodes read and written by all of
+        them
+        """
+        for shard in self.shards:
+            shard.send('stats')
+        return self._gather(self.shards)
+
+    def close(self):
+        # closing twice does nothing, so __exit__ can follow a close()
+        for shard in self.shards:
+            shard.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,241 @@
+import mmap
+import struct
+from array import array
+from bisect import bisect_left
+
+from binarysearchtree import BinarySearchTree, Node
+from btree import BTree
+
+# every snapshot starts with a 32 byte header; all the following fields are
+# 8 byte aligned, so the key arrays can be used in place from an mmap
+HEADER = struct.Struct('<4sB3xI4xQQ')  # magic, kind, t, node count, key count
+MAGIC = b'TSNP'
+BTREE = 1
+BST = 2
+
+# B tree snapshot: header, offset of every node (u64), then the nodes in
+# level order, each one a length-prefixed key array: key count, index of the
+# first child (children of a node are consecutive in level order, LEAF for a
+# leaf) and the keys (signed 64 bit integers)
+NODE_HEADER = struct.Struct('<I4xQ')
+LEAF = 0xFFFFFFFFFFFFFFFF
+
+# BST snapshot: header, then one (key, left index, right index) record per
+# node in level order, NULL for a missing child
+BST_NODE = struct.Struct('<qqq')
+NULL = -1
+
+WRITE_BLOCK = 1 << 16  # nodes buffered before a write
+
+
+def _levels(root, children):
+    # nodes in level order, without recursion
+    level = [root]
+    while level:
+        yield from level
+        level = [child for node in level for child in children(node)]
+
+
+def save_btree(tree, path):
+    """
+    Write a BTree of 64 bit integer keys level by level
+    """
+    nodes = list(_levels(tree.root, lambda node: node.children))
+    keys = sum(len(node.keys) for node in nodes)
+
+    with open(path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, BTREE, tree.t, len(nodes), keys))
+
+        offsets = array('Q')
+        offset = HEADER.size + 8 * len(nodes)
+        for node in nodes:
+            offsets.append(offset)
+            offset += NODE_HEADER.size + 8 * len(node.keys)
+        offsets.tofile(file)
+
+        next_child = 1  # index of the first child of the next internal node
+        buffer = bytearray()
+        for number, node in enumerate(nodes, 1):
+            if node.leaf:
+                buffer += NODE_HEADER.pack(len(node.keys), LEAF)
+            else:
+                buffer += NODE_HEADER.pack(len(node.keys), next_child)
+                next_child += len(node.children)
+            buffer += array('q', node.keys).tobytes()
+            if number % WRITE_BLOCK == 0:
+                file.write(buffer)
+                buffer.clear()
+        file.write(buffer)
+
+
+def save_bst(tree, path):
+    """
+    Write a BinarySearchTree (or a subclass) of 64 bit integer keys level
+    by level
+    """
+    nodes = [] if tree.root is None else \
+        list(_levels(tree.root, lambda node: [child for child in
+                                              (node.left, node.right)
+                                              if child is not None]))
+
+    with open(path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, BST, 0, len(nodes), len(nodes)))
+        next_child = 1
+        buffer = bytearray()
+        for number, node in enumerate(nodes, 1):
+            left = right = NULL
+            if node.left is not None:
+                left, next_child = next_child, next_child + 1
+            if node.right is not None:
+                right, next_child = next_child, next_child + 1
+            buffer += BST_NODE.pack(node.key, left, right)
+            if number % WRITE_BLOCK == 0:
+                file.write(buffer)
+                buffer.clear()
+        file.write(buffer)
+
+
+class Snapshot:
+    """
+    Read-only snapshot mapped in memory: opening it only reads the header,
+    the nodes are decoded from the mapping when a search visits them.
+    nodes_read counts the nodes visited by the last search, as the in-memory
+    trees do.
+    """
+
+    kind = None
+
+    def __init__(self, path):
+        with open(path, 'rb') as file:
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, kind, self.t, self.node_count, self.key_count = \
+            HEADER.unpack_from(self.map)
+        if magic != MAGIC or kind != self.kind:
+            self.map.close()
+            raise ValueError(f"{path} is not a {type(self).__name__} file")
+        self.view = memoryview(self.map)
+        self.nodes_read = 0
+        self.nodes_written = 0
+
+    def __len__(self):
+        return self.key_count
+
+    def close(self):
+        self.view.release()
+        self.map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class BTreeSnapshot(Snapshot):
+    kind = BTREE
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.offsets = self.view[HEADER.size: HEADER.size + 8 * self.node_count] \
+            .cast('Q')
+
+    def close(self):
+        self.offsets.release()
+        super().close()
+
+    def _node(self, index):
+        # keys as a memoryview on the mapping (no copy), to be dropped before
+        # close: the mapping cannot be closed while a view is exported
+        offset = self.offsets[index]
+        count, first_child = NODE_HEADER.unpack_from(self.map, offset)
+        start = offset + NODE_HEADER.size
+        return self.view[start: start + 8 * count].cast('q'), first_child
+
+    def node(self, index):
+        """
+        (keys, index of the first child or LEAF) of a node, the keys being
+        copied into a tuple, so they outlive close()
+        """
+        keys, first_child = self._node(index)
+        with keys:
+            return tuple(keys), first_child
+
+    def search(self, key):
+        """
+        Return (node index, key index) or None, like BTree.search
+        """
+        self.nodes_read = 0
+        index = 0
+        while True:
+            keys, first_child = self._node(index)
+            i = bisect_left(keys, key)
+            if i < len(keys) and keys[i] == key:
+                return index, i
+            if first_child == LEAF:
+                return None
+            index = first_child + i
+            self.nodes_read += 1  # the root is not counted, as in BTree
+
+    def to_tree(self, cls=BTree, compact=False):
+        """
+        Materialize the snapshot as a BTree (or a subclass given by cls)
+        """
+        tree = cls(self.t, compact)
+        nodes = []
+        first_children = []
+        for index in range(self.node_count):
+            keys, first_child = self._node(index)
+            node = tree.node_class(first_child == LEAF)
+            node.keys.extend(keys)
+            nodes.append(node)
+            first_children.append(first_child)
+        # the children are linked once every node exists
+        for node, first_child in zip(nodes, first_children):
+            if first_child != LEAF:
+                node.children = nodes[first_child: first_child + len(node.keys) + 1]
+        tree.root = nodes[0]
+        return tree
+
+
+class BSTSnapshot(Snapshot):
+    kind = BST
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.records = self.view[HEADER.size:
+                                 HEADER.size + BST_NODE.size * self.node_count] \
+            .cast('q')
+
+    def close(self):
+        self.records.release()
+        super().close()
+
+    def search(self, key):
+        self.nodes_read = 0
+        records = self.records
+        index = 0 if self.node_count else NULL
+        while index != NULL:
+            self.nodes_read += 1
+            node_key = records[3 * index]
+            if key == node_key:
+                return True
+            index = records[3 * index + 1] if key < node_key \
+                else records[3 * index + 2]
+        return False
+
+    def to_tree(self):
+        """
+        Materialize the snapshot as a BinarySearchTree (the shape is kept,
+        balancing data of AVL/red-black trees is not saved)
+        """
+        tree = BinarySearchTree()
+        records = self.records
+        nodes = [Node(records[3 * index]) for index in range(self.node_count)]
+        for index, node in enumerate(nodes):
+            left, right = records[3 * index + 1], records[3 * index + 2]
+            if left != NULL:
+                node.left = nodes[left]
+            if right != NULL:
+                node.right = nodes[right]
+        tree.root = nodes[0] if nodes else None
+        return tree
@@ -0,0 +1,172 @@
+from array import array
+
+LAYOUTS = ('eytzinger', 'veb')
+NULL = -1  # position of a missing key
+HOLE = (1 << 63) - 1  # unused slot of the van Emde Boas array
+
+
+def _veb_tables(height):
+    # tables of the pointerless van Emde Boas navigation (Brodal, Fagerberg
+    # and Jacob): the tree is cut in a top tree and bottom trees, each laid
+    # out recursively; for a node at depth d that is the root of a bottom
+    # tree, top[d] and bottom[d] are the sizes of the two kinds of trees and
+    # above[d] the depth of the root of the top tree
+    top = [0] * height
+    bottom = [0] * height
+    above = [0] * height
+    stack = [(0, height)]
+    while stack:
+        depth, h = stack.pop()
+        if h < 2:
+            continue
+        top_height = h // 2
+        d = depth + top_height
+        top[d] = (1 << top_height) - 1
+        bottom[d] = (1 << (h - top_height)) - 1
+        above[d] = depth
+        stack.append((depth, top_height))
+        stack.append((d, h - top_height))
+    return top, bottom, above
+
+
+class StaticBinarySearchTree:
+    """
+    Read-only BST over a contiguous array('q') of 64 bit integer keys,
+    built by BinarySearchTree.freeze(). Node i (1 based, BFS numbering) has
+    children 2i and 2i+1, so no pointer is stored:
+
+    - 'eytzinger': node i is stored at position i (position 0 unused), the
+      nodes of a level are adjacent.
+    - 'veb': van Emde Boas order, the tree is cut at half height and the
+      top tree and then every bottom tree are stored recursively, so a
+      descent touches O(log_B n) blocks of any size B. Positions are
+      computed level by level from small tables; the last level can leave
+      holes in the array.
+
+    A search descends to the bottom with one comparison per level and no
+    early exit (i = 2i + (key[i] < k)), then backs up to the lower bound
+    of the key; nodes_read counts the nodes compared. search_batch runs
+    the same descent for a whole array of queries, one level at a time.
+    """
+
+    def __init__(self, keys, layout='eytzinger'):
+        if layout not in LAYOUTS:
+            raise ValueError(f"unknown layout {layout!r}, choose one of "
+                             f"{', '.join(LAYOUTS)}")
+        sorted_keys = array('q', keys)
+        if any(a >= b for a, b in zip(sorted_keys, sorted_keys[1:])):
+            raise ValueError("keys are not sorted and distinct")
+        self.layout = layout
+        self.size = n = len(sorted_keys)
+        self.height = n.bit_length()  # levels of the tree
+        self.nodes_read = 0
+        self.nodes_written = 0
+
+        # in-order walk of the implicit tree: the k-th visited node gets the
+        # k-th smallest key
+        eytzinger = array('q', bytes(8 * (n + 1)))
+        rank = 0
+        stack = []
+        i = 1
+        while stack or i <= n:
+            while i <= n:
+                stack.append(i)
+                i *= 2
+            i = stack.pop()
+            eytzinger[i] = sorted_keys[rank]
+            rank += 1
+            i = 2 * i + 1
+
+        if layout == 'eytzinger':
+            self.keys = eytzinger
+            return
+        self.top, self.bottom, self.above = _veb_tables(self.height)
+        self.keys = array('q', [HOLE]) * ((1 << self.height) - 1)
+        position = [0] * (n + 1)  # BFS number -> position
+        for d in range(self.height):
+            for i in range(1 << d, min(2 << d, n + 1)):
+                position[i] = self._veb_position(d, i, position)
+                self.keys[position[i]] = eytzinger[i]
+
+    def _veb_position(self, d, i, position):
+        # position of node i at depth d, from the one of its ancestor at
+        # depth above[d] (position is indexed by BFS number)
+        if d == 0:
+            return 0
+        top = self.top[d]
+        return position[i >> (d - self.above[d])] + top + (i & top) * self.bottom[d]
+
+    def __len__(self):
+        return self.size
+
+    def search(self, key):
+        self.nodes_read = 0
+        self.nodes_written = 0
+        keys, n = self.keys, self.size
+        i = 1
+        if self.layout == 'eytzinger':
+            while i <= n:
+                i = 2 * i + (keys[i] < key)
+            self.nodes_read = i.bit_length() - 1  # one bit per level
+            # drop the right turns taken below the lower bound, then one more
+            i >>= ((~i) & (i + 1)).bit_length()
+            return i > 0 and keys[i] == key
+
+        top, bottom, above = self.top, self.bottom, self.above
+        path = [0] * max(1, self.height)  # position of the node of each depth
+        d = 0
+        while i <= n:
+            i = 2 * i + (keys[path[d]] < key)
+            d += 1
+            if d < self.height:
+                path[d] = path[above[d]] + top[d] + (i & top[d]) * bottom[d]
+        self.nodes_read = d
+        i >>= ((~i) & (i + 1)).bit_length()
+        return i > 0 and keys[path[i.bit_length() - 1]] == key
+
+    def search_batch(self, queries):
+        """
+        Search every key of the queries array at once, one level per step
+        for all the queries. Returns (found, position, reads) arrays: found
+        flags, position of the key in self.keys (NULL when missing) and nodes
+        compared per query; nodes_read holds their total.
+        """
+        import numpy as np  # only the batch search needs numpy
+
+        queries = np.asarray(queries, dtype=np.int64)
+        keys = np.frombuffer(self.keys, dtype=np.int64)
+        n, height = self.size, self.height
+        i = np.ones(len(queries), dtype=np.int64)
+        reads = np.zeros(len(queries), dtype=np.int64)
+        veb = self.layout == 'veb'
+        if veb:
+            path = np.zeros((max(1, height), len(queries)), dtype=np.int64)
+
+        for d in range(height):
+            active = i <= n  # only the last level can be left early
+            index = path[d] if veb else i
+            i = np.where(active, 2 * i + (keys[np.where(active, index, 0)]
+                                          < queries), i)
+            reads += active
+            if veb and d + 1 < height:
+                top = self.top[d + 1]
+                path[d + 1] = path[self.above[d + 1]] + top + \
+                    (i & top) * self.bottom[d + 1]
+
+        # back up to the lower bound: drop the trailing right turns and one
+        # more level
+        lowest_zero = ~i & (i + 1)
+        i >>= np.log2(lowest_zero).astype(np.int64) + 1
+        hit = i > 0
+        if veb:
+            depth = np.zeros(len(queries), dtype=np.int64)
+            depth[hit] = np.log2(i[hit]).astype(np.int64)
+            position = path[depth, np.arange(len(queries))]
+        else:
+            position = i
+        found = hit.copy()
+        found[hit] = keys[position[hit]] == queries[hit]
+
+        self.nodes_read = int(reads.sum())
+        self.nodes_written = 0
+        return found, np.where(found, position, NULL), reads
@@ -0,0 +1,37 @@
+import pytest
+
+from shardedbtree import ShardedBTree
+
+
+@pytest.mark.parametrize('processes', [False, True])
+def test_failed_batch_leaves_no_pending_reply(processes):
+    with ShardedBTree(4, shards=4, processes=processes) as tree:
+        tree.insert_many(list(range(100)))
+        # the str key cannot be compared with the int keys of its shard
+        with pytest.raises(TypeError):
+            tree.insert_many(['x'] + list(range(1000, 1100)))
+        assert tree.search(50) is True
+        assert tree.search(5000) is False
+        stats = tree.search_many([1, 2, 3])
+        assert [(key, found) for key, found, _ in stats] == \
+            [(1, True), (2, True), (3, True)]
+        assert len(tree.shard_stats()) == 4
+
+
+@pytest.mark.parametrize('processes', [False, True])
+def test_range_skips_the_shard_of_an_excluded_boundary(processes):
+    with ShardedBTree(4, shards=2, partition='range', boundaries=[50],
+                      processes=processes) as tree:
+        tree.insert_many(list(range(100)))
+        before = tree.shard_stats()[1]['nodes_read']
+        assert list(tree.range(10, 50)) == list(range(10, 50))
+        assert tree.shard_stats()[1]['nodes_read'] == before
+        assert list(tree.range(10, 51)) == list(range(10, 51))
+        assert tree.shard_stats()[1]['nodes_read'] > before
+
+
+@pytest.mark.parametrize('processes', [False, True])
+def test_close_twice(processes):
+    with ShardedBTree(4, shards=2, processes=processes) as tree:
+        tree.insert(1)
+        tree.close()
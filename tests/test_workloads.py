@@ -0,0 +1,29 @@
+from workloads import load_keys, operation_stream
+
+
+def test_insert_only_stream_grows_key_space():
+    loaded = load_keys('uniform', 1000)
+    pairs = list(operation_stream('uniform', 'insert=1', loaded, 10000))
+    keys = [key for _, key in pairs]
+    assert len(pairs) == 10000
+    assert len(set(keys) | set(loaded)) == len(loaded) + 10000
+
+
+def test_sorted_and_reverse_stay_ordered_after_mutations():
+    for distribution in ('sorted', 'reverse'):
+        loaded = load_keys(distribution, 500)
+        present = sorted(loaded)
+        cursor = 0
+        for operation, key in operation_stream(
+                distribution, 'search=0.5,insert=0.25,delete=0.25', loaded, 3000):
+            if operation == 'Insert':
+                present.append(key)
+                present.sort()
+                continue
+            index = cursor % len(present)
+            if distribution == 'reverse':
+                index = len(present) - 1 - index
+            cursor += 1
+            assert key == present[index]
+            if operation == 'Delete':
+                present.remove(key)
@@ -0,0 +1,233 @@
+import cProfile
+import pstats
+from collections import Counter, namedtuple
+from contextlib import contextmanager
+
+# access of a traced node
+READ = 'read'
+WRITE = 'write'
+
+# cause of a node access
+DESCEND = 'descend'  # read on the way down
+ROOT = 'root'  # visit of the root, traced but not counted in nodes_read
+SPLIT = 'split'  # node split by an insert
+MERGE = 'merge'  # two children merged by a delete
+BORROW = 'borrow'  # key moved between siblings by a delete
+UPDATE = 'update'  # key added, removed or replaced in place
+
+# delete cases of BTree.delete (CLRS numbering): 1 key in a leaf; 2a/2b/2c
+# key in an internal node replaced by its predecessor / successor, or the
+# two children merged; 3 descent into a child with at least t keys, 3a after
+# borrowing a key from a sibling, 3b after merging it with a sibling
+DELETE_CASES = ('1', '2a', '2b', '2c', '3', '3a', '3b')
+
+# one node access: case is the last delete case entered by the operation
+# (None outside deletes), level is the depth of the node (root = 0) and
+# node_id is the id() of the node
+Event = namedtuple('Event', ('operation', 'case', 'access', 'level', 'node_id',
+                             'cause'))
+
+
+def _height(node):
+    # all the leaves of a B tree are at the same depth
+    height = 0
+    while not node.leaf:
+        node = node.children[0]
+        height += 1
+    return height
+
+
+class Tracer:
+    """
+    Receives the node accesses of a tree and forwards them as Events to its
+    sinks. A tree traces only while its tracer attribute is set (see trace);
+    with tracer = None every hook costs a single attribute test.
+
+    The tree calls begin/end around every operation, mark when a delete
+    enters one of DELETE_CASES and emit for every node read or written. The
+    level of a node is computed when its event is emitted, so tracing slows
+    down every access by O(height).
+    """
+
+    def __init__(self, *sinks):
+        self.sinks = sinks
+        self.operation = None  # operation running, e.g. 'delete'
+        self.case = None  # delete case of the running operation
+
+    def begin(self, operation):
+        self.operation = operation
+        self.case = None
+        for sink in self.sinks:
+            sink.begin(operation)
+
+    def end(self):
+        for sink in self.sinks:
+            sink.end(self.operation)
+        self.operation = None
+        self.case = None
+
+    def mark(self, case):
+        self.case = case
+
+    def emit(self, tree, access, node, cause):
+        event = Event(self.operation, self.case, access,
+                      _height(tree.root) - _height(node), id(node), cause)
+        for sink in self.sinks:
+            sink.record(event)
+
+
+@contextmanager
+def trace(tree, *sinks):
+    """
+    Attach a Tracer with the given sinks to tree for the duration of a with
+    block, then restore the previous tracer
+    """
+    previous = tree.tracer
+    tree.tracer = tracer = Tracer(*sinks)
+    try:
+        yield tracer
+    finally:
+        tree.tracer = previous
+
+
+# ---- sinks -------------------------------------------------------------------
+
+class Sink:
+    """
+    Base sink: every hook does nothing
+    """
+
+    def begin(self, operation):
+        pass
+
+    def end(self, operation):
+        pass
+
+    def record(self, event):
+        pass
+
+
+class CounterSink(Sink):
+    """
+    Count the events by (operation, case, access, cause), and the operations
+    traced
+    """
+
+    def __init__(self):
+        self.counts = Counter()
+        self.operations = Counter()
+
+    def begin(self, operation):
+        self.operations[operation] += 1
+
+    def record(self, event):
+        self.counts[event.operation, event.case, event.access, event.cause] += 1
+
+    def by(self, *fields):
+        """
+        Counts grouped by some Event fields, e.g. by('case') after
+        filtering, or by('access', 'cause')
+        """
+        index = [('operation', 'case', 'access', 'cause').index(field)
+                 for field in fields]
+        grouped = Counter()
+        for key, count in self.counts.items():
+            grouped[tuple(key[i] for i in index)] += count
+        return grouped
+
+    def writes_by_case(self):
+        """
+        Nodes written by the deletes, per delete case
+        """
+        writes = Counter()
+        for (operation, case, access, _), count in self.counts.items():
+            if operation == 'delete' and access == WRITE:
+                writes[case] += count
+        return writes
+
+
+class LevelHistogram(Sink):
+    """
+    Per-level histograms of the nodes read and written, for every operation
+    """
+
+    def __init__(self):
+        self.levels = {}  # (operation, access) -> Counter of levels
+
+    def record(self, event):
+        key = event.operation, event.access
+        histogram = self.levels.get(key)
+        if histogram is None:
+            histogram = self.levels[key] = Counter()
+        histogram[event.level] += 1
+
+    def histogram(self, access, operation=None):
+        """
+        List of the accesses per level (index 0 is the root), of one
+        operation or of all of them
+        """
+        total = Counter()
+        for (op, acc), histogram in self.levels.items():
+            if acc == access and (operation is None or op == operation):
+                total.update(histogram)
+        return [total[level] for level in range(max(total, default=-1) + 1)]
+
+
+class SamplingSink(Sink):
+    """
+    Forward one event out of every to another sink, e.g. to keep an
+    expensive sink on a long run; begin/end are always forwarded
+    """
+
+    def __init__(self, sink, every=100):
+        if every < 1:
+            raise ValueError("every must be at least 1")
+        self.sink = sink
+        self.every = every
+        self.seen = 0
+
+    def begin(self, operation):
+        self.sink.begin(operation)
+
+    def end(self, operation):
+        self.sink.end(operation)
+
+    def record(self, event):
+        self.seen += 1
+        if self.seen % self.every == 0:
+            self.sink.record(event)
+
+
+class ProfileSink(Sink):
+    """
+    Run cProfile during one operation out of every (all of them with
+    every=1), optionally only for one operation, and collect the results
+    of all the profiled operations
+    """
+
+    def __init__(self, every=1, operation=None):
+        if every < 1:
+            raise ValueError("every must be at least 1")
+        self.every = every
+        self.operation = operation
+        self.profiler = cProfile.Profile()
+        self.seen = 0
+        self.profiled = 0  # counter of profiled operations
+        self.running = False
+
+    def begin(self, operation):
+        if self.operation is not None and operation != self.operation:
+            return
+        self.seen += 1
+        if self.seen % self.every == 0:
+            self.profiled += 1
+            self.running = True
+            self.profiler.enable()
+
+    def end(self, operation):
+        if self.running:
+            self.profiler.disable()
+            self.running = False
+
+    def stats(self, sort='cumulative'):
+        return pstats.Stats(self.profiler).sort_stats(sort)
@@ -0,0 +1,201 @@
+import math
+import os
+import shutil
+import tempfile
+import time
+from collections import Counter, deque
+
+from btree import BTree
+from metrics import MetricsRecorder
+
+CANDIDATES = (2, 4, 8, 16, 32, 64, 128, 256)
+FILL_FACTOR = 0.7  # nodes of a tree grown by random inserts are ~70% full
+OPERATIONS = ('Insert', 'Search', 'Delete')
+
+
+class DegreeTuner:
+    """
+    Pick the minimum degree t of a BTree for a workload. calibrate() bulk
+    loads the sample keys into one tree per candidate degree, runs the
+    sample operations on each one, measured like PlotGenerator does (time
+    of every operation, then nodes_read/nodes_written) into a
+    MetricsRecorder, and scores every degree by the cost per operation
+
+        mean_ns + pages * (read_cost * reads/op + write_cost * writes/op)
+
+    pages being the pages spanned by a node of (2t - 1) keys and 2t
+    pointers. With the default costs of 0 the measured time alone decides,
+    as for an in-memory tree; read_cost/write_cost (ns per page) model a
+    tree whose nodes live on a device. best holds the cheapest degree.
+    """
+
+    def __init__(self, candidates=CANDIDATES, read_cost=0, write_cost=0,
+                 key_size=8, pointer_size=8, page_size=4096,
+                 fill_factor=FILL_FACTOR):
+        if not candidates or min(candidates) < 2:
+            raise ValueError("candidate degrees must be at least 2")
+        self.candidates = sorted(candidates)
+        self.read_cost = read_cost
+        self.write_cost = write_cost
+        self.key_size = key_size
+        self.pointer_size = pointer_size
+        self.page_size = page_size
+        self.fill_factor = fill_factor
+        self.best = None
+        self.results = []  # one row per candidate of the last calibration
+        self.mix = {}  # operation mix of the last calibration sample
+
+    def pages_per_node(self, t):
+        node_bytes = (2 * t - 1) * self.key_size + 2 * t * self.pointer_size
+        return max(1, math.ceil(node_bytes / self.page_size))
+
+    def calibrate(self, keys, operations):
+        """
+        Measure every candidate degree on a tree holding keys (integers, in
+        any order) with the (operation, key) pairs of operations, as
+        produced by workloads.operation_stream. Returns one dict per
+        candidate with t, mean_ns, reads_per_op, writes_per_op and cost,
+        and sets best.
+        """
+        keys = sorted(keys)
+        operations = list(operations)
+        if not operations:
+            raise ValueError("calibration needs at least one operation")
+        counts = Counter(operation for operation, _ in operations)
+        self.mix = {operation: counts[operation] / len(operations)
+                    for operation in OPERATIONS}
+
+        workdir = tempfile.mkdtemp(prefix='tuner-')
+        try:
+            recorder = MetricsRecorder(os.path.join(workdir, 'metrics'))
+            record = recorder.record
+            for t in self.candidates:
+                tree = BTree.from_sorted(keys, t, self.fill_factor)
+                run = {'Insert': tree.insert, 'Search': tree.search,
+                       'Delete': lambda key: tree.delete(tree.root, key)}
+                phase = recorder.phase(str(t), 'Mix')
+                for operation, key in operations:
+                    start_time = time.perf_counter_ns()
+                    run[operation](key)
+                    elapsed = time.perf_counter_ns() - start_time
+                    record(phase, key, elapsed, tree.nodes_read,
+                           tree.nodes_written)
+            summaries = recorder.summary()
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        self.results = []
+        for summary in summaries:
+            t = int(summary['series'])
+            cost = summary['mean_ns'] + self.pages_per_node(t) * (
+                self.read_cost * summary['reads_per_op'] +
+                self.write_cost * summary['writes_per_op'])
+            self.results.append({'t': t, 'mean_ns': summary['mean_ns'],
+                                 'reads_per_op': summary['reads_per_op'],
+                                 'writes_per_op': summary['writes_per_op'],
+                                 'cost': cost})
+        self.best = min(self.results, key=lambda row: row['cost'])['t']
+        return self.results
+
+    def build(self, keys):
+        """
+        Bulk load keys (in any order) into a BTree of the best degree
+        """
+        if self.best is None:
+            raise ValueError("no degree chosen yet, call calibrate first")
+        return BTree.from_sorted(sorted(keys), self.best, self.fill_factor)
+
+
+def mix_distance(a, b):
+    """
+    Total variation distance between two operation mixes: the fraction of
+    the operations that would have to change type to turn one into the
+    other (0 to 1)
+    """
+    return sum(abs(a.get(op, 0) - b.get(op, 0)) for op in OPERATIONS) / 2
+
+
+class AdaptiveBTree:
+    """
+    BTree that re-tunes its degree online. The last window operations are
+    kept; every window operations their mix is compared with the one the
+    degree was calibrated for, and when it drifted by more than drift
+    (see mix_distance) the tuner is calibrated again on a sample of the
+    keys and the latest operations (at most sample_size of each). If
+    another degree wins, the tree is rebuilt with it by bulk load
+    (BTree.from_sorted over the keys in order), one linear pass.
+
+    insert/search/delete take a key like DurableBTree; nodes_read and
+    nodes_written are those of the last operation (a rebuild is counted in
+    rebuilds, not in the counters).
+    """
+
+    def __init__(self, t=16, tuner=None, window=10000, drift=0.2,
+                 sample_size=10000):
+        self.tuner = tuner if tuner is not None else DegreeTuner()
+        self.tree = BTree(t)
+        self.window = window
+        self.drift = drift
+        self.sample_size = sample_size
+        self.recent = deque(maxlen=window)  # (operation, key) pairs
+        self.seen = 0  # operations since the last check
+        self.rebuilds = 0
+
+    @property
+    def t(self):
+        return self.tree.t
+
+    @property
+    def nodes_read(self):
+        return self.tree.nodes_read
+
+    @property
+    def nodes_written(self):
+        return self.tree.nodes_written
+
+    def _observe(self, operation, key):
+        self.recent.append((operation, key))
+        self.seen += 1
+        if self.seen >= self.window:
+            self.seen = 0
+            self.retune()
+
+    def insert(self, k):
+        self.tree.insert(k)
+        self._observe('Insert', k)
+
+    def search(self, key):
+        result = self.tree.search(key)
+        self._observe('Search', key)
+        return result
+
+    def delete(self, k):
+        self.tree.delete(self.tree.root, k)
+        self._observe('Delete', k)
+
+    def retune(self, force=False):
+        """
+        Calibrate again if the recent mix drifted (always with force) and
+        rebuild the tree when the best degree changed; returns whether the
+        tree was rebuilt
+        """
+        if not self.recent:
+            return False
+        counts = Counter(operation for operation, _ in self.recent)
+        mix = {operation: counts[operation] / len(self.recent)
+               for operation in OPERATIONS}
+        if not force and self.tuner.best is not None and \
+                mix_distance(mix, self.tuner.mix) <= self.drift:
+            return False
+
+        keys = list(self.tree.range())
+        # every k-th key keeps the distribution of the keys in the sample
+        step = max(1, len(keys) // self.sample_size)
+        operations = list(self.recent)[-self.sample_size:]
+        self.tuner.calibrate(keys[::step], operations)
+        if self.tuner.best == self.tree.t:
+            return False
+        self.tree = BTree.from_sorted(keys, self.tuner.best,
+                                      self.tuner.fill_factor)
+        self.rebuilds += 1
+        return True
@@ -0,0 +1,286 @@
+import os
+import struct
+import time
+import zlib
+from array import array
+
+from btree import BTree
+
+# the log starts with a header, then one fixed-size record per mutation
+WAL_HEADER = struct.Struct('<4sQ')  # magic, generation
+WAL_MAGIC = b'BTWL'
+RECORD_BODY = struct.Struct('<Bq')  # operation, key
+RECORD = struct.Struct('<BqI')  # body followed by its crc32
+INSERT = 1
+DELETE = 2
+
+# a checkpoint holds every key of the tree in ascending order
+CHECKPOINT_HEADER = struct.Struct('<4sQIQ')  # magic, generation, t, key count
+CHECKPOINT_MAGIC = b'BTCK'
+KEYS_PER_BLOCK = 1 << 16  # keys written to the checkpoint in one call
+
+SYNC_EVERY = 64  # records per group commit
+SYNC_INTERVAL = 0.005  # age of the oldest pending record that makes the
+                       # next append commit the group
+CHECKPOINT_EVERY = 1_000_000  # records logged between two checkpoints
+
+
+def _fsync_directory(directory):
+    # make a rename inside the directory durable (not possible on Windows)
+    if hasattr(os, 'O_DIRECTORY'):
+        fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+class WriteAheadLog:
+    """
+    Append-only log of insert/delete records with group commit: records are
+    buffered and written with a single write + fsync once sync_every records
+    are pending, or by the first append made after the oldest pending record
+    has waited sync_interval seconds. The interval is only checked by append
+    (there is no timer): a log that goes quiet keeps its pending records
+    until the next append, commit() or close, and a crash loses every
+    record still pending. Every log file belongs to a generation, a
+    checkpoint of generation g contains all the records of the logs of the
+    previous generations.
+    """
+
+    def __init__(self, path, sync_every=SYNC_EVERY, sync_interval=SYNC_INTERVAL):
+        self.path = path
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.pending = bytearray()  # records not written yet
+        self.pending_since = None  # time of the oldest pending record
+        self.records = 0  # records in the log file, written or pending
+        self.syncs = 0  # counter of fsync calls
+
+        if not os.path.exists(path):
+            self._create(path, 0)
+        self.file = open(path, 'r+b')
+        magic, self.generation = WAL_HEADER.unpack(self.file.read(WAL_HEADER.size))
+        if magic != WAL_MAGIC:
+            raise ValueError(f"{path} is not a write-ahead log")
+
+    @staticmethod
+    def _create(path, generation):
+        # write the new empty log aside, then atomically put it in place
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as file:
+            file.write(WAL_HEADER.pack(WAL_MAGIC, generation))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp, path)
+        _fsync_directory(os.path.dirname(os.path.abspath(path)))
+
+    def replay(self):
+        """
+        Yield the (operation, key) records of the log file. The log is cut
+        after the last intact record, so a torn group written during a crash
+        is dropped.
+        """
+        self.file.seek(WAL_HEADER.size)
+        good = WAL_HEADER.size
+        self.records = 0
+        while True:
+            data = self.file.read(RECORD.size)
+            if len(data) < RECORD.size:
+                break
+            operation, key, crc = RECORD.unpack(data)
+            if crc != zlib.crc32(data[:RECORD_BODY.size]) or \
+                    operation not in (INSERT, DELETE):
+                break
+            good += RECORD.size
+            self.records += 1
+            yield operation, key
+        self.file.truncate(good)
+        self.file.seek(good)
+
+    def append(self, operation, key):
+        body = RECORD_BODY.pack(operation, key)
+        self.pending += RECORD.pack(operation, key, zlib.crc32(body))
+        self.records += 1
+        now = time.monotonic()
+        if self.pending_since is None:
+            self.pending_since = now
+        if len(self.pending) >= self.sync_every * RECORD.size or \
+                now - self.pending_since >= self.sync_interval:
+            self.commit()
+
+    def commit(self):
+        """
+        Write and fsync the pending records (one group commit)
+        """
+        if not self.pending:
+            return
+        self.file.seek(0, os.SEEK_END)
+        self.file.write(self.pending)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.syncs += 1
+        self.pending.clear()
+        self.pending_since = None
+
+    def rotate(self, generation):
+        """
+        Replace the log with an empty one of the new generation; called once
+        a checkpoint holds all the records of the current log
+        """
+        self.file.close()
+        self._create(self.path, generation)
+        self.file = open(self.path, 'r+b')
+        self.file.seek(0, os.SEEK_END)
+        self.generation = generation
+        self.pending.clear()
+        self.pending_since = None
+        self.records = 0
+
+    def close(self):
+        self.commit()
+        self.file.close()
+
+
+class DurableBTree:
+    """
+    BTree of 64 bit integer keys made durable by a write-ahead log in the
+    directory path. insert/delete append a record to the log before changing
+    the tree; every checkpoint_every records the whole tree is written to a
+    checkpoint file (keys in ascending order) and the log starts over. On
+    open the checkpoint is bulk loaded with BTree.from_sorted and the log
+    tail is replayed, so recovery time is bounded by the log size rather
+    than by a rebuild with one insert per key.
+
+    A mutation is durable once its group is committed (see WriteAheadLog);
+    call commit() to force it. nodes_read/nodes_written are those of the
+    in-memory tree for the last operation.
+    """
+
+    def __init__(self, path, t, sync_every=SYNC_EVERY, sync_interval=SYNC_INTERVAL,
+                 checkpoint_every=CHECKPOINT_EVERY):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.checkpoint_path = os.path.join(path, 'checkpoint')
+        self.checkpoint_every = checkpoint_every
+        self.t = t
+
+        self.generation = 0  # generation of the last checkpoint
+        self.tree = self._load_checkpoint()
+        self.wal = WriteAheadLog(os.path.join(path, 'wal'), sync_every,
+                                 sync_interval)
+        self.recover()
+
+    # ---- recovery ----------------------------------------------------------
+
+    def _load_checkpoint(self):
+        if not os.path.exists(self.checkpoint_path):
+            return BTree(self.t)
+
+        with open(self.checkpoint_path, 'rb') as file:
+            magic, self.generation, t, count = \
+                CHECKPOINT_HEADER.unpack(file.read(CHECKPOINT_HEADER.size))
+            if magic != CHECKPOINT_MAGIC:
+                raise ValueError(f"{self.checkpoint_path} is not a checkpoint")
+            if t != self.t:
+                raise ValueError(f"checkpoint has t={t}, tree opened with t={self.t}")
+
+            def keys():
+                left = count
+                while left:
+                    block = array('q')
+                    block.fromfile(file, min(left, KEYS_PER_BLOCK))
+                    left -= len(block)
+                    yield from block
+
+            return BTree.from_sorted(keys(), self.t)
+
+    def recover(self):
+        """
+        Replay the log on top of the checkpoint; a log older than the
+        checkpoint (crash between checkpoint and log rotation) is already
+        part of it and is discarded
+        """
+        if self.wal.generation < self.generation:
+            self.wal.rotate(self.generation)
+            return 0
+
+        replayed = 0
+        for operation, key in self.wal.replay():
+            if operation == INSERT:
+                self.tree.insert(key)
+            else:
+                self.tree.delete(self.tree.root, key)
+            replayed += 1
+        return replayed
+
+    # ---- operations ----------------------------------------------------------
+
+    @property
+    def nodes_read(self):
+        return self.tree.nodes_read
+
+    @property
+    def nodes_written(self):
+        return self.tree.nodes_written
+
+    def search(self, key):
+        return self.tree.search(key)
+
+    def insert(self, k):
+        self.wal.append(INSERT, k)
+        self.tree.insert(k)
+        self._maybe_checkpoint()
+
+    def delete(self, k):
+        self.wal.append(DELETE, k)
+        self.tree.delete(self.tree.root, k)
+        self._maybe_checkpoint()
+
+    def _maybe_checkpoint(self):
+        if self.wal.records >= self.checkpoint_every:
+            self.checkpoint()
+
+    def checkpoint(self):
+        """
+        Write every key to a new checkpoint of the next generation (atomic
+        rename), then start an empty log of that generation
+        """
+        self.wal.commit()
+        generation = self.generation + 1
+        tmp = self.checkpoint_path + '.tmp'
+        with open(tmp, 'wb') as file:
+            file.write(CHECKPOINT_HEADER.pack(CHECKPOINT_MAGIC, generation,
+                                              self.t, 0))
+            count = 0
+            block = array('q')
+            for key in self.tree:
+                block.append(key)
+                if len(block) == KEYS_PER_BLOCK:
+                    block.tofile(file)
+                    count += len(block)
+                    del block[:]
+            block.tofile(file)
+            count += len(block)
+            file.seek(0)
+            file.write(CHECKPOINT_HEADER.pack(CHECKPOINT_MAGIC, generation,
+                                              self.t, count))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp, self.checkpoint_path)
+        _fsync_directory(self.path)
+
+        self.generation = generation
+        self.wal.rotate(generation)
+
+    def commit(self):
+        self.wal.commit()
+
+    def close(self):
+        self.wal.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
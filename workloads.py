@@ -0,0 +1,169 @@
+import random
+from bisect import insort
+
+DISTRIBUTIONS = ('uniform', 'sorted', 'reverse', 'zipfian', 'clustered')
+OPERATIONS = ('Insert', 'Search', 'Delete')
+
+CLUSTER_SIZE = 1000  # keys per cluster of the clustered distribution
+ZIPF_THETA = 0.99  # skew of the zipfian distribution (as in YCSB)
+
+
+class ZipfianGenerator:
+    """
+    Draw ranks in [0, n_items) with P(rank i) proportional to 1 / (i+1)^theta
+    in O(1) per draw (Gray et al., "Quickly generating billion-record
+    synthetic databases", the generator used by YCSB)
+    """
+
+    def __init__(self, n_items, theta=ZIPF_THETA, rnd=None):
+        self.n_items = n_items
+        self.theta = theta
+        self.rnd = rnd if rnd is not None else random.Random()
+        self.zeta_n = self._zeta(n_items, theta)
+        zeta_2 = self._zeta(2, theta)
+        self.alpha = 1 / (1 - theta)
+        self.eta = (1 - (2 / n_items) ** (1 - theta)) / (1 - zeta_2 / self.zeta_n) \
+            if n_items > 1 else 0.0
+
+    @staticmethod
+    def _zeta(n, theta, exact=10000):
+        # exact sum of the first terms, integral approximation of the tail
+        head = sum(1 / (i ** theta) for i in range(1, min(n, exact) + 1))
+        if n <= exact:
+            return head
+        low, high = exact + 0.5, n + 0.5
+        return head + (high ** (1 - theta) - low ** (1 - theta)) / (1 - theta)
+
+    def next(self):
+        u = self.rnd.random()
+        uz = u * self.zeta_n
+        if uz < 1:
+            return 0
+        if uz < 1 + 0.5 ** self.theta:
+            return 1
+        rank = int(self.n_items * (self.eta * u - self.eta + 1) ** self.alpha)
+        return min(rank, self.n_items - 1)
+
+
+def load_keys(distribution, n, seed=0):
+    """
+    n distinct keys from [0, 10n) in the order they are inserted when the
+    tree is loaded: random order (uniform, zipfian), ascending, descending,
+    or dense runs of consecutive keys at random offsets (clustered)
+    """
+    rnd = random.Random(seed)
+    key_space = 10 * n
+
+    if distribution == 'clustered':
+        keys = []
+        starts = rnd.sample(range(0, key_space, CLUSTER_SIZE * 10),
+                            (n + CLUSTER_SIZE - 1) // CLUSTER_SIZE)
+        for start in starts:
+            keys.extend(range(start, start + min(CLUSTER_SIZE, n - len(keys))))
+        rnd.shuffle(keys)
+        return keys
+
+    keys = rnd.sample(range(key_space), n)
+    if distribution == 'sorted':
+        keys.sort()
+    elif distribution == 'reverse':
+        keys.sort(reverse=True)
+    elif distribution not in DISTRIBUTIONS:
+        raise ValueError(f"unknown distribution {distribution!r}, "
+                         f"expected one of {', '.join(DISTRIBUTIONS)}")
+    return keys
+
+
+def parse_mix(mix):
+    """
+    Parse an operation mix such as "search=0.8,insert=0.1,delete=0.1" into
+    a {operation: weight} dict normalized to 1
+    """
+    weights = {}
+    for part in mix.split(','):
+        name, _, weight = part.partition('=')
+        operation = name.strip().capitalize()
+        if operation not in OPERATIONS:
+            raise ValueError(f"unknown operation {name!r} in mix {mix!r}")
+        weights[operation] = float(weight) if weight else 1.0
+    total = sum(weights.values())
+    if total <= 0:
+        raise ValueError(f"operation mix {mix!r} has no weight")
+    return {operation: weight / total for operation, weight in weights.items()}
+
+
+def operation_stream(distribution, mix, loaded, n_ops, seed=0):
+    """
+    Yield n_ops (operation, key) pairs with the given mix after the keys
+    in loaded have been inserted. Search and Delete pick keys currently in
+    the tree: uniformly, in ascending (sorted) or descending (reverse) order,
+    by zipfian popularity, or in runs of neighbouring keys (clustered).
+    Insert always uses keys not yet in the tree, drawn from a key space
+    that doubles whenever half of it is in use.
+    """
+    rnd = random.Random(seed + 1)
+    weights = parse_mix(mix) if isinstance(mix, str) else mix
+    operations = list(weights)
+    cumulative = []
+    total = 0.0
+    for operation in operations:
+        total += weights[operation]
+        cumulative.append(total)
+
+    ordered = distribution in ('sorted', 'reverse', 'clustered')
+    present = sorted(loaded) if ordered else list(loaded)  # kept sorted
+                                                           # when ordered
+    in_tree = set(present)
+    key_space = 10 * max(1, len(present))
+    zipf = ZipfianGenerator(max(1, len(present)), rnd=rnd) \
+        if distribution == 'zipfian' else None
+    cursor = 0  # position for sorted/reverse/clustered accesses
+
+    for _ in range(n_ops):
+        u = rnd.random()
+        operation = operations[-1]
+        for name, bound in zip(operations, cumulative):
+            if u < bound:
+                operation = name
+                break
+
+        if operation == 'Insert' or not present:
+            while len(in_tree) >= key_space // 2:  # keep free keys easy to draw
+                key_space *= 2
+            while True:
+                key = rnd.randrange(key_space)
+                if key not in in_tree:
+                    break
+            in_tree.add(key)
+            if ordered:
+                insort(present, key)
+            else:
+                present.append(key)
+            yield 'Insert', key
+            continue
+
+        if distribution == 'zipfian':
+            index = zipf.next() % len(present)
+        elif distribution == 'sorted':
+            index = cursor % len(present)
+            cursor += 1
+        elif distribution == 'reverse':
+            index = len(present) - 1 - cursor % len(present)
+            cursor += 1
+        elif distribution == 'clustered':
+            if cursor % CLUSTER_SIZE == 0:  # jump to a new random run
+                start = rnd.randrange(len(present))
+            index = (start + cursor % CLUSTER_SIZE) % len(present)
+            cursor += 1
+        else:
+            index = rnd.randrange(len(present))
+        key = present[index]
+
+        if operation == 'Delete':
+            if ordered:
+                present.pop(index)
+            else:  # swap with the last key so removal is O(1)
+                present[index] = present[-1]
+                present.pop()
+            in_tree.discard(key)
+        yield operation, key